@@ -0,0 +1,68 @@
+"""Sistema do despachante: create_app() monta o app Flask (config, banco, blueprints e comandos)."""
+import os
+import logging
+
+from flask import Flask
+
+from .config import carrega_configuracao
+from .extensoes import db, registra_perfil_sqlite
+from .autenticacao import load_user, format_date_filter, format_currency_filter
+from .compressao import registra_compressao
+from .metricas import registra_metricas
+from .perfilador import registra_perfilador
+
+# Templates, static e instance continuam na raiz do projeto
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_app(config=None):
+    """Cria o app; 'config' (dict) sobrescreve o que veio do ambiente (útil em scripts e testes)."""
+    app = Flask(
+        __name__,
+        template_folder=os.path.join(RAIZ, 'templates'),
+        static_folder=os.path.join(RAIZ, 'static'),
+        instance_path=os.path.join(RAIZ, 'instance'),
+    )
+    carrega_configuracao(app)
+    if config:
+        app.config.update(config)
+
+    # Sob o gunicorn, o log do app (aquecimento, compressão) vai para o mesmo destino do servidor
+    log_gunicorn = logging.getLogger('gunicorn.error')
+    if log_gunicorn.handlers:
+        app.logger.handlers = log_gunicorn.handlers
+        app.logger.setLevel(log_gunicorn.level)
+
+    db.init_app(app)
+    registra_perfil_sqlite(app)
+
+    app.before_request(load_user)
+    app.add_template_filter(format_date_filter, 'to_date')
+    app.add_template_filter(format_currency_filter, 'moeda')
+
+    # Blueprints (e com eles os modelos) só são importados aqui: scripts que usam apenas
+    # os modelos não pagam pelas rotas. ReportLab só carrega ao gerar o primeiro PDF.
+    from .blueprints import BLUEPRINTS
+    from .comandos import COMANDOS
+
+    for bp in BLUEPRINTS + COMANDOS:
+        app.register_blueprint(bp)
+
+    # Depois dos blueprints: embrulha a view 'static' para servir os .br/.gz pré-comprimidos
+    registra_compressao(app)
+    registra_metricas(app)
+    registra_perfilador(app)
+
+    if app.config['INICIALIZAR_BANCO']:
+        from .banco import inicializa_banco
+
+        with app.app_context():
+            inicializa_banco()
+
+    if app.config['AQUECER']:
+        from .banco import aquece
+
+        tempos = aquece(app)
+        app.logger.info('Aquecimento: %s', ', '.join(f'{k} {v:.0f} ms' for k, v in tempos.items()))
+
+    return app
@@ -0,0 +1,100 @@
+import os
+import csv
+import gzip
+import json
+from datetime import datetime, date
+from functools import lru_cache
+from types import SimpleNamespace
+
+from flask import current_app
+
+from .extensoes import db
+
+# ----------------------------------------------------
+# 4.3. ARQUIVO FRIO (leitura dos anos exportados)
+# ----------------------------------------------------
+
+# Tabela -> coluna de data que define o ano (itens acompanham o serviço)
+TABELAS_ARQUIVO_FRIO = {
+    'servico': 'data_servico',
+    'item_servico': None,
+    'movimentacao_caixa': 'data',
+    'despesa': 'data',
+}
+
+def anos_arquivo_frio():
+    """Anos com exportação concluída no arquivo frio."""
+    base = current_app.config['ARQUIVO_FRIO_DIR']
+    anos = []
+    if os.path.isdir(base):
+        for nome in os.listdir(base):
+            manifesto = os.path.join(base, nome, 'manifesto.json')
+            if nome.isdigit() and os.path.exists(manifesto):
+                with open(manifesto, encoding='utf-8') as f:
+                    if json.load(f).get('status') == 'concluido':
+                        anos.append(int(nome))
+    return sorted(anos)
+
+def _converte_valor_frio(coluna, valor):
+    if valor == '':
+        return None
+    try:
+        tipo = coluna.type.python_type
+    except NotImplementedError:
+        return valor
+    if tipo is bool:
+        return valor in ('True', 'true', '1')
+    if tipo in (date, datetime):
+        return tipo.fromisoformat(valor)
+    return tipo(valor)
+
+def _caminho_frio(ano, tabela):
+    return os.path.join(current_app.config['ARQUIVO_FRIO_DIR'], str(ano), f'{tabela}.csv.gz')
+
+def itera_tabela_fria(ano, tabela):
+    """Lê um CSV.gz do arquivo frio linha a linha (SimpleNamespace), sem guardar o arquivo em memória."""
+    colunas = db.metadata.tables[tabela].columns
+    with gzip.open(_caminho_frio(ano, tabela), 'rt', newline='', encoding='utf-8') as arq:
+        for linha in csv.DictReader(arq):
+            dados = {nome: (_converte_valor_frio(colunas[nome], valor) if nome in colunas else valor or None)
+                     for nome, valor in linha.items()}
+            if tabela == 'servico':
+                # Os templates usam s.cliente.nome; o nome foi gravado junto na exportação
+                dados['cliente'] = SimpleNamespace(nome=dados.pop('cliente_nome', None))
+            yield SimpleNamespace(**dados)
+
+@lru_cache(maxsize=32)
+def _le_tabela_fria(ano, tabela, modificado_em):
+    """Linhas de um CSV.gz do arquivo frio (cache por ano/tabela/mtime, para os relatórios por período)."""
+    return list(itera_tabela_fria(ano, tabela))
+
+def registros_arquivados(tabela, inicio=None, fim=None):
+    """Linhas ativas do arquivo frio de 'tabela' com a data em [inicio, fim] (None = sem limite).
+
+    Só abre os anos que o período alcança, então consultas do ano corrente não leem disco.
+    """
+    coluna = TABELAS_ARQUIVO_FRIO[tabela]
+    registros = []
+    for ano in anos_arquivo_frio():
+        if (inicio and ano < inicio.year) or (fim and ano > fim.year):
+            continue
+        for r in _le_tabela_fria(ano, tabela, os.path.getmtime(_caminho_frio(ano, tabela))):
+            if getattr(r, 'deleted_at', None) is not None:
+                continue
+            data = getattr(r, coluna) if coluna else None
+            if data and ((inicio and data < inicio) or (fim and data > fim)):
+                continue
+            registros.append(r)
+    return registros
+
+def arquivados_recentes_primeiro(tabela):
+    """Linhas ativas do arquivo frio da mais nova para a mais antiga, por (data, id), um ano por vez.
+
+    Os anos não se misturam (cada arquivo só tem datas do próprio ano), então basta ordenar
+    dentro de cada arquivo: no máximo um ano fica em memória, e sem passar pelo cache.
+    """
+    coluna = TABELAS_ARQUIVO_FRIO[tabela]
+    for ano in reversed(anos_arquivo_frio()):
+        linhas = [r for r in itera_tabela_fria(ano, tabela) if getattr(r, 'deleted_at', None) is None]
+        linhas.sort(key=lambda r: (getattr(r, coluna), r.id), reverse=True)
+        yield from linhas
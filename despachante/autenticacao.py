@@ -0,0 +1,55 @@
+from datetime import datetime
+from functools import wraps
+
+from flask import g, session, flash, redirect, url_for
+
+# ----------------------------------------------------
+# 3. CONTEXT PROCESSORS E FILTROS DO JINJA
+# ----------------------------------------------------
+# Registrados no app por create_app()
+
+def load_user():
+    g.user = session.get('nome')
+    g.nivel = session.get('nivel_acesso')
+
+def format_date_filter(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            return value
+    return value.strftime('%d/%m/%Y') if hasattr(value, 'strftime') else str(value)
+
+# 🚨 FILTRO ADICIONADO PARA CORRIGIR VALORES NA TELA
+def format_currency_filter(value):
+    if value is None:
+        return 'R$ 0,00'
+    try:
+        value_float = float(value)
+        return "R$ {:,.2f}".format(value_float).replace(',', 'X').replace('.', ',').replace('X', '.')
+    except:
+        return value
+
+# ----------------------------------------------------
+# 4. DECORADORES E FUNÇÕES DE AUTENTICAÇÃO
+# ----------------------------------------------------
+
+def login_required(view):
+    @wraps(view)
+    def wrapped_view(**kwargs):
+        if not session.get('logged_in'):
+            flash('Você precisa fazer login para acessar esta página.', 'error')
+            return redirect(url_for('principal.login'))
+        return view(**kwargs)
+    return wrapped_view
+
+def admin_required(view):
+    @wraps(view)
+    def wrapped_view(**kwargs):
+        if session.get('nivel_acesso') != 'ADMIN':
+            flash('Acesso negado: Apenas administradores podem acessar esta página.', 'error')
+            return redirect(url_for('principal.index'))
+        return view(**kwargs)
+    return wrapped_view
@@ -0,0 +1,156 @@
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from .extensoes import db
+from .modelos import Usuario, Servico, MovimentacaoCaixa, SaldoCliente
+from .helpers import reconstroi_saldos_clientes, preenche_documentos, vincula_veiculos
+from .arquivo_frio import anos_arquivo_frio
+from .catalogo import migra_tipos_servico, tipos_servico
+
+# ----------------------------------------------------
+# 13. INICIALIZAÇÃO E AQUECIMENTO
+# ----------------------------------------------------
+
+def _adiciona_colunas_faltantes():
+    """Faz ALTER TABLE ... ADD COLUMN para colunas novas dos modelos em tabelas já existentes."""
+    from sqlalchemy import inspect, text
+
+    inspetor = inspect(db.engine)
+    adicionadas = []
+    for tabela in db.metadata.sorted_tables:
+        if not inspetor.has_table(tabela.name):
+            continue
+        existentes = {c['name'] for c in inspetor.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in existentes:
+                continue
+            tipo = coluna.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(f'ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}'))
+            adicionadas.append((tabela.name, coluna.name))
+    db.session.commit()
+    return adicionadas
+
+def inicializa_banco():
+    """Cria tabelas/índices/colunas que faltam, popula o livro de saldos e o usuário ADMIN inicial."""
+    db.create_all()
+
+    for tabela, coluna in _adiciona_colunas_faltantes():
+        print(f"Coluna adicionada: {tabela}.{coluna}")
+
+        if (tabela, coluna) == ('movimentacao_caixa', 'deleted_at'):
+            # Antes da exclusão lógica o serviço era apagado e a movimentação ficava órfã
+            # (os relatórios a escondiam linha a linha): marca essas órfãs como excluídas.
+            marcadas = MovimentacaoCaixa.query.filter(
+                MovimentacaoCaixa.referencia_tipo == 'Servico',
+                MovimentacaoCaixa.referencia_id.isnot(None),
+                MovimentacaoCaixa.referencia_id.notin_(db.session.query(Servico.id))
+            ).update({'deleted_at': datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+            print(f"{marcadas} movimentação(ões) órfã(s) marcadas como excluídas.")
+
+        if (tabela, coluna) == ('cliente', 'documento'):
+            # Preenche antes de criar o índice único (mais abaixo); duplicados ficam sem documento
+            preenchidos, duplicados = preenche_documentos()
+            db.session.commit()
+            print(f"{preenchidos} documento(s) preenchido(s).")
+            if duplicados:
+                print(f"{len(duplicados)} cliente(s) com CPF/CNPJ repetido: rode \"flask clientes-deduplicar\".")
+
+        if (tabela, coluna) == ('servico', 'veiculo_id'):
+            criados, vinculados = vincula_veiculos()
+            db.session.commit()
+            print(f"{criados} veículo(s) criado(s) a partir das placas, {vinculados} serviço(s) vinculado(s).")
+
+        if (tabela, coluna) == ('servico', 'tipo_servico_id'):
+            criados, vinculados = migra_tipos_servico()
+            db.session.commit()
+            print(f"{criados} tipo(s) de serviço criado(s) no catálogo, {vinculados} serviço(s) vinculado(s).")
+
+    # create_all não altera tabelas que já existem: cria aqui os índices novos dos modelos
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(db.engine, checkfirst=True)
+
+    # PostgreSQL particionado: garante as partições dos próximos meses
+    if db.engine.dialect.name == 'postgresql':
+        from .comandos.particoes import mantem_particoes
+
+        for nome in mantem_particoes():
+            print(f"Partição criada: {nome}")
+
+    # Primeira execução com o livro de saldos: popula a partir dos serviços existentes
+    if SaldoCliente.query.first() is None and Servico.query.first() is not None:
+        reconstroi_saldos_clientes()
+        db.session.commit()
+        print("Livro de saldos por cliente populado.")
+
+    # Cria um usuário ADMIN se não existir
+    if not Usuario.query.filter_by(login='admin').first():
+        admin_user = Usuario(nome='Administrador', login='admin', nivel_acesso='ADMIN')
+        admin_user.set_senha('123456') # Mude para uma senha forte!
+        db.session.add(admin_user)
+        db.session.commit()
+        print("Usuário ADMIN criado (login: admin, senha: 123456)")
+
+
+def app_descartavel(pasta, uri=None, **config):
+    """App com banco próprio para medições e testes (SQLite em 'pasta' ou 'uri'), já inicializado.
+
+    Nada de cache, métricas, perfil ou log de compressão: o que se mede é só o banco e as rotas.
+    """
+    from . import create_app
+
+    app = create_app(dict({
+        'SQLALCHEMY_DATABASE_URI': uri or f"sqlite:///{os.path.join(pasta, 'descartavel.db')}",
+        'ARQUIVO_FRIO_DIR': os.path.join(pasta, 'arquivo_frio'),
+        'INICIALIZAR_BANCO': False, 'AQUECER': False, 'TESTING': True,
+        'CACHE_RELATORIOS': 'desligado',
+        'METRICAS_ATIVAS': False, 'PERFIL_LENTO_MS': 0, 'COMPRESSAO_LOG': False,
+    }, **config))
+    with app.app_context():
+        inicializa_banco()
+    return app
+
+
+def aquece(app):
+    """Prepara o processo antes da primeira requisição; retorna o tempo de cada etapa (ms).
+
+    Com o preload do gunicorn roda uma vez no master e os workers herdam tudo pelo fork.
+    O pool de conexões fica de fora (aquece_conexoes, chamado em cada worker).
+    """
+    tempos = {}
+    inicio = time.perf_counter()
+
+    def marca(etapa):
+        nonlocal inicio
+        agora = time.perf_counter()
+        tempos[etapa] = (agora - inicio) * 1000
+        inicio = agora
+
+    with app.app_context():
+        configure_mappers()
+        marca('mapeadores')
+        for nome in app.jinja_env.list_templates(filter_func=lambda n: n.endswith('.html')):
+            app.jinja_env.get_template(nome)
+        marca('templates')
+        anos_arquivo_frio()
+        tipos_servico()
+        marca('caches')
+    # Uma requisição completa monta o mapa de URLs, a sessão e os filtros do Jinja
+    app.test_client().get('/login')
+    marca('primeira_requisicao')
+    return tempos
+
+def aquece_conexoes(app, quantidade=None):
+    """Abre (e devolve ao pool) as conexões do worker, para a primeira requisição não pagar o connect."""
+    with app.app_context():
+        tamanho = getattr(db.engine.pool, 'size', lambda: 1)()
+        conexoes = [db.engine.connect() for _ in range(min(quantidade or tamanho, tamanho))]
+        for conexao in conexoes:
+            conexao.execute(text('SELECT 1'))
+            conexao.close()
+    return len(conexoes)
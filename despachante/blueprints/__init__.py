@@ -0,0 +1,5 @@
+from . import principal, clientes, servicos, veiculos, tipos_servico, agenda, caixa, relatorios, colaboradores, importacao, perfis
+
+# Ordem de registro em create_app()
+BLUEPRINTS = (principal.bp, clientes.bp, servicos.bp, veiculos.bp, tipos_servico.bp, agenda.bp, caixa.bp, relatorios.bp,
+              colaboradores.bp, importacao.bp, perfis.bp)
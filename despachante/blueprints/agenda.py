@@ -0,0 +1,95 @@
+"""Blueprint agenda: Vencimentos por dia (página e API) e lista de cobrança do dia."""
+from datetime import datetime, date, timedelta
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+
+from ..extensoes import db
+from ..modelos import ListaCobranca
+from ..autenticacao import login_required, admin_required
+from ..cobranca import consulta_agenda, agenda_por_dia, gera_lista_cobranca
+
+bp = Blueprint('agenda', __name__)
+
+# ----------------------------------------------------
+# 8.3. AGENDA DE VENCIMENTOS E COBRANÇA
+# ----------------------------------------------------
+
+def _periodo_agenda():
+    """(inicio, fim) a partir de ?inicio=AAAA-MM-DD&dias=N (padrão: hoje e 7 dias, no máximo 62)."""
+    try:
+        inicio = datetime.strptime(request.args.get('inicio', ''), '%Y-%m-%d').date()
+    except ValueError:
+        inicio = date.today()
+    dias = request.args.get('dias', '7')
+    dias = min(max(int(dias), 1), 62) if dias.isdigit() else 7
+    return inicio, inicio + timedelta(days=dias - 1), dias
+
+@bp.route('/agenda')
+@login_required
+def agenda_vencimentos():
+    inicio, fim, dias = _periodo_agenda()
+    incluir_vencidos = request.args.get('vencidos', '1') == '1'
+    agenda = agenda_por_dia(consulta_agenda(inicio, fim, incluir_vencidos))
+    return render_template(
+        'agenda.html',
+        agenda=agenda,
+        inicio=inicio,
+        fim=fim,
+        dias=dias,
+        incluir_vencidos=incluir_vencidos,
+        total=sum(d['total'] for d in agenda),
+        hoje=date.today()
+    )
+
+@bp.route('/api/agenda')
+@login_required
+def agenda_vencimentos_api():
+    inicio, fim, _ = _periodo_agenda()
+    agenda = agenda_por_dia(consulta_agenda(inicio, fim, request.args.get('vencidos', '1') == '1'))
+    return jsonify(
+        inicio=inicio.isoformat(),
+        fim=fim.isoformat(),
+        dias=[{
+            'data': d['data'].isoformat(),
+            'vencido': d['vencido'],
+            'total': round(d['total'], 2),
+            'servicos': [{
+                'id': s.id,
+                'cliente_id': s.cliente_id,
+                'cliente': s.cliente,
+                'telefone': s.telefone,
+                'tipo_servico': s.tipo_servico,
+                'placa': s.placa_veiculo,
+                'saldo_pendente': round(s.saldo_pendente or 0.0, 2),
+                'status_pagamento': s.status_pagamento,
+            } for s in d['servicos']]
+        } for d in agenda]
+    )
+
+@bp.route('/cobranca')
+@login_required
+def lista_cobranca():
+    """Tela da manhã: uma leitura da lista gerada à noite (mais atrasados primeiro)."""
+    cobrancas = ListaCobranca.query.order_by(
+        ListaCobranca.dias_atraso.desc(), ListaCobranca.valor_aberto.desc()
+    ).all()
+    return render_template(
+        'cobranca.html',
+        cobrancas=cobrancas,
+        total=sum(c.valor_aberto for c in cobrancas),
+        gerado_em=cobrancas[0].gerado_em if cobrancas else None
+    )
+
+@bp.route('/cobranca/gerar', methods=['POST'])
+@login_required
+@admin_required
+def gerar_lista_cobranca():
+    """Gera a lista na hora (a mesma do "flask cobranca-gerar" da madrugada)."""
+    try:
+        quantidade = gera_lista_cobranca()
+        db.session.commit()
+        flash(f'Lista de cobrança gerada: {quantidade} serviço(s).', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao gerar a lista de cobrança: {e}', 'error')
+    return redirect(url_for('agenda.lista_cobranca'))
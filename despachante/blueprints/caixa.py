@@ -0,0 +1,239 @@
+"""Blueprint caixa: Extrato do caixa, registro de despesas, histórico de movimentações e fechamento."""
+import heapq
+from datetime import datetime, date, timedelta
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from sqlalchemy import select
+
+from ..extensoes import db
+from ..modelos import MovimentacaoCaixa, Despesa, FechamentoCaixa
+from ..autenticacao import login_required, admin_required
+from ..helpers import clean_currency_value, renderiza_em_streaming
+from ..arquivo_frio import registros_arquivados, anos_arquivo_frio, arquivados_recentes_primeiro
+from ..fechamento import (
+    PeriodoFechado, PERIODOS_FECHAMENTO, fecha_caixa, ultimo_fechamento, saldo_caixa, totais_caixa
+)
+
+bp = Blueprint('caixa', __name__)
+
+# ----------------------------------------------------
+# ROTA 10.2 - Visualizar caixa (Corrigida para ignorar registros órfãos)
+# ----------------------------------------------------
+@bp.route('/caixa')
+@login_required
+# ATENÇÃO: admin_required é um decorator que deve ser definido
+# @admin_required 
+def visualizar_caixa():
+    # Importações necessárias (assumindo que datetime e os modelos estão disponíveis)
+    from datetime import datetime
+    # Supondo que MovimentacaoCaixa e Servico já foram importados no escopo global
+    
+    start_date = request.args.get('start_date', '')
+    end_date = request.args.get('end_date', '')
+
+    # Movimentações de serviços excluídos já vêm marcadas: um único predicado indexado
+    query = MovimentacaoCaixa.query.filter(MovimentacaoCaixa.deleted_at.is_(None))
+    sd = ed = None
+
+    # --- Aplicação dos Filtros de Data ---
+    if start_date:
+        try:
+            sd = datetime.strptime(start_date, '%Y-%m-%d').date()
+            query = query.filter(MovimentacaoCaixa.data >= sd)
+        except Exception:
+            pass
+    if end_date:
+        try:
+            ed = datetime.strptime(end_date, '%Y-%m-%d').date()
+            query = query.filter(MovimentacaoCaixa.data <= ed)
+        except Exception:
+            pass
+    # ------------------------------------
+
+    # Período começando depois de um fechamento: o saldo anterior vem pronto da foto
+    # (sem data início o extrato continua mostrando tudo, como sempre foi)
+    fechamento = ultimo_fechamento(sd - timedelta(days=1)) if sd else None
+
+    movimentos = query.order_by(MovimentacaoCaixa.data.desc(), MovimentacaoCaixa.id.desc()).all()
+
+    # Período alcançando anos do arquivo frio: junta as movimentações exportadas
+    arquivados = registros_arquivados('movimentacao_caixa', sd, ed)
+    if arquivados:
+        movimentos = sorted(movimentos + arquivados, key=lambda m: (m.data, m.id), reverse=True)
+
+    extrato = []
+    for m in movimentos:
+        tipo_label = 'ENTRADA' if (m.tipo and m.tipo.lower() == 'entrada') else 'SAÍDA'
+        valor = float(m.valor or 0.0)
+        categoria = m.referencia_tipo or ''
+
+        extrato.append({
+            'data': m.data,
+            'tipo': tipo_label,
+            'descricao': m.descricao or '',
+            'valor': valor,
+            'categoria': categoria
+        })
+
+    # Totais do período pelos fechamentos + SUM só do trecho ainda aberto
+    totais = totais_caixa(sd, ed)
+
+    return render_template(
+        'visualizar_caixa.html',
+        extrato=extrato,
+        total_entradas=totais['entradas'],
+        total_despesas=totais['saidas'],
+        saldo_geral=totais['entradas'] - totais['saidas'],
+        saldo_anterior=totais['saldo_inicial'],
+        saldo_final=totais['saldo_final'],
+        fechamento=fechamento,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+# ----------------------------------------------------
+# ROTA 10.3 - Registrar despesa
+# ----------------------------------------------------
+@bp.route('/despesas/registro', methods=['GET', 'POST'])
+@login_required
+# @admin_required
+def despesa_form():
+    today_iso = date.today().isoformat()
+
+    if request.method == 'POST':
+        try:
+            descricao = request.form.get('descricao', '').strip()
+            # ⭐ CORREÇÃO APLICADA: Usa clean_currency_value
+            valor = clean_currency_value(request.form.get('valor', '0,00')) 
+            data_str = request.form.get('data_pagamento', request.form.get('data', ''))
+            
+            # ✅ NOVO: Coleta a categoria do formulário
+            categoria = request.form.get('categoria', 'OUTRAS') 
+
+            if not descricao or valor <= 0:
+                flash('Preencha a descrição e informe um valor válido.', 'error')
+                return redirect(url_for('caixa.despesa_form'))
+
+            data_obj = datetime.strptime(data_str, '%Y-%m-%d').date() if data_str else date.today()
+
+            # 1. 🟢 CRIAÇÃO DO OBJETO DESPESA (Registro Histórico)
+            nova_despesa = Despesa(
+                data=data_obj,
+                valor=valor,
+                descricao=descricao, # Usa a descrição original
+                categoria=categoria, # Argumento obrigatório
+                paga=True # Assumindo que o registro aqui significa que foi paga
+            )
+            db.session.add(nova_despesa)
+            db.session.flush() # Obtém o ID da despesa (nova_despesa.id) antes do commit
+            
+            # 2. 🟢 CRIAÇÃO DO OBJETO MOVIMENTACAOCAIXA (Movimento Financeiro)
+            # Usa o ID da Despesa como referência
+            movimentacao = MovimentacaoCaixa(
+                data=data_obj,
+                tipo='Saída',
+                valor=valor,
+                # Ajusta a descrição para clareza no extrato
+                descricao=f'Despesa: {descricao} (Categoria: {categoria})', 
+                referencia_id=nova_despesa.id, # Vincula a Despesa recém-criada
+                referencia_tipo='Despesa'
+            )
+            db.session.add(movimentacao)
+            
+            db.session.commit()
+
+            flash('Despesa registrada com sucesso!', 'success')
+            return redirect(url_for('caixa.visualizar_caixa'))
+
+        except PeriodoFechado as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+            return redirect(url_for('caixa.despesa_form'))
+        except ValueError:
+            db.session.rollback()
+            flash('Erro no formato da data ou valor.', 'error')
+            return redirect(url_for('caixa.despesa_form'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao registrar despesa: {e}', 'error')
+            return redirect(url_for('caixa.despesa_form'))
+
+    return render_template('despesa_form.html', today=today_iso)
+
+# ----------------------------------------------------
+# ROTA 10.4 - Histórico de movimentações (em streaming)
+# ----------------------------------------------------
+def _linhas_historico():
+    """Movimentações ativas da mais nova para a mais antiga, lidas em blocos (yield_per) e já no formato da tela."""
+    consulta = select(
+        MovimentacaoCaixa.id, MovimentacaoCaixa.data, MovimentacaoCaixa.tipo, MovimentacaoCaixa.descricao,
+        MovimentacaoCaixa.valor, MovimentacaoCaixa.referencia_tipo
+    ).where(MovimentacaoCaixa.deleted_at.is_(None)).order_by(
+        MovimentacaoCaixa.data.desc(), MovimentacaoCaixa.id.desc()
+    ).execution_options(yield_per=500)
+    registros = db.session.execute(consulta)
+    # Histórico completo inclui os anos do arquivo frio, intercalados pela mesma ordem (um ano em memória por vez)
+    if anos_arquivo_frio():
+        registros = heapq.merge(registros, arquivados_recentes_primeiro('movimentacao_caixa'),
+                                key=lambda r: (r.data, r.id), reverse=True)
+    for r in registros:
+        yield {
+            'data': r.data,
+            'tipo': 'ENTRADA' if (r.tipo and r.tipo.lower() == 'entrada') else 'SAÍDA',
+            'descricao': r.descricao,
+            'valor': float(r.valor or 0.0),
+            'categoria': r.referencia_tipo or ''
+        }
+
+@bp.route('/caixa/historico')
+@login_required
+# @admin_required
+def historico_caixa():
+    # Totais no banco (fechamentos + SUM) antes da primeira linha; as linhas vão saindo enquanto são lidas
+    totais = totais_caixa()
+    return renderiza_em_streaming(
+        'historico_caixa.html',
+        registros=_linhas_historico(),
+        total_entradas=totais['entradas'],
+        total_saidas=totais['saidas'],
+        saldo_atual=saldo_caixa()
+    )
+
+# ----------------------------------------------------
+# ROTA 10.4.1 - Fechamento de caixa (ADMIN)
+# ----------------------------------------------------
+@bp.route('/caixa/fechamento', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def fechamento_caixa():
+    """Fecha o caixa até a data escolhida (padrão: ontem) e lista os fechamentos."""
+    ontem = date.today() - timedelta(days=1)
+
+    if request.method == 'POST':
+        try:
+            ate_str = request.form.get('ate')
+            ate = datetime.strptime(ate_str, '%Y-%m-%d').date() if ate_str else ontem
+            criados = fecha_caixa(ate, request.form.get('periodo', 'dia'), session.get('nome'))
+            db.session.commit()
+            if criados:
+                saldo = f'{criados[-1]["saldo_final"]:.2f}'.replace('.', ',')
+                flash(f'Caixa fechado até {criados[-1]["data_fim"]:%d/%m/%Y} ({len(criados)} período(s)). '
+                      f'Saldo final: R$ {saldo}', 'success')
+            else:
+                flash('Nada a fechar: o caixa já está fechado até essa data.', 'info')
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e) or 'Data inválida.', 'error')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao fechar o caixa: {e}', 'error')
+        return redirect(url_for('caixa.fechamento_caixa'))
+
+    fechamentos = FechamentoCaixa.query.order_by(FechamentoCaixa.data_fim.desc()).limit(90).all()
+    return render_template(
+        'fechamento_caixa.html',
+        fechamentos=fechamentos,
+        periodos=PERIODOS_FECHAMENTO,
+        ontem=ontem.isoformat(),
+        saldo_atual=saldo_caixa()
+    )
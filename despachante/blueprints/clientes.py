@@ -0,0 +1,109 @@
+"""Blueprint clientes: Cadastro, lista e edição de clientes."""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from sqlalchemy.exc import IntegrityError
+
+from ..extensoes import db
+from ..modelos import Cliente, SaldoCliente
+from ..autenticacao import login_required
+from ..helpers import normaliza_documento, formata_documento, somente_digitos
+
+bp = Blueprint('clientes', __name__)
+
+# ----------------------------------------------------
+# 7. ROTAS DE CLIENTES
+# ----------------------------------------------------
+
+@bp.route('/clientes/cadastro', methods=['GET', 'POST'])
+@login_required
+def cliente_cadastro():
+    if request.method == 'POST':
+        try:
+            documento = normaliza_documento(request.form['cpf_cnpj'])
+            novo_cliente = Cliente(
+                nome=request.form['nome'],
+                cpf_cnpj=formata_documento(documento),
+                documento=documento,
+                telefone=request.form.get('telefone'),
+                email=request.form.get('email'),
+                endereco=request.form.get('endereco')
+            )
+            db.session.add(novo_cliente)
+            db.session.commit()
+            flash('Cliente cadastrado com sucesso!', 'success')
+            return redirect(url_for('clientes.clientes_lista'))
+        except IntegrityError:
+            db.session.rollback()
+            flash('CPF/CNPJ já cadastrado no sistema.', 'error')
+        except ValueError as e:
+            flash(str(e), 'error')
+        except Exception as e:
+            flash(f'Erro ao cadastrar cliente: {e}', 'error')
+            
+    return render_template('cliente_cadastro.html')
+
+@bp.route('/clientes/lista')
+@login_required
+def clientes_lista():
+    # Saldo em aberto vem do livro SaldoCliente (uma linha por cliente), sem varrer Servico
+    clientes = db.session.query(Cliente, SaldoCliente).outerjoin(
+        SaldoCliente, SaldoCliente.cliente_id == Cliente.id
+    ).order_by(Cliente.id.desc()).all()
+    return render_template('clientes_lista.html', clientes=clientes)
+    
+@bp.route('/clientes/editar/<int:cliente_id>', methods=['GET', 'POST'])
+@login_required
+def cliente_edicao(cliente_id):
+    cliente = Cliente.query.get_or_404(cliente_id)
+    
+    if request.method == 'POST':
+        try:
+            documento = normaliza_documento(request.form['cpf_cnpj'])
+            cliente.nome = request.form['nome']
+            cliente.cpf_cnpj = formata_documento(documento)
+            cliente.documento = documento
+            cliente.telefone = request.form.get('telefone')
+            cliente.email = request.form.get('email')
+            cliente.endereco = request.form.get('endereco') 
+            
+            db.session.commit()
+            flash(f'Cliente "{cliente.nome}" atualizado com sucesso!', 'success')
+            return redirect(url_for('clientes.clientes_lista'))
+            
+        except IntegrityError:
+            db.session.rollback()
+            flash('Erro: CPF/CNPJ já cadastrado para outro cliente.', 'error')
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar cliente: {e}', 'error')
+            
+    return render_template('clientes_edicao.html', cliente=cliente)
+
+@bp.route('/clientes/buscar')
+@login_required
+def clientes_buscar():
+    """Busca exata por CPF/CNPJ (?doc=, com ou sem pontuação) pelo índice único de Cliente.documento."""
+    documento = somente_digitos(request.args.get('doc'))
+    if len(documento) not in (11, 14):
+        return jsonify(erro='Informe um CPF (11 dígitos) ou CNPJ (14 dígitos).'), 400
+
+    linha = db.session.query(Cliente, SaldoCliente).outerjoin(
+        SaldoCliente, SaldoCliente.cliente_id == Cliente.id
+    ).filter(Cliente.documento == documento).first()
+    if linha is None:
+        return jsonify(erro='Cliente não encontrado.', documento=documento), 404
+
+    cliente, saldo = linha
+    return jsonify(
+        id=cliente.id,
+        nome=cliente.nome,
+        cpf_cnpj=cliente.cpf_cnpj,
+        documento=cliente.documento,
+        telefone=cliente.telefone,
+        email=cliente.email,
+        saldo_aberto=saldo.saldo_aberto if saldo else 0.0,
+        servicos_abertos=saldo.servicos_abertos if saldo else 0,
+        url=url_for('clientes.cliente_edicao', cliente_id=cliente.id)
+    )
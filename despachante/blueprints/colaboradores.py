@@ -0,0 +1,97 @@
+"""Blueprint colaboradores: Cadastro e lista de colaboradores (ADMIN)."""
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+
+from ..extensoes import db
+from ..modelos import Usuario
+from ..autenticacao import login_required, admin_required
+
+bp = Blueprint('colaboradores', __name__)
+
+# -----------------------------------------------
+# 11. ROTAS DE COLABORADORES/ADMIN (Nenhuma alteração aqui)
+# ----------------------------------------------------
+
+# Cadastro e Edição de Colaborador (ADMIN)
+@bp.route('/colaborador/cadastro', methods=['GET', 'POST'])
+@bp.route('/colaborador/cadastro/<int:usuario_id>', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def colaborador_cadastro(usuario_id=None):
+    """
+    Rota unificada para cadastro e edição de colaboradores.
+    Se 'usuario_id' for fornecido, realiza edição; caso contrário, cadastro novo.
+    Apenas ADMIN tem acesso.
+    """
+    usuario = None
+    if usuario_id:
+        usuario = Usuario.query.get_or_404(usuario_id)
+
+    if request.method == 'POST':
+        nome = request.form.get('nome')
+        login_user = request.form.get('login')
+        senha = request.form.get('senha')
+        nivel_acesso = request.form.get('nivel_acesso', 'COLABORADOR').upper()
+
+        # Validação básica de campos obrigatórios
+        if not nome or not login_user:
+            flash('Preencha todos os campos obrigatórios.', 'error')
+            return redirect(request.url)
+
+        # Verifica se o login já existe para outro usuário
+        login_existente = Usuario.query.filter_by(login=login_user).first()
+        if login_existente and (not usuario or login_existente.id != usuario.id):
+            flash('Login já existe para outro colaborador.', 'error')
+            return redirect(request.url)
+
+        if usuario:
+            # Edição de usuário existente
+            usuario.nome = nome
+            usuario.login = login_user
+            usuario.nivel_acesso = nivel_acesso
+            if senha:
+                usuario.set_senha(senha)  # Atualiza senha somente se informada
+            try:
+                db.session.commit()
+                flash(f'Colaborador "{usuario.nome}" atualizado com sucesso!', 'success')
+            except Exception as e:
+                db.session.rollback()
+                flash(f'Erro ao atualizar colaborador: {e}', 'error')
+        else:
+            # Novo cadastro
+            try:
+                novo_usuario = Usuario(
+                    nome=nome,
+                    login=login_user,
+                    nivel_acesso=nivel_acesso
+                )
+                novo_usuario.set_senha(senha)
+                db.session.add(novo_usuario)
+                db.session.commit()
+                flash(f'Colaborador "{nome}" cadastrado com sucesso!', 'success')
+            except Exception as e:
+                db.session.rollback()
+                flash(f'Erro ao cadastrar colaborador: {e}', 'error')
+                return redirect(request.url)
+
+        return redirect(url_for('colaboradores.colaborador_lista'))
+
+    # Renderiza o template de cadastro/edição, passando 'usuario' para preencher os campos
+    return render_template('colaborador_cadastro.html', usuario=usuario)
+
+
+# Lista de todos os colaboradores (ADMIN)
+@bp.route('/colaboradores', methods=['GET'])
+@login_required
+@admin_required
+def colaborador_lista():
+    """
+    Exibe todos os colaboradores cadastrados.
+    Apenas ADMIN pode acessar.
+    """
+    try:
+        usuarios = Usuario.query.order_by(Usuario.id.desc()).all()  # Lista do mais recente para o mais antigo
+    except Exception as e:
+        flash(f'Erro ao carregar lista de colaboradores: {e}', 'error')
+        usuarios = []
+
+    return render_template('colaborador_lista.html', usuarios=usuarios)
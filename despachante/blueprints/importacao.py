@@ -0,0 +1,58 @@
+"""Blueprint importacao: Upload de CSV de clientes, serviços e pagamentos (ADMIN)."""
+import io
+import os
+import uuid
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, flash, current_app, send_from_directory
+
+from ..autenticacao import login_required, admin_required
+from ..importacao import importa_csv, TIPOS_IMPORTACAO
+
+bp = Blueprint('importacao', __name__)
+
+# ----------------------------------------------------
+# 11.1. IMPORTAÇÃO EM LOTE (ADMIN)
+# ----------------------------------------------------
+
+@bp.route('/importacao', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def importacao():
+    """Recebe o CSV e importa lendo o upload em streaming; arquivos muito grandes: "flask importar"."""
+    resultado = None
+    if request.method == 'POST':
+        tipo = request.form.get('tipo')
+        arquivo = request.files.get('arquivo')
+        if tipo not in TIPOS_IMPORTACAO or not arquivo or not arquivo.filename:
+            flash('Escolha o tipo de importação e o arquivo CSV.', 'error')
+            return redirect(request.url)
+
+        pasta = current_app.config['IMPORTACAO_DIR']
+        os.makedirs(pasta, exist_ok=True)
+        nome_erros = f"erros-{tipo}-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.csv"
+        caminho_erros = os.path.join(pasta, nome_erros)
+
+        try:
+            entrada = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+            with open(caminho_erros, 'w', encoding='utf-8-sig', newline='') as erros:
+                resultado = importa_csv(tipo, entrada, erros)
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f'Arquivo não importado: {e}', 'error')
+            return redirect(request.url)
+
+        resultado['tipo'] = tipo
+        resultado['arquivo_erros'] = nome_erros if resultado['rejeitadas'] else None
+        if not resultado['rejeitadas']:
+            os.remove(caminho_erros)
+        flash(f"{resultado['importadas']} linha(s) importada(s), {resultado['rejeitadas']} rejeitada(s).",
+              'success' if not resultado['rejeitadas'] else 'error')
+
+    return render_template('importacao.html', tipos=TIPOS_IMPORTACAO, resultado=resultado)
+
+@bp.route('/importacao/erros/<nome>')
+@login_required
+@admin_required
+def importacao_erros(nome):
+    """Download do relatório de linhas rejeitadas (send_from_directory não sai da pasta)."""
+    return send_from_directory(current_app.config['IMPORTACAO_DIR'], nome, as_attachment=True)
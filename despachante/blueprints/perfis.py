@@ -0,0 +1,59 @@
+"""Blueprint perfis: Capturas do perfilador de requisições lentas (ADMIN)."""
+import os
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory, abort
+
+from ..autenticacao import login_required, admin_required
+from ..perfilador import lista_capturas, resumo_captura
+
+bp = Blueprint('perfis', __name__)
+
+# ----------------------------------------------------
+# 11.2. PERFIS DE REQUISIÇÕES (ADMIN)
+# ----------------------------------------------------
+
+def _captura(captura_id):
+    for meta in lista_capturas(current_app.config['PERFIL_DIR']):
+        if meta['id'] == captura_id:
+            return meta
+    abort(404)
+
+@bp.route('/perfis')
+@login_required
+@admin_required
+def lista_perfis():
+    """Capturas do anel (mais novas primeiro) com o tempo separado por categoria."""
+    capturas = lista_capturas(current_app.config['PERFIL_DIR'])
+    selecionada = _captura(request.args['id']) if request.args.get('id') else None
+    return render_template(
+        'perfis.html',
+        capturas=capturas,
+        selecionada=selecionada,
+        resumo=resumo_captura(current_app.config['PERFIL_DIR'], selecionada) if selecionada else None,
+        limite_ms=current_app.config['PERFIL_LENTO_MS'],
+        maximo=current_app.config['PERFIL_MAX_CAPTURAS']
+    )
+
+@bp.route('/perfis/<captura_id>/arquivo')
+@login_required
+@admin_required
+def baixar_perfil(captura_id):
+    """.prof (cProfile: snakeviz / pstats) ou .txt (pilhas colapsadas: flamegraph.pl / speedscope)."""
+    meta = _captura(captura_id)
+    return send_from_directory(current_app.config['PERFIL_DIR'], meta['arquivo'], as_attachment=True)
+
+@bp.route('/perfis/limpar', methods=['POST'])
+@login_required
+@admin_required
+def limpar_perfis():
+    diretorio = current_app.config['PERFIL_DIR']
+    removidas = 0
+    for meta in lista_capturas(diretorio):
+        for nome in (meta['id'] + '.json', meta['arquivo']):
+            try:
+                os.remove(os.path.join(diretorio, nome))
+            except FileNotFoundError:
+                pass
+        removidas += 1
+    flash(f'{removidas} captura(s) removida(s).', 'success')
+    return redirect(url_for('perfis.lista_perfis'))
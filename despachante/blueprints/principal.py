@@ -0,0 +1,90 @@
+"""Blueprint principal: Login/logout e dashboard."""
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from sqlalchemy import func
+
+from ..extensoes import db
+from ..modelos import Usuario, Cliente, Servico, MovimentacaoCaixa
+from ..autenticacao import login_required
+from ..metricas import conta
+
+bp = Blueprint('principal', __name__)
+
+# ----------------------------------------------------
+# 5. ROTAS DE LOGIN/LOGOUT
+# ----------------------------------------------------
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        login_id = request.form['login']
+        senha = request.form['senha']
+        
+        usuario = Usuario.query.filter_by(login=login_id).first()
+        
+        if usuario and usuario.check_senha(senha):
+            session['logged_in'] = True
+            session['user_id'] = usuario.id
+            session['nome'] = usuario.nome
+            session['nivel_acesso'] = usuario.nivel_acesso
+            conta('despachante_login_tentativas_total', resultado='sucesso')
+            flash(f'Bem-vindo(a), {usuario.nome}!', 'success')
+            return redirect(url_for('principal.index'))
+        else:
+            conta('despachante_login_tentativas_total', resultado='falha')
+            flash('Login ou senha incorretos.', 'error')
+    
+    return render_template('login.html')
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    flash('Você saiu do sistema.', 'info')
+    return redirect(url_for('principal.login'))
+
+# ----------------------------------------------------
+# 6. ROTAS DO DASHBOARD
+# ----------------------------------------------------
+
+@bp.route('/')
+@bp.route('/index')
+@login_required
+def index():
+    servicos_andamento = Servico.query.filter(
+        Servico.deleted_at.is_(None),
+        Servico.status_processo.in_(['Em Andamento', 'Aguardando Retirada'])
+    ).count()
+
+    total_clientes = Cliente.query.count()
+    
+    total_a_receber_obj = db.session.query(
+        func.sum(Servico.saldo_pendente)
+    ).filter(
+        Servico.deleted_at.is_(None),
+        Servico.status_pagamento.in_(['A Cobrar', 'Parcial'])
+    ).scalar()
+    total_a_receber = total_a_receber_obj if total_a_receber_obj is not None else 0.0
+
+    primeiro_dia_mes = datetime.today().replace(day=1).date()
+    faturamento_mes_obj = db.session.query(
+        func.sum(MovimentacaoCaixa.valor)
+    ).filter(
+        MovimentacaoCaixa.deleted_at.is_(None),
+        MovimentacaoCaixa.tipo == 'Entrada',
+        MovimentacaoCaixa.data >= primeiro_dia_mes
+    ).scalar()
+    faturamento_mes = faturamento_mes_obj if faturamento_mes_obj is not None else 0.0
+
+    servicos_recentes = Servico.query.join(Cliente).filter(Servico.deleted_at.is_(None)).with_entities(
+        Servico.id, Servico.tipo_servico, Servico.status_processo, Cliente.nome.label('cliente')
+    ).order_by(Servico.data_servico.desc()).limit(5).all()
+
+    return render_template(
+        'index.html',
+        servicos_andamento=servicos_andamento,
+        total_clientes=total_clientes,
+        total_a_receber=total_a_receber,
+        faturamento_mes=faturamento_mes,
+        servicos_recentes=servicos_recentes
+    )
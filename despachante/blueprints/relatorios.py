@@ -0,0 +1,531 @@
+"""Blueprint relatorios: Relatórios (débitos, despesas, fluxo de caixa) e exportações em PDF."""
+from types import SimpleNamespace
+
+from flask import Blueprint, render_template, request, flash, Response, jsonify
+from sqlalchemy import or_
+
+from ..extensoes import db
+from ..modelos import Cliente, Servico, MovimentacaoCaixa, Despesa
+from ..autenticacao import login_required, admin_required
+from ..helpers import pede_fragmento, renderiza_fragmento
+from ..arquivo_frio import registros_arquivados
+from ..catalogo import tipos_servico, filtro_tipo_servico, chave_tipo
+from ..pdf import gera_pdf_debitos
+from ..cache_resultados import cache_resultado, estatisticas_cache
+from ..metricas import mede
+
+bp = Blueprint('relatorios', __name__)
+
+# ----------------------------------------------------
+# ROTA 10.5 - Relatórios Débitos (Contas a Receber) - CORRIGIDA
+# ----------------------------------------------------
+
+@cache_resultado('servico', 'cliente')
+def _dados_debitos(cliente_id, placa, data_inicio, data_fim):
+    """Débitos (serviços com saldo) já no formato do template e o total."""
+    from sqlalchemy import func
+
+    # A condição principal: Valor Total > Valor Recebido
+    query = db.session.query(
+        Servico.id, Servico.data_servico, Servico.placa_veiculo, Servico.tipo_servico,
+        Servico.valor_total, Servico.valor_recebido, Cliente.nome.label('cliente_nome')
+    ).join(Cliente, Servico.cliente_id == Cliente.id).filter(
+        Servico.deleted_at.is_(None), Servico.valor_total > Servico.valor_recebido
+    )
+    if cliente_id:
+        query = query.filter(Servico.cliente_id == cliente_id)
+    if placa:
+        # Garante que a busca por placa seja insensível a maiúsculas/minúsculas
+        query = query.filter(func.lower(Servico.placa_veiculo).like(f"%{placa.lower()}%"))
+    if data_inicio:
+        query = query.filter(Servico.data_servico >= data_inicio)
+    if data_fim:
+        query = query.filter(Servico.data_servico <= data_fim)
+
+    debitos = []
+    for s in query.order_by(Servico.data_servico.asc()):
+        debitos.append({
+            'id': s.id,
+            'cliente_nome': s.cliente_nome,
+            'data_servico': s.data_servico,
+            'placa_veiculo': s.placa_veiculo,
+            'tipo_servico': s.tipo_servico,
+            'valor_total': s.valor_total,
+            'valor_recebido': s.valor_recebido,
+            'saldo_devedor': s.valor_total - s.valor_recebido,
+        })
+    return debitos, sum(d['saldo_devedor'] for d in debitos)
+
+@bp.route("/relatorios/debitos", methods=["GET"])
+@login_required
+def relatorio_debitos():
+    from datetime import datetime
+
+    # --- 1. Captura e Tratamento dos Filtros ---
+    cliente_id_str = request.args.get("cliente_id")
+    placa = request.args.get("placa")
+    data_inicio_str = request.args.get("data_inicio")
+    data_fim_str = request.args.get("data_fim")
+
+    # Função auxiliar para parsear datas
+    def parse_date(date_str):
+        try:
+            return datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else None
+        except ValueError:
+            return None
+
+    data_inicio = parse_date(data_inicio_str)
+    data_fim = parse_date(data_fim_str)
+    
+    # Tentativa de conversão para int, se não for vazio
+    cliente_id = int(cliente_id_str) if cliente_id_str and cliente_id_str.isdigit() else None
+    
+    # --- 2 a 4. Consulta (em cache por filtros + versão de servico/cliente) ---
+    debitos, total_debitos = _dados_debitos(cliente_id, placa or None, data_inicio, data_fim)
+
+    # Modo fragmento: só total e tabela, sem a lista de clientes do filtro
+    if pede_fragmento():
+        return renderiza_fragmento('parciais/relatorio_debitos_resultados.html',
+                                   debitos=debitos, total_debitos=total_debitos)
+        
+    # --- 5. Dados Auxiliares e Renderização ---
+    clientes = Cliente.query.order_by(Cliente.nome).all()
+    
+    # Prepara o nome do cliente para o cabeçalho de impressão, se filtrado
+    selected_cliente_nome = next((c.nome for c in clientes if c.id == cliente_id), None)
+
+    return render_template(
+        "relatorio_debitos.html",
+        clientes=clientes,
+        debitos=debitos,
+        total_debitos=total_debitos,
+        # Variáveis de retorno dos filtros
+        selected_cliente_id=cliente_id_str,
+        selected_placa=placa,
+        selected_data_inicio=data_inicio_str,
+        selected_data_fim=data_fim_str,
+        selected_cliente_nome=selected_cliente_nome,
+        today=datetime.now().date()
+    )
+
+
+# ----------------------------------------------------
+# ROTA 10.6 - Relatorio de Despesas - CORRIGIDA
+# ----------------------------------------------------
+@cache_resultado('despesa')
+def _dados_despesas(categoria, data_inicio, data_fim):
+    """Despesas do período (mais recentes primeiro) como SimpleNamespace, e o total."""
+    query = db.session.query(Despesa.id, Despesa.data, Despesa.descricao, Despesa.categoria, Despesa.valor)
+    if categoria:
+        query = query.filter(Despesa.categoria == categoria)
+    if data_inicio:
+        query = query.filter(Despesa.data >= data_inicio)
+    if data_fim:
+        query = query.filter(Despesa.data <= data_fim)
+    despesas = [SimpleNamespace(**d._asdict()) for d in query.order_by(Despesa.data.desc())]
+
+    # Anos do arquivo frio alcançados pelo período
+    arquivadas = [d for d in registros_arquivados('despesa', data_inicio, data_fim)
+                  if not categoria or d.categoria == categoria]
+    if arquivadas:
+        despesas = sorted(despesas + arquivadas, key=lambda d: d.data, reverse=True)
+    return despesas, sum(d.valor for d in despesas)
+
+@bp.route('/relatorios/despesas', methods=['GET'])
+@login_required
+def relatorio_despesas():
+    from datetime import datetime
+    
+    # Parâmetros de Filtro
+    data_inicio_str = request.args.get('data_inicio')
+    data_fim_str = request.args.get('data_fim')
+    categoria_filtro = request.args.get('categoria')
+    
+    data_inicio = data_fim = None
+    try:
+        if data_inicio_str:
+            data_inicio = datetime.strptime(data_inicio_str, '%Y-%m-%d').date()
+        if data_fim_str:
+            data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d').date()
+    except ValueError:
+        flash('Formato de data inválido.', 'error')
+
+    # 1 a 3. Consulta (em cache por filtros + versão de despesa), com os anos do arquivo frio
+    despesas, total_despesas = _dados_despesas((categoria_filtro or '').strip() or None, data_inicio, data_fim)
+
+    # Modo fragmento: só resumo e tabela, sem a consulta de categorias
+    if pede_fragmento():
+        return renderiza_fragmento('parciais/relatorio_despesas_resultados.html',
+                                   despesas=despesas, total_despesas=total_despesas)
+
+    try:
+        # Assumindo que db.session e Despesa estão acessíveis
+        categorias_unicas = db.session.query(Despesa.categoria).distinct().all()
+        categorias = sorted([c[0] for c in categorias_unicas if c[0]])
+    except Exception:
+        categorias = []
+    
+    # CORREÇÃO: Chamando um template 'relatorio_despesas.html' (assumindo que seja esse o nome)
+    return render_template(
+        'relatorio_despesas.html', # Certifique-se de que este template existe na raiz 'templates/'
+        despesas=despesas,
+        categorias=categorias,
+        selected_categoria=categoria_filtro,
+        selected_data_inicio=data_inicio_str,
+        selected_data_fim=data_fim_str,
+        total_despesas=total_despesas
+    )
+
+# ----------------------------------------------------
+# ROTA 10.7 - Relatório Gerencial / Faturamento (CORRIGIDA)
+# ----------------------------------------------------
+@cache_resultado('servico', 'cliente', 'movimentacao_caixa', 'despesa', 'tipo_servico')
+def _dados_fluxo_caixa(data_inicio, data_fim, cliente_id, tipo_servico):
+    """Serviços, movimentações e despesas do período (SimpleNamespace) e os totais do relatório gerencial."""
+    # --- 3. Consultas principais (colunas do template; nome do cliente no JOIN, sem lazy load) ---
+    query_servicos = db.session.query(
+        Servico.id, Servico.cliente_id, Servico.data_servico, Servico.tipo_servico, Servico.valor_total,
+        Servico.valor_recebido, Servico.status_pagamento, Servico.status_processo, Cliente.nome.label('cliente_nome')
+    ).join(Cliente, Servico.cliente_id == Cliente.id).filter(Servico.deleted_at.is_(None))
+    query_mov = db.session.query(
+        MovimentacaoCaixa.id, MovimentacaoCaixa.data, MovimentacaoCaixa.tipo, MovimentacaoCaixa.valor,
+        MovimentacaoCaixa.descricao, MovimentacaoCaixa.referencia_tipo, MovimentacaoCaixa.referencia_id
+    ).filter(MovimentacaoCaixa.deleted_at.is_(None))
+    query_despesas = db.session.query(
+        Despesa.id, Despesa.data, Despesa.descricao, Despesa.categoria, Despesa.valor, Despesa.paga
+    )
+
+    # --- 4. Aplicação dos filtros ---
+    
+    if data_inicio:
+        query_servicos = query_servicos.filter(Servico.data_servico >= data_inicio)
+        query_mov = query_mov.filter(MovimentacaoCaixa.data >= data_inicio)
+        query_despesas = query_despesas.filter(Despesa.data >= data_inicio)
+
+    if data_fim:
+        query_servicos = query_servicos.filter(Servico.data_servico <= data_fim)
+        query_mov = query_mov.filter(MovimentacaoCaixa.data <= data_fim)
+        query_despesas = query_despesas.filter(Despesa.data <= data_fim)
+
+    # Filtros de Cliente e Tipo SÓ se aplicam a 'Servico'
+    if cliente_id:
+        query_servicos = query_servicos.filter(Servico.cliente_id == cliente_id)
+        # Movimentos que não são de Serviço continuam; os de Serviço só se forem do cliente
+        query_mov = query_mov.outerjoin(
+            Servico, (MovimentacaoCaixa.referencia_tipo == 'Servico') & (Servico.id == MovimentacaoCaixa.referencia_id)
+        ).filter(or_(
+            MovimentacaoCaixa.referencia_tipo.is_(None),
+            MovimentacaoCaixa.referencia_tipo != 'Servico',
+            Servico.cliente_id == cliente_id
+        ))
+
+    if tipo_servico:
+        query_servicos = query_servicos.filter(filtro_tipo_servico(tipo_servico))
+
+    # --- 5. Execução das consultas ---
+    servicos = [SimpleNamespace(cliente=SimpleNamespace(nome=s.cliente_nome), **s._asdict()) for s in query_servicos]
+    movimentacoes = [SimpleNamespace(**m._asdict()) for m in query_mov] # Órfãs já ficam de fora pelo filtro deleted_at
+    despesas = [SimpleNamespace(**d._asdict()) for d in query_despesas] # Despesas avulsas filtradas por data
+
+    # --- 5.1 Anos do arquivo frio alcançados pelo período (mesmos filtros, em memória) ---
+    servicos_arquivados = registros_arquivados('servico', data_inicio, data_fim)
+    movimentacoes_arquivadas = registros_arquivados('movimentacao_caixa', data_inicio, data_fim)
+    if cliente_id:
+        do_cliente = {s.id for s in registros_arquivados('servico') if str(s.cliente_id) == str(cliente_id)}
+        servicos_arquivados = [s for s in servicos_arquivados if s.id in do_cliente]
+        movimentacoes_arquivadas = [m for m in movimentacoes_arquivadas
+                                    if m.referencia_tipo != 'Servico' or m.referencia_id in do_cliente]
+    if tipo_servico:
+        servicos_arquivados = [s for s in servicos_arquivados if chave_tipo(s.tipo_servico) == chave_tipo(tipo_servico)]
+    servicos += servicos_arquivados
+    movimentacoes += movimentacoes_arquivadas
+    despesas += registros_arquivados('despesa', data_inicio, data_fim)
+        
+       # --- 6. Cálculos consolidados ---
+    total_clientes = len(set(s.cliente_id for s in servicos))
+    total_servicos = len(servicos)
+
+    total_faturado = sum(s.valor_total for s in servicos)
+    total_recebido = sum(s.valor_recebido for s in servicos)
+    total_pendente = total_faturado - total_recebido
+
+    # Cálculos a partir da lista 'movimentacoes' FILTRADA
+    # 🚀 CORREÇÃO: Incluir movimentos que são do tipo 'entrada' OU que são referenciados a um Serviço.
+    total_entradas = sum(m.valor for m in movimentacoes if m.tipo and (
+        'entrada' in m.tipo.lower() or m.referencia_tipo == 'Servico'
+    ))
+    
+    total_saidas_caixa = sum(m.valor for m in movimentacoes if m.tipo and 'saida' in m.tipo.lower())
+    
+    # ✅ 1. Calcular o total de Despesas da tabela Despesa
+    total_despesas_avulsas = sum(d.valor for d in despesas)
+
+    # ✅ 2. O Total de Saídas (Soma das Saídas do Caixa + Despesas Avulsas)
+    total_saidas_geral = total_saidas_caixa + total_despesas_avulsas 
+
+    # ✅ 3. O saldo líquido subtrai o TOTAL de saídas
+    saldo_liquido = total_entradas - total_saidas_geral
+
+    return {
+        'servicos': servicos,
+        'movimentacoes': movimentacoes,
+        'despesas': despesas,
+        'total_clientes': total_clientes,
+        'total_servicos': total_servicos,
+        'total_faturado': total_faturado,
+        'total_recebido': total_recebido,
+        'total_pendente': total_pendente,
+        'total_entradas': total_entradas,
+        'total_saidas': total_saidas_geral,
+        'saldo_liquido': saldo_liquido,
+    }
+
+@bp.route("/relatorios/fluxo_caixa", methods=["GET", "POST"])
+@login_required
+def relatorio_fluxo_caixa():
+    from datetime import datetime
+    from sqlalchemy import func
+
+    # --- 1. Captura dos filtros do formulário ---
+    data_inicio = request.form.get("data_inicio") or request.args.get("data_inicio")
+    data_fim = request.form.get("data_fim") or request.args.get("data_fim")
+    cliente_id = request.form.get("cliente_id") or request.args.get("cliente_id")
+    tipo_servico = request.form.get("tipo_servico") or request.args.get("tipo_servico")
+
+    # --- 2. Conversão segura das datas ---
+    def parse_date(date_str):
+        try:
+            return datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else None
+        except Exception:
+            return None
+
+    data_inicio = parse_date(data_inicio)
+    data_fim = parse_date(data_fim)
+
+    # --- 3 a 6. Consultas e totais (em cache por filtros + versão das tabelas lidas) ---
+    dados = _dados_fluxo_caixa(data_inicio, data_fim, int(cliente_id) if cliente_id and cliente_id.isdigit() else None,
+                               tipo_servico or None)
+
+    # --- 7. Dados auxiliares para filtros ---
+    clientes = Cliente.query.all()
+    tipos_servicos = [t.nome for t in tipos_servico()] # Catálogo em memória, sem DISTINCT em servico
+
+    # --- 8. Renderização (E CORREÇÃO NA VARIÁVEL ENVIADA) ---
+    return render_template(
+        "relatorio_faturamento.html",
+        clientes=clientes,
+        tipos_servicos=tipos_servicos,
+        **dados,
+        data_inicio=data_inicio.strftime("%Y-%m-%d") if data_inicio else "",
+        data_fim=data_fim.strftime("%Y-%m-%d") if data_fim else "",
+        cliente_id=int(cliente_id) if cliente_id and cliente_id.isdigit() else None,
+        tipo_servico=tipo_servico or ""
+    )
+
+# ----------------------------------------------------
+# ROTA 10.8 - Exportar Relatório de Débitos em PDF
+# ----------------------------------------------------
+@bp.route("/exportar_debitos_pdf", methods=["GET"])
+@login_required
+def exportar_debitos_pdf():
+    from datetime import datetime
+    from sqlalchemy import func
+    
+    # --- 1. Captura e Tratamento dos Filtros ---
+    cliente_id_str = request.args.get("cliente_id")
+    placa = request.args.get("placa")
+    data_inicio_str = request.args.get("data_inicio")
+    data_fim_str = request.args.get("data_fim")
+    
+    # Função auxiliar para parsear datas
+    def parse_date(date_str):
+        try:
+            return datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else None
+        except ValueError:
+            return None
+
+    data_inicio = parse_date(data_inicio_str)
+    data_fim = parse_date(data_fim_str)
+    cliente_id = int(cliente_id_str) if cliente_id_str and cliente_id_str.isdigit() else None
+    
+    # --- 2. Construção da Consulta Base (Somente Débitos) ---
+    query = Servico.query.join(Cliente).filter(
+        Servico.deleted_at.is_(None), Servico.valor_total > Servico.valor_recebido
+    ).with_entities(
+        Servico.id,
+        Servico.data_servico,
+        Servico.placa_veiculo,
+        Servico.tipo_servico,
+        Servico.valor_total,
+        Servico.valor_recebido,
+        (Servico.valor_total - Servico.valor_recebido).label('saldo_devedor'),
+        Servico.status_processo, 
+        Cliente.nome.label('cliente_nome'),
+        Cliente.cpf_cnpj.label('cliente_doc'),
+        Cliente.id.label('cliente_id')
+    )
+
+    # --- 3. Aplicação dos Filtros Adicionais ---
+    if cliente_id:
+        query = query.filter(Servico.cliente_id == cliente_id)
+        
+    if placa:
+        query = query.filter(func.lower(Servico.placa_veiculo).like(f"%{placa.lower()}%"))
+
+    if data_inicio:
+        query = query.filter(Servico.data_servico >= data_inicio)
+
+    if data_fim:
+        query = query.filter(Servico.data_servico <= data_fim)
+
+    # --- 4. Execução da Consulta e Preparação dos Dados ---
+    debitos_raw = query.order_by(Servico.cliente_id, Servico.data_servico.asc()).all()
+
+    # --- Coleta de Dados do Cliente Selecionado (para Cabeçalho) ---
+    cliente_info_extra = None
+
+    if cliente_id:
+        cliente_obj = Cliente.query.get(cliente_id)
+        if cliente_obj:
+            cliente_info_extra = {
+                'nome': cliente_obj.nome,
+                'cpf_cnpj': cliente_obj.cpf_cnpj,
+                'endereco': cliente_obj.endereco,
+                'telefone': cliente_obj.telefone,
+                'email': cliente_obj.email,
+            }
+
+    # --- 5. Geração do PDF Formal (função compartilhada com o lote mensal) ---
+    with mede('despachante_pdf_duracao_segundos', relatorio='debitos'):
+        pdf = gera_pdf_debitos(
+            [dict(row._mapping) for row in debitos_raw],
+            cliente=cliente_info_extra,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            por_cliente=bool(cliente_id)
+        )
+
+    return Response(
+        pdf,
+        mimetype="application/pdf",
+        headers={
+            "Content-Disposition": "inline; filename=cobranca_debitos.pdf"
+        }
+    )
+
+# ----------------------------------------------------
+# ROTA 10.9 - Exportar Relatório Gerencial em PDF
+# ----------------------------------------------------
+@bp.route("/exportar_relatorio_pdf", methods=["POST"])
+@login_required
+def exportar_relatorio_pdf():
+    from datetime import datetime
+    from io import BytesIO
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib import colors
+
+    # --- 1. Captura dos filtros do formulário ---
+    data_inicio = request.form.get("data_inicio")
+    data_fim = request.form.get("data_fim")
+    cliente_id = request.form.get("cliente_id")
+    tipo_servico = request.form.get("tipo_servico")
+
+    def parse_date(date_str):
+        try:
+            return datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else None
+        except Exception:
+            return None
+
+    data_inicio = parse_date(data_inicio)
+    data_fim = parse_date(data_fim)
+
+    # --- 2 e 3. Mesmos dados e totais da tela (arquivo frio incluído, nome do cliente no JOIN) ---
+    dados = _dados_fluxo_caixa(data_inicio, data_fim, int(cliente_id) if cliente_id and cliente_id.isdigit() else None,
+                               tipo_servico or None)
+    servicos = dados['servicos']
+    total_faturado = dados['total_faturado']
+    total_recebido = dados['total_recebido']
+    total_entradas = dados['total_entradas']
+    total_saidas_geral = dados['total_saidas'] # Saídas do caixa + despesas avulsas
+    saldo_liquido = dados['saldo_liquido']
+
+    # --- 4. Criação do PDF ---
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*cm, bottomMargin=1*cm)
+    styles = getSampleStyleSheet()
+    story = []
+
+    story.append(Paragraph("<b>Relatório Gerencial - Despachante Machado</b>", styles["Title"]))
+    story.append(Spacer(1, 12))
+
+    periodo = f"{data_inicio.strftime('%d/%m/%Y') if data_inicio else 'Início'} a {data_fim.strftime('%d/%m/%Y') if data_fim else 'Hoje'}"
+    story.append(Paragraph(f"Período: {periodo}", styles["Normal"]))
+    story.append(Spacer(1, 12))
+
+    # Resumo
+    resumo_data = [
+        ["Total Faturado", f"R$ {total_faturado:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")],
+        ["Total Recebido", f"R$ {total_recebido:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")],
+        ["Total Entradas", f"R$ {total_entradas:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")],
+        # ⚠️ ATUALIZAÇÃO AQUI para mostrar o TOTAL de SAÍDAS (Caixa + Despesas)
+        ["Total Saídas (Geral)", f"R$ {total_saidas_geral:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")], 
+        ["Saldo Líquido", f"R$ {saldo_liquido:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")],
+    ]
+    resumo_table = Table(resumo_data, hAlign="LEFT")
+    resumo_table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+    ]))
+    story.append(resumo_table)
+    story.append(Spacer(1, 20))
+
+    # --- 5. Tabela de Serviços ---
+    if servicos:
+        story.append(Paragraph("<b>Serviços Prestados</b>", styles["Heading2"]))
+        tabela_servicos = [["Data", "Cliente", "Tipo", "Valor Total", "Recebido", "Pendente"]]
+        for s in servicos:
+            tabela_servicos.append([
+                s.data_servico.strftime("%d/%m/%Y") if s.data_servico else "-",
+                s.cliente.nome,
+                s.tipo_servico,
+                f"R$ {s.valor_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+                f"R$ {s.valor_recebido:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+                f"R$ {(s.valor_total - s.valor_recebido):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+            ])
+        t = Table(tabela_servicos, repeatRows=1)
+        t.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+            ("ALIGN", (3, 0), (-1, -1), "RIGHT"),
+        ]))
+        story.append(t)
+        story.append(Spacer(1, 20))
+
+    # --- 6. Monta o PDF ---
+    with mede('despachante_pdf_duracao_segundos', relatorio='gerencial'):
+        doc.build(story)
+    pdf = buffer.getvalue()
+    buffer.close()
+
+    return Response(
+        pdf,
+        mimetype="application/pdf",
+        headers={
+            "Content-Disposition": "inline; filename=relatorio_gerencial.pdf"
+        }
+    )
+
+# ----------------------------------------------------
+# ROTA 10.10 - Estatísticas do cache de relatórios (admin)
+# ----------------------------------------------------
+@bp.route("/relatorios/cache", methods=["GET"])
+@login_required
+@admin_required
+def estatisticas_cache_relatorios():
+    # Acertos/falhas são do worker que atendeu; itens e bytes são do backend
+    return jsonify(estatisticas_cache())
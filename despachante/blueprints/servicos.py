@@ -0,0 +1,610 @@
+"""Blueprint servicos: Cadastro, status, exclusão, filtros e pagamento de serviços."""
+import uuid
+from datetime import datetime, date
+from types import SimpleNamespace
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, session, jsonify
+from sqlalchemy import update, func
+from sqlalchemy.exc import IntegrityError
+
+from ..extensoes import db
+from ..modelos import Cliente, Veiculo, Servico, ItemServico, MovimentacaoCaixa, SaldoCliente, STATUS_PROCESSO
+from ..autenticacao import login_required, admin_required
+from ..helpers import (
+    clean_currency_value, atualiza_status_pagamento, registra_pagamento, atualiza_saldo_cliente,
+    expressao_status_pagamento, salva_itens_servico,
+    pede_fragmento, renderiza_fragmento, normaliza_placa, obtem_veiculo
+)
+from ..catalogo import tipos_servico, obtem_tipo_servico, nome_exibicao
+from ..fechamento import PeriodoFechado, confere_movimentos_abertos
+from ..cache_resultados import cache_resultado
+
+bp = Blueprint('servicos', __name__)
+
+# ----------------------------------------------------
+# 8. ROTAS DE SERVIÇOS
+# ----------------------------------------------------
+
+# ROTA MODIFICADA: Utiliza a função auxiliar atualiza_status_pagamento
+@bp.route('/servicos/cadastro', methods=['GET', 'POST'])
+@login_required
+def servicos_cadastro_v3():
+    # [SEU CÓDIGO PERMANECE INALTERADO DAQUI EM DIANTE]
+    clientes = Cliente.query.order_by(Cliente.nome).all()
+    today = date.today().isoformat()
+    tipos = tipos_servico() # Catálogo em memória: preço e itens padrão vão para o formulário
+
+    if request.method == 'POST':
+        try:
+            cliente_id = request.form.get('cliente_id')
+            # Garante que tipo/placa/detalhes não sejam None
+            tipo = request.form.get('tipo_servico', '').strip()
+            placa = request.form.get('placa_veiculo', '').strip()
+            detalhes = request.form.get('detalhes', '').strip()
+
+            # ⭐ CORREÇÃO APLICADA: Usa clean_currency_value para segurança
+            valor_total_float = clean_currency_value(request.form.get('valor_total', '0,00'))
+            valor_recebido_float = clean_currency_value(request.form.get('valor_recebido_inicial', '0,00'))
+
+            # VALIDAÇÃO OBRIGATÓRIA (Backend)
+            if not cliente_id:
+                flash('Selecione o Cliente é obrigatório.', 'error')
+                return redirect(request.url)
+            if not tipo:
+                flash('O campo "Tipo de Serviço" é obrigatório.', 'error')
+                return redirect(request.url)
+            if not placa:
+                flash('O campo "Placa do Veículo" é obrigatório.', 'error')
+                return redirect(request.url)
+            # FIM DA VALIDAÇÃO
+
+            data_servico_obj = datetime.strptime(request.form.get('data_servico'), '%Y-%m-%d').date()
+            data_vencimento_str = request.form.get('data_vencimento')
+            data_vencimento_obj = None
+            if data_vencimento_str:
+                data_vencimento_obj = datetime.strptime(data_vencimento_str, '%Y-%m-%d').date()
+
+            veiculo = obtem_veiculo(placa, cliente_id)
+            tipo_catalogo = obtem_tipo_servico(tipo)
+            tipo = nome_exibicao(tipo, tipo_catalogo) # Como foi digitado; o vínculo com o catálogo é o tipo_servico_id
+
+            # Itens padrão do tipo (já estão no cache): o valor total vem deles se não foi informado
+            itens_padrao = tipo_catalogo.itens if request.form.get('usar_itens_padrao') else []
+            if itens_padrao and valor_total_float <= 0.01:
+                valor_total_float = sum(item.valor for item in itens_padrao)
+
+            novo_servico = Servico(
+                cliente_id=cliente_id,
+                tipo_servico=tipo,
+                tipo_servico_id=tipo_catalogo.id,
+                detalhes=detalhes,
+                placa_veiculo=veiculo.placa if veiculo else placa,
+                veiculo=veiculo,
+                data_servico=data_servico_obj,
+                data_vencimento=data_vencimento_obj,
+                valor_total=valor_total_float,
+                valor_recebido=valor_recebido_float,
+                saldo_pendente=0.0,  # Valor temporário
+                status_processo='Pendente',
+                status_pagamento='A Cobrar'  # Valor temporário
+            )
+
+            # ⭐ CORREÇÃO APLICADA: Usa a função centralizada para definir saldo e status
+            atualiza_status_pagamento(novo_servico)
+            db.session.add(novo_servico)
+            db.session.flush() # Gera o novo_servico.id usado na movimentação abaixo
+
+            if itens_padrao:
+                db.session.add_all([
+                    ItemServico(servico_id=novo_servico.id, descricao=item.descricao, valor=item.valor)
+                    for item in itens_padrao
+                ])
+
+            # Adiciona Movimentação de Caixa SE houver recebimento inicial
+            if valor_recebido_float > 0.01:
+                pagamento_data = data_servico_obj
+                pagamento_descricao = f"Recebimento Inicial - Serviço #{novo_servico.id} - {tipo}"
+                nova_movimentacao = MovimentacaoCaixa(
+                    tipo='Entrada',
+                    valor=valor_recebido_float,
+                    data=pagamento_data,
+                    descricao=pagamento_descricao,
+                    referencia_id=novo_servico.id,  # Referencia_id deve ser o ID do serviço
+                    referencia_tipo='Servico'
+                )
+                db.session.add(nova_movimentacao)
+
+            atualiza_saldo_cliente(novo_servico.cliente_id)
+            db.session.commit()
+
+            # ✅ ALTERAÇÃO SOLICITADA:
+            # Agora redireciona diretamente para a lista de serviços
+            flash(f'Serviço "{tipo}" cadastrado com sucesso.', 'success')
+            return redirect(url_for('servicos.servicos_filtros'))
+
+        except ValueError as ve:
+            db.session.rollback()
+            flash(f'Erro de formato. Verifique se as datas e os valores monetários foram preenchidos corretamente.', 'error')
+            return redirect(request.url)
+
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao cadastrar serviço: {e}', 'error')
+
+    catalogo = [
+        {'chave': t.chave, 'valor_padrao': t.valor_padrao,
+         'itens': [{'descricao': i.descricao, 'valor': i.valor} for i in t.itens]}
+        for t in tipos
+    ]
+    return render_template('servicos_cadastro_v3.html', clientes=clientes, today=today, tipos=tipos, catalogo=catalogo)
+
+
+# ROTA MODIFICADA E EXPANDIDA
+@bp.route('/servico/atualizar/<int:servico_id>', methods=['GET', 'POST'])
+@login_required
+def atualizar_status_servico(servico_id):
+    servico = Servico.query.filter_by(id=servico_id, deleted_at=None).first_or_404()
+    cliente = Cliente.query.get(servico.cliente_id)
+    itens_servico = ItemServico.query.filter_by(servico_id=servico_id).order_by(ItemServico.id.asc()).all()
+    
+    # ✅ ADICIONADO: lista de todos os clientes
+    clientes = Cliente.query.order_by(Cliente.nome).all()
+
+    status_opcoes = STATUS_PROCESSO
+
+    # ------------------------------------------
+    # Lógica de POST (Atualização de dados)
+    # ------------------------------------------
+    if request.method == 'POST':
+        try:
+            # ✅ CORREÇÃO: Apenas atualiza status e detalhes (sem sobreposições)
+            servico.status_processo = request.form.get('status_processo')
+            servico.detalhes = request.form.get('detalhes')
+
+            # ------------------------------------------
+            # Atualizar Status de Pagamento e Salvar
+            # ------------------------------------------
+            atualiza_status_pagamento(servico)
+            db.session.commit()
+            flash('Status e observações atualizados com sucesso!', 'success')
+            return redirect(url_for('servicos.servicos_filtros'))
+
+        except ValueError:
+            db.session.rollback()
+            flash('Erro de conversão de valor ou data. Verifique os campos informados.', 'error')
+            return redirect(url_for('servicos.atualizar_status_servico', servico_id=servico.id))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro interno ao atualizar o serviço. Detalhes: {e}', 'error')
+            return redirect(url_for('servicos.servicos_filtros'))
+
+
+ # ------------------------------------------
+    # Lógica de GET (Renderizar página)
+    # ------------------------------------------
+    data_entrada_formatada = servico.data_servico.strftime('%Y-%m-%d') if servico.data_servico else date.today().strftime('%Y-%m-%d')
+    data_vencimento_formatada = servico.data_vencimento.strftime('%Y-%m-%d') if servico.data_vencimento else ''
+
+    return render_template(
+        'atualizar_status_servico.html',
+        servico=servico,
+        cliente=cliente,
+        clientes=clientes,
+        itens_servico=itens_servico,
+        status_opcoes=status_opcoes,
+        today=date.today().strftime('%Y-%m-%d'),
+        data_entrada=data_entrada_formatada,
+        data_vencimento=data_vencimento_formatada
+    )
+
+@bp.route('/servico/<int:servico_id>/itens', methods=['POST'])
+@login_required
+def salvar_itens_servico(servico_id):
+    """Salva todos os itens do serviço de uma vez (formulário ou JSON {"itens": [...]})."""
+    servico = Servico.query.filter_by(id=servico_id, deleted_at=None).first_or_404()
+
+    try:
+        if request.is_json:
+            recebidos = (request.get_json(silent=True) or {}).get('itens') or []
+            itens = [
+                {'id': int(i['id']) if i.get('id') else None,
+                 'descricao': str(i.get('descricao') or '').strip(),
+                 'valor': clean_currency_value(str(i.get('valor') or '0'))}
+                for i in recebidos
+            ]
+        else:
+            # Linhas repetidas item_id / item_descricao / item_valor (item_id vazio = item novo)
+            itens = [
+                {'id': int(i) if i else None, 'descricao': d.strip(), 'valor': clean_currency_value(v)}
+                for i, d, v in zip(request.form.getlist('item_id'), request.form.getlist('item_descricao'),
+                                   request.form.getlist('item_valor'))
+            ]
+        itens = [item for item in itens if item['descricao']]
+
+        salva_itens_servico(servico, itens)
+        db.session.commit()
+    except (ValueError, TypeError, AttributeError) as e:
+        db.session.rollback()
+        if request.is_json:
+            return jsonify({'erro': str(e) or 'Itens inválidos.'}), 400
+        flash(f'Itens não salvos: {e}', 'error')
+        return redirect(url_for('servicos.atualizar_status_servico', servico_id=servico_id))
+    except Exception as e:
+        db.session.rollback()
+        if request.is_json:
+            return jsonify({'erro': str(e)}), 500
+        flash(f'Erro ao salvar os itens: {e}', 'error')
+        return redirect(url_for('servicos.atualizar_status_servico', servico_id=servico_id))
+
+    if request.is_json:
+        return jsonify({
+            'servico_id': servico.id,
+            'itens': len(itens),
+            'valor_total': servico.valor_total,
+            'saldo_pendente': servico.saldo_pendente,
+            'status_pagamento': servico.status_pagamento,
+        })
+    total = f'{servico.valor_total:.2f}'.replace('.', ',')
+    flash(f'{len(itens)} item(ns) salvo(s). Novo valor total: R$ {total}', 'success')
+    return redirect(url_for('servicos.atualizar_status_servico', servico_id=servico_id))
+
+# ----------------------------------------------------
+# ROTA PARA EXCLUSÃO DE SERVIÇO
+# ----------------------------------------------------
+@bp.route('/servico/excluir/<int:servico_id>', methods=['POST'])
+@login_required
+@admin_required
+def excluir_servico(servico_id):
+    try:
+        # Tenta buscar o serviço (ativo) ou retorna 404
+        servico = Servico.query.filter_by(id=servico_id, deleted_at=None).first_or_404()
+        agora = datetime.utcnow()
+        
+        # 1️⃣ Exclusão lógica do serviço: itens e movimentações ficam no banco até o arquivamento
+        servico.deleted_at = agora
+        
+        # 2️⃣ Movimentações de caixa do serviço saem dos relatórios na mesma transação
+        #     (pagamento em dia de caixa fechado: levanta PeriodoFechado e nada muda)
+        confere_movimentos_abertos(MovimentacaoCaixa.referencia_id == servico_id, MovimentacaoCaixa.referencia_tipo == 'Servico')
+        MovimentacaoCaixa.query.filter(
+            MovimentacaoCaixa.referencia_id == servico_id,
+            MovimentacaoCaixa.referencia_tipo == 'Servico',
+            MovimentacaoCaixa.deleted_at.is_(None)
+        ).update({'deleted_at': agora}, synchronize_session=False)
+
+        # 3️⃣ Atualiza o saldo do cliente
+        atualiza_saldo_cliente(servico.cliente_id)
+        
+        # 4️⃣ Confirma tudo no banco de dados
+        db.session.commit()
+        
+        # Mensagem de sucesso
+        flash(f'Serviço #{servico_id} excluído com sucesso!', 'success')
+        
+    except Exception as e:
+        # Se ocorrer um erro, desfazemos todas as operações (rollback)
+        db.session.rollback()
+        # Mensagem de erro
+        flash(f'Erro ao excluir serviço: {e}', 'error')
+    
+    # Redireciona para a página de serviços (após sucesso ou falha)
+    return redirect(url_for('servicos.servicos_filtros'))
+
+
+
+# ----------------------------------------------------
+# 9. ROTAS DE SERVIÇOS COM FILTROS (Sem alterações necessárias)
+# ----------------------------------------------------
+@cache_resultado('servico', 'cliente')
+def _dados_servicos_filtros(status, cliente_id, placa, data_inicio, data_fim):
+    """Linhas da lista filtrada (SimpleNamespace, para caberem no cache de relatórios)."""
+    query = Servico.query.join(Cliente, Servico.cliente_id == Cliente.id).with_entities(
+        Servico.id,
+        Servico.tipo_servico,
+        Servico.data_servico,
+        Servico.valor_total,
+        Servico.valor_recebido,
+        Servico.saldo_pendente,
+        Servico.status_processo,
+        Servico.status_pagamento,
+        Cliente.nome.label('cliente')
+    ).filter(Servico.deleted_at.is_(None)).order_by(Servico.id.desc())
+
+    if status:
+        query = query.filter(Servico.status_processo == status)
+    if cliente_id:
+        query = query.filter(Servico.cliente_id == cliente_id)
+    if placa:
+        query = query.filter(Servico.placa_veiculo.ilike(f'%{placa}%'))
+    if data_inicio:
+        query = query.filter(Servico.data_servico >= data_inicio)
+    if data_fim:
+        query = query.filter(Servico.data_servico <= data_fim)
+    return [SimpleNamespace(**linha._asdict()) for linha in query]
+
+@bp.route('/servicos/filtros', methods=['GET'])
+@login_required
+def servicos_filtros():
+    filtro_status = request.args.get('status', 'todos')
+    filtro_cliente = request.args.get('cliente', '')
+    filtro_placa = request.args.get('placa', '')
+    filtro_data_servico = request.args.get('data_servico', '')
+    filtro_data_fim = request.args.get('data_fim', '')
+
+    servicos_filtrados = _dados_servicos_filtros(
+        filtro_status if filtro_status != 'todos' else None,
+        int(filtro_cliente) if filtro_cliente.isdigit() else None,
+        filtro_placa or None,
+        filtro_data_servico or None,
+        filtro_data_fim or None
+    )
+
+    # Modo fragmento: só a tabela, sem base.html nem a lista de clientes do dropdown
+    if pede_fragmento():
+        return renderiza_fragmento('parciais/servicos_filtros_resultados.html', servicos=servicos_filtrados)
+
+    clientes_list = Cliente.query.order_by(Cliente.nome).all()
+    status_opcoes = STATUS_PROCESSO
+
+    return render_template(
+        'servicos_filtros.html',
+        servicos=servicos_filtrados,
+        clientes=clientes_list,
+        filtro_status=filtro_status,
+        filtro_cliente=filtro_cliente,
+        filtro_placa=filtro_placa,
+        filtro_data_servico=filtro_data_servico,
+        filtro_data_fim=filtro_data_fim,
+        status_opcoes=status_opcoes
+    )
+
+# ----------------------------------------------------
+# 9.1. AÇÕES EM LOTE (serviços marcados na lista filtrada)
+# ----------------------------------------------------
+@bp.route('/servicos/lote', methods=['POST'])
+@login_required
+def servicos_lote():
+    """Aplica uma ação a todos os serviços marcados com um único UPDATE, numa transação só.
+
+    saldo_pendente e status_pagamento são recalculados no próprio UPDATE
+    (expressao_status_pagamento), sem carregar os serviços um a um.
+    """
+    acao = request.form.get('acao')
+    ids = sorted({int(i) for i in request.form.getlist('servico_ids') if i.isdigit()})
+    # Volta para a lista com os mesmos filtros (só a query string, nunca uma URL externa)
+    voltar = url_for('servicos.servicos_filtros') + ('?' + request.form['voltar'] if request.form.get('voltar') else '')
+
+    if not ids:
+        flash('Marque pelo menos um serviço para a ação em lote.', 'error')
+        return redirect(voltar)
+
+    ativos = Servico.id.in_(ids) & Servico.deleted_at.is_(None)
+    valores = {}
+    condicao = ativos
+    try:
+        if acao == 'status':
+            novo_status = request.form.get('novo_status')
+            if novo_status not in STATUS_PROCESSO:
+                raise ValueError('Escolha o novo status do processo.')
+            valores['status_processo'] = novo_status
+            descricao = f'status alterado para "{novo_status}"'
+        elif acao == 'vencimento':
+            data_str = request.form.get('nova_data_vencimento')
+            valores['data_vencimento'] = datetime.strptime(data_str, '%Y-%m-%d').date() if data_str else None
+            descricao = 'vencimento alterado' if data_str else 'vencimento removido'
+        elif acao == 'nao_cobrado':
+            # Só serviços sem nenhum recebimento: com valor recebido o saldo ficaria negativo.
+            # O valor original fica guardado (os itens não mudam) para "voltar a cobrar".
+            condicao = ativos & (func.coalesce(Servico.valor_recebido, 0.0) <= 0.01) & Servico.valor_nao_cobrado.is_(None)
+            valores['valor_nao_cobrado'] = func.coalesce(Servico.valor_total, 0.0)
+            valores['valor_total'] = 0.0
+            descricao = 'marcado(s) como não cobrado(s)'
+        elif acao == 'cobrar':
+            condicao = ativos & Servico.valor_nao_cobrado.isnot(None)
+            valores['valor_total'] = Servico.valor_nao_cobrado
+            valores['valor_nao_cobrado'] = None
+            descricao = 'voltou(aram) a ser cobrado(s)'
+        elif acao == 'excluir':
+            if session.get('nivel_acesso') != 'ADMIN':
+                flash('Acesso negado: Apenas administradores podem excluir serviços.', 'error')
+                return redirect(voltar)
+            descricao = 'excluído(s)'
+        else:
+            raise ValueError('Ação em lote desconhecida.')
+
+        # Clientes afetados (uma consulta) para atualizar o livro de saldos no fim
+        clientes_afetados = [c for (c,) in db.session.query(Servico.cliente_id).filter(condicao).distinct()]
+
+        if acao == 'excluir':
+            confere_movimentos_abertos(MovimentacaoCaixa.referencia_tipo == 'Servico', MovimentacaoCaixa.referencia_id.in_(ids))
+            agora = datetime.utcnow()
+            alterados = db.session.execute(
+                update(Servico).where(condicao).values(deleted_at=agora)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            # Movimentações dos serviços excluídos saem dos relatórios na mesma transação
+            db.session.execute(
+                update(MovimentacaoCaixa).where(
+                    MovimentacaoCaixa.referencia_tipo == 'Servico',
+                    MovimentacaoCaixa.referencia_id.in_(ids),
+                    MovimentacaoCaixa.deleted_at.is_(None)
+                ).values(deleted_at=agora).execution_options(synchronize_session=False)
+            )
+        else:
+            valor_total = func.coalesce(Servico.valor_total, 0.0) if 'valor_total' not in valores else valores['valor_total']
+            valor_recebido = func.coalesce(Servico.valor_recebido, 0.0)
+            valores['saldo_pendente'] = valor_total - valor_recebido
+            valores['status_pagamento'] = expressao_status_pagamento(valor_total, valor_recebido)
+            alterados = db.session.execute(
+                update(Servico).where(condicao).values(**valores)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+        for cliente_id in clientes_afetados:
+            atualiza_saldo_cliente(cliente_id)
+        db.session.commit()
+
+        ignorados = len(ids) - alterados
+        flash(f'{alterados} serviço(s) {descricao}.' +
+              (f' {ignorados} ignorado(s) (excluídos, com valor recebido ou já nessa situação).' if ignorados else ''), 'success')
+    except PeriodoFechado as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e) if acao != 'vencimento' else 'Data de vencimento inválida.', 'error')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro na ação em lote: {e}', 'error')
+
+    return redirect(voltar)
+
+# ----------------------------------------------------
+# 10. ROTAS DE PAGAMENTO, CAIXA E DESPESAS
+# ----------------------------------------------------
+@bp.route('/servicos/pagamento', methods=['GET', 'POST'])
+@login_required
+
+def processar_pagamento():
+    from datetime import date, datetime 
+    
+    # ⚠️ Assumindo: MovimentosFinanceiros (MovimentacaoCaixa), db, Cliente, Servico,
+    # clean_currency_value, atualiza_status_pagamento, render_template estão disponíveis.
+    
+    today_iso = date.today().isoformat()
+
+    # 1. POST → REGISTRO DE PAGAMENTO (tratado antes das consultas da tela)
+    if request.method == 'POST':
+        servico_id = request.form.get('servico_id')
+        
+        if not servico_id:
+            flash('Selecione um serviço antes de confirmar o pagamento.', 'error')
+            return redirect(url_for('servicos.processar_pagamento')) 
+
+        try:
+            valor_recebido_novo = clean_currency_value(request.form.get('valor_pago', '0,00'))
+            metodo_pagamento = request.form.get('metodo_pagamento', 'PIX')
+            chave_idempotencia = request.form.get('chave_idempotencia') or None
+            
+            data_pagamento_str = request.form.get('data_pagamento', today_iso)
+            data_pagamento = datetime.strptime(data_pagamento_str, '%Y-%m-%d').date()
+
+            # ... (Validação de valor/saldo omitida por brevidade) ...
+
+            registra_pagamento(int(servico_id), valor_recebido_novo, data_pagamento, metodo_pagamento, chave_idempotencia)
+            db.session.commit()
+
+            flash('Pagamento registrado com sucesso!', 'success')
+            # 💡 Sugestão: Redirecionar para o relatório para verificação imediata
+            return redirect(url_for('relatorios.relatorio_fluxo_caixa')) 
+
+        except IntegrityError:
+            # Mesma chave de idempotência: o formulário foi enviado duas vezes
+            db.session.rollback()
+            flash('Este pagamento já havia sido registrado (envio duplicado ignorado).', 'info')
+            return redirect(url_for('relatorios.relatorio_fluxo_caixa'))
+        except LookupError:
+            db.session.rollback()
+            abort(404)
+        except PeriodoFechado as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+            return redirect(url_for('servicos.processar_pagamento'))
+        except ValueError:
+            db.session.rollback()
+            flash('Valor ou data do pagamento inválidos.', 'error')
+            return redirect(url_for('servicos.processar_pagamento'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao processar pagamento: {e}', 'error')
+            return redirect(url_for('servicos.processar_pagamento'))
+
+    # --- Filtragem GET ---
+    cliente_id = request.args.get('cliente_id')
+    placa = request.args.get('placa')
+    data_filtro = request.args.get('data')
+    
+    # 2. QUERY BASE
+    # ✅ Reincorpora a placa e calcula o saldo dinamicamente
+    query = Servico.query.join(Cliente).with_entities(
+        Servico.id,
+        Servico.data_servico,
+        Servico.tipo_servico,
+        Servico.placa_veiculo.label('placa'),  # Placa reincorporada
+        Servico.valor_total,
+        Servico.valor_recebido,
+        (Servico.valor_total - Servico.valor_recebido).label('saldo_pendente'),  # Saldo calculado
+        Servico.status_pagamento,
+        Servico.cliente_id,
+        Cliente.nome.label('cliente')
+    ).filter(Servico.deleted_at.is_(None))
+
+    # 3. APLICAÇÃO DOS FILTROS
+    if cliente_id and cliente_id.isdigit():
+        try:
+            cliente_id_int = int(cliente_id)
+            query = query.filter(Servico.cliente_id == cliente_id_int)
+        except ValueError:
+            pass 
+            
+    # Filtro de placa pelo veículo (índice ix_servico_ativo_veiculo), sem comparar texto livre.
+    # Placa sem veículo cadastrado: só a placa digitada igual (nunca veiculo_id IS NULL)
+    if placa and placa.strip():
+        placa_normalizada = normaliza_placa(placa)
+        veiculo_id = db.session.query(Veiculo.id).filter_by(placa=placa_normalizada).scalar()
+        if veiculo_id is not None:
+            query = query.filter(Servico.veiculo_id == veiculo_id)
+        else:
+            query = query.filter(Servico.placa_veiculo == placa_normalizada)
+        
+    if data_filtro:
+        try:
+            dt = datetime.strptime(data_filtro, '%Y-%m-%d').date()
+            query = query.filter(Servico.data_servico == dt)
+        except ValueError:
+            pass
+
+    # 4. EXECUTA A BUSCA PARA PREENCHER A TABELA
+    # ✅ Busca por saldo (calculado) maior que 0.01
+    servicos_rows = query.filter(
+        (Servico.valor_total - Servico.valor_recebido) > 0.01
+    ).order_by(Servico.data_servico.desc()).all()
+    
+    servicos_filtrados = [dict(row._mapping) for row in servicos_rows]
+
+    # Modo fragmento: só a tabela de pendentes (pula clientes, placas e saldos dos dropdowns)
+    if pede_fragmento():
+        return renderiza_fragmento('parciais/pagamento_servicos.html', servicos_filtrados=servicos_filtrados)
+
+    # 5. BUSCA PARA POPULAR DROPDOWNS (PLACA DINÂMICA)
+    # Uma única consulta (cliente, placa) via Veiculo, em vez de uma por cliente
+    clientes = Cliente.query.order_by(Cliente.nome).all()
+    placas_por_cliente = {c.id: [] for c in clientes}
+    pares = db.session.query(Servico.cliente_id, Veiculo.placa).join(
+        Veiculo, Servico.veiculo_id == Veiculo.id
+    ).filter(Servico.deleted_at.is_(None)).distinct().order_by(Veiculo.placa).all()
+    for cliente_id_placa, placa_cliente in pares:
+        placas_por_cliente.setdefault(cliente_id_placa, []).append(placa_cliente)
+
+    placas = sorted({p for _, p in pares})
+
+    # Saldo em aberto por cliente (livro SaldoCliente) para exibir no seletor
+    saldos_clientes = {
+        s.cliente_id: s for s in SaldoCliente.query.filter(SaldoCliente.servicos_abertos > 0).all()
+    }
+
+
+    # 6. RETORNO GET (RENDER TEMPLATE)
+    return render_template(
+        'pagamento_form.html',
+        servicos_filtrados=servicos_filtrados,
+        clientes=clientes,
+        placas=placas,
+        placas_por_cliente=placas_por_cliente, 
+        saldos_clientes=saldos_clientes,
+        chave_idempotencia=uuid.uuid4().hex,
+        selected_cliente_id=cliente_id or '', 
+        selected_placa=normaliza_placa(placa),
+        today=today_iso
+    )
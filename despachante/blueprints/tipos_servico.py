@@ -0,0 +1,66 @@
+"""Blueprint tipos_servico: Catálogo de tipos de serviço (preço e itens padrão)."""
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from ..extensoes import db
+from ..modelos import TipoServico, ItemTipoServico, Servico
+from ..autenticacao import login_required, admin_required
+from ..helpers import clean_currency_value
+from ..catalogo import chave_tipo, renomeia_tipo
+
+bp = Blueprint('tipos_servico', __name__)
+
+# ----------------------------------------------------
+# 8.2. CATÁLOGO DE TIPOS DE SERVIÇO (ADMIN)
+# ----------------------------------------------------
+
+@bp.route('/tipos-servico', methods=['GET', 'POST'])
+@bp.route('/tipos-servico/<int:tipo_id>', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def tipos_servico_cadastro(tipo_id=None):
+    """Lista o catálogo e cadastra/edita um tipo; o cache em memória é limpo no commit."""
+    tipo = TipoServico.query.get_or_404(tipo_id) if tipo_id else None
+
+    if request.method == 'POST':
+        nome = ' '.join(request.form.get('nome', '').split())
+        if not nome:
+            flash('O nome do tipo de serviço é obrigatório.', 'error')
+            return redirect(request.url)
+
+        # Linhas de itens padrão: campos repetidos item_descricao / item_valor
+        descricoes = request.form.getlist('item_descricao')
+        valores = request.form.getlist('item_valor')
+        itens = [(d.strip(), clean_currency_value(v)) for d, v in zip(descricoes, valores) if d.strip()]
+
+        try:
+            if tipo is None:
+                tipo = TipoServico()
+                db.session.add(tipo)
+            elif tipo.nome != nome:
+                renomeia_tipo(tipo.id, nome) # Vale também para os serviços já ligados ao tipo
+            tipo.nome = nome
+            tipo.chave = chave_tipo(nome)
+            tipo.valor_padrao = clean_currency_value(request.form.get('valor_padrao'))
+            tipo.ativo = bool(request.form.get('ativo'))
+            tipo.itens_padrao = [ItemTipoServico(descricao=d, valor=v, ordem=i) for i, (d, v) in enumerate(itens)]
+            db.session.commit()
+            flash(f'Tipo de serviço "{nome}" salvo com sucesso!', 'success')
+            return redirect(url_for('tipos_servico.tipos_servico_cadastro'))
+        except IntegrityError:
+            db.session.rollback()
+            flash('Já existe um tipo de serviço com esse nome (ou variação dele).', 'error')
+            return redirect(request.url)
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao salvar tipo de serviço: {e}', 'error')
+            return redirect(request.url)
+
+    # Quantidade de serviços ativos por tipo: um GROUP BY pelo índice de tipo_servico_id
+    uso = dict(db.session.query(Servico.tipo_servico_id, func.count(Servico.id)).filter(
+        Servico.deleted_at.is_(None), Servico.tipo_servico_id.isnot(None)
+    ).group_by(Servico.tipo_servico_id).all())
+    tipos = TipoServico.query.order_by(TipoServico.nome).all()
+
+    return render_template('tipos_servico.html', tipos=tipos, tipo=tipo, uso=uso)
@@ -0,0 +1,99 @@
+"""Blueprint veiculos: Histórico de serviços e débitos por placa (página e API)."""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort
+from sqlalchemy import func, case
+
+from ..extensoes import db
+from ..modelos import Cliente, Veiculo, Servico
+from ..autenticacao import login_required
+from ..helpers import normaliza_placa
+
+bp = Blueprint('veiculos', __name__)
+
+# ----------------------------------------------------
+# 8.1. ROTAS DE VEÍCULOS
+# ----------------------------------------------------
+
+def _historico_veiculo(placa):
+    """Veículo da placa, serviços ativos (mais recentes primeiro) e totais, tudo por índice."""
+    veiculo = Veiculo.query.filter_by(placa=normaliza_placa(placa)).first()
+    if veiculo is None:
+        return None, [], None
+
+    ativos = (Servico.veiculo_id == veiculo.id) & Servico.deleted_at.is_(None)
+    servicos = db.session.query(
+        Servico.id,
+        Servico.data_servico,
+        Servico.tipo_servico,
+        Servico.valor_total,
+        Servico.valor_recebido,
+        (Servico.valor_total - Servico.valor_recebido).label('saldo_pendente'),
+        Servico.status_processo,
+        Servico.status_pagamento,
+        Cliente.nome.label('cliente')
+    ).join(Cliente, Servico.cliente_id == Cliente.id).filter(ativos).order_by(
+        Servico.data_servico.desc(), Servico.id.desc()
+    ).all()
+
+    saldo = Servico.valor_total - Servico.valor_recebido
+    totais = db.session.query(
+        func.count(Servico.id).label('servicos'),
+        func.coalesce(func.sum(Servico.valor_total), 0).label('valor_total'),
+        func.coalesce(func.sum(Servico.valor_recebido), 0).label('valor_recebido'),
+        func.coalesce(func.sum(case((saldo > 0.01, saldo), else_=0)), 0).label('saldo_aberto')
+    ).filter(ativos).one()
+    return veiculo, servicos, totais
+
+@bp.route('/veiculos/<placa>', methods=['GET', 'POST'])
+@login_required
+def veiculo_historico(placa):
+    if placa != normaliza_placa(placa):
+        return redirect(url_for('veiculos.veiculo_historico', placa=normaliza_placa(placa)))
+
+    veiculo, servicos, totais = _historico_veiculo(placa)
+    if veiculo is None:
+        abort(404)
+
+    if request.method == 'POST':
+        try:
+            veiculo.renavam = ''.join(c for c in request.form.get('renavam', '') if c.isdigit()) or None
+            veiculo.modelo = request.form.get('modelo', '').strip() or None
+            db.session.commit()
+            flash(f'Veículo {veiculo.placa} atualizado com sucesso!', 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro ao atualizar veículo: {e}', 'error')
+        return redirect(url_for('veiculos.veiculo_historico', placa=veiculo.placa))
+
+    return render_template('veiculo_historico.html', veiculo=veiculo, servicos=servicos, totais=totais)
+
+@bp.route('/api/veiculos/<placa>')
+@login_required
+def veiculo_historico_api(placa):
+    veiculo, servicos, totais = _historico_veiculo(placa)
+    if veiculo is None:
+        return jsonify(erro='Veículo não encontrado.', placa=normaliza_placa(placa)), 404
+
+    return jsonify(
+        placa=veiculo.placa,
+        renavam=veiculo.renavam,
+        modelo=veiculo.modelo,
+        proprietario=veiculo.cliente.nome if veiculo.cliente else None,
+        cliente_id=veiculo.cliente_id,
+        totais={
+            'servicos': totais.servicos,
+            'valor_total': float(totais.valor_total),
+            'valor_recebido': float(totais.valor_recebido),
+            'saldo_aberto': float(totais.saldo_aberto),
+        },
+        servicos=[{
+            'id': s.id,
+            'data_servico': s.data_servico.isoformat() if s.data_servico else None,
+            'tipo_servico': s.tipo_servico,
+            'cliente': s.cliente,
+            'valor_total': s.valor_total,
+            'valor_recebido': s.valor_recebido,
+            'saldo_pendente': s.saldo_pendente,
+            'status_processo': s.status_processo,
+            'status_pagamento': s.status_pagamento,
+        } for s in servicos]
+    )
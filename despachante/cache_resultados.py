@@ -0,0 +1,274 @@
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .extensoes import db
+from .modelos import VersaoDados
+
+# ----------------------------------------------------
+# 4.8. CACHE DE RESULTADOS DOS RELATÓRIOS
+# ----------------------------------------------------
+# No fechamento do mês várias pessoas abrem o mesmo relatório com os mesmos filtros.
+# A função que monta os dados entra no cache com @cache_resultado('servico', ...): a chave é
+# função + filtros + versão de cada tabela lida. Logo depois de todo commit que grava numa tabela a
+# versão dela (VersaoDados) sobe, então o resultado antigo deixa de ser encontrado e sai pelo LRU.
+# Backend 'memoria' (um por worker, padrão) ou 'sqlite' (arquivo em disco compartilhado pelos workers).
+
+# Acertos/falhas por função neste processo: {nome: [acertos, falhas]}
+metricas = defaultdict(lambda: [0, 0])
+
+# Banco ainda sem a tabela versao_dados (falta rodar inicializa_banco): sem versões, sem cache
+_tem_versoes = {}
+
+
+def _tabela_versoes_existe(conexao):
+    url = str(conexao.engine.url)
+    if url not in _tem_versoes:
+        from sqlalchemy import inspect
+
+        _tem_versoes[url] = inspect(conexao).has_table(VersaoDados.__tablename__)
+    return _tem_versoes[url]
+
+
+class _CacheMemoria:
+    """LRU em memória limitado por quantidade de itens e por bytes (tamanho do pickle)."""
+
+    def __init__(self, max_itens, max_bytes):
+        self.max_itens, self.max_bytes = max_itens, max_bytes
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+
+    def obtem(self, chave):
+        with self._trava:
+            dados = self._itens.get(chave)
+            if dados is not None:
+                self._itens.move_to_end(chave)
+            return dados
+
+    def grava(self, chave, dados):
+        if len(dados) > self.max_bytes:
+            return
+        with self._trava:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self._bytes -= len(antigo)
+            self._itens[chave] = dados
+            self._bytes += len(dados)
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                _, descartado = self._itens.popitem(last=False)
+                self._bytes -= len(descartado)
+
+    def limpa(self):
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+
+    def tamanho(self):
+        return len(self._itens), self._bytes
+
+
+class _CacheSQLite:
+    """LRU num arquivo SQLite à parte, compartilhado por todos os workers da máquina."""
+
+    def __init__(self, caminho, max_itens, max_bytes):
+        self.caminho, self.max_itens, self.max_bytes = caminho, max_itens, max_bytes
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        with self._conecta() as conexao:
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor BLOB NOT NULL, '
+                            'tamanho INTEGER NOT NULL, usado_em REAL NOT NULL)')
+            conexao.execute('CREATE INDEX IF NOT EXISTS ix_cache_usado_em ON cache (usado_em)')
+
+    @contextmanager
+    def _conecta(self):
+        conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+        try:
+            yield conexao
+        finally:
+            conexao.close()
+
+    def obtem(self, chave):
+        with self._conecta() as conexao:
+            linha = conexao.execute('SELECT valor FROM cache WHERE chave = ?', (chave,)).fetchone()
+            if linha is not None:
+                conexao.execute('UPDATE cache SET usado_em = ? WHERE chave = ?', (time.time(), chave))
+            return linha[0] if linha else None
+
+    def grava(self, chave, dados):
+        if len(dados) > self.max_bytes:
+            return
+        with self._conecta() as conexao:
+            conexao.execute('INSERT OR REPLACE INTO cache (chave, valor, tamanho, usado_em) VALUES (?, ?, ?, ?)',
+                            (chave, dados, len(dados), time.time()))
+            itens, total = conexao.execute('SELECT count(*), coalesce(sum(tamanho), 0) FROM cache').fetchone()
+            if itens > self.max_itens or total > self.max_bytes:
+                # Descarta os menos usados até voltar a ~90% dos limites
+                sobra_itens, sobra_bytes = int(self.max_itens * 0.9), int(self.max_bytes * 0.9)
+                for chave_antiga, tamanho in conexao.execute('SELECT chave, tamanho FROM cache ORDER BY usado_em').fetchall():
+                    if itens <= sobra_itens and total <= sobra_bytes:
+                        break
+                    conexao.execute('DELETE FROM cache WHERE chave = ?', (chave_antiga,))
+                    itens, total = itens - 1, total - tamanho
+
+    def limpa(self):
+        with self._conecta() as conexao:
+            conexao.execute('DELETE FROM cache')
+
+    def tamanho(self):
+        with self._conecta() as conexao:
+            return tuple(conexao.execute('SELECT count(*), coalesce(sum(tamanho), 0) FROM cache').fetchone())
+
+
+def backend_cache():
+    """Backend do app corrente (criado na primeira chamada); None com o cache desligado."""
+    app = current_app._get_current_object()
+    if 'cache_resultados' not in app.extensions:
+        tipo = app.config['CACHE_RELATORIOS']
+        max_itens, max_bytes = app.config['CACHE_RELATORIOS_ITENS'], app.config['CACHE_RELATORIOS_MB'] * 1024 * 1024
+        if tipo == 'sqlite':
+            backend = _CacheSQLite(app.config['CACHE_RELATORIOS_ARQUIVO'], max_itens, max_bytes)
+        elif tipo == 'memoria':
+            backend = _CacheMemoria(max_itens, max_bytes)
+        else:
+            backend = None
+        app.extensions['cache_resultados'] = backend
+    backend = app.extensions['cache_resultados']
+    if backend is None or not _tabela_versoes_existe(db.session.connection()):
+        return None
+    return backend
+
+def versoes_tabelas(tabelas):
+    """Versão atual de cada tabela (uma consulta pela chave primária de VersaoDados)."""
+    versoes = dict(db.session.query(VersaoDados.tabela, VersaoDados.versao).filter(VersaoDados.tabela.in_(tabelas)))
+    return tuple(versoes.get(t, 0) for t in tabelas)
+
+def cache_resultado(*tabelas):
+    """Decorator: guarda o retorno da função (que precisa ser 'picklável') por argumentos + versões das tabelas."""
+    tabelas = tuple(sorted(tabelas))
+
+    def decorador(funcao):
+        nome = f'{funcao.__module__}.{funcao.__qualname__}'
+
+        @wraps(funcao)
+        def embrulho(*args, **kwargs):
+            backend = backend_cache()
+            if backend is None:
+                return funcao(*args, **kwargs)
+            assinatura = repr((nome, args, sorted(kwargs.items()), versoes_tabelas(tabelas)))
+            chave = hashlib.sha1(assinatura.encode('utf-8')).hexdigest()
+            dados = backend.obtem(chave)
+            if dados is not None:
+                metricas[nome][0] += 1
+                return pickle.loads(dados)
+            metricas[nome][1] += 1
+            resultado = funcao(*args, **kwargs)
+            backend.grava(chave, pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL))
+            return resultado
+
+        return embrulho
+    return decorador
+
+def estatisticas_cache():
+    """Taxa de acerto por função (neste processo) e uso de memória/disco do backend."""
+    backend = backend_cache()
+    itens, bytes_usados = backend.tamanho() if backend is not None else (0, 0)
+    acertos = sum(a for a, _ in metricas.values())
+    falhas = sum(f for _, f in metricas.values())
+    return {
+        'backend': current_app.config['CACHE_RELATORIOS'],
+        'pid': os.getpid(),
+        'itens': itens,
+        'bytes': bytes_usados,
+        'limite_bytes': current_app.config['CACHE_RELATORIOS_MB'] * 1024 * 1024,
+        'acertos': acertos,
+        'falhas': falhas,
+        'taxa_acerto': round(acertos / (acertos + falhas), 3) if acertos + falhas else None,
+        'funcoes': {
+            nome.rsplit('.', 1)[-1]: {'acertos': a, 'falhas': f, 'taxa_acerto': round(a / (a + f), 3) if a + f else None}
+            for nome, (a, f) in sorted(metricas.items())
+        },
+    }
+
+
+# ----------------------------------------------------
+# Versões: tabelas gravadas na transação sobem de versão depois do commit
+# ----------------------------------------------------
+# A subida roda numa transação curta própria, depois que a do escritório já terminou: as linhas de
+# versao_dados ficam travadas só pelo UPDATE, e não durante o pagamento/cadastro inteiro (no PostgreSQL
+# isso enfileiraria todos os commits dos workers nelas). Quem ler entre o commit e a subida guarda o
+# resultado novo com a versão velha, que some na subida. Com o cache desligado nada disso roda.
+
+def _cache_ligado():
+    return has_app_context() and current_app.config['CACHE_RELATORIOS'] != 'desligado'
+
+@event.listens_for(Session, 'after_flush')
+def _anota_tabelas_flush(sessao, contexto):
+    if not _cache_ligado():
+        return
+    alteradas = sessao.info.setdefault('tabelas_alteradas', set())
+    for obj in list(sessao.new) + list(sessao.deleted):
+        alteradas.add(obj.__table__.name)
+    for obj in sessao.dirty:
+        if sessao.is_modified(obj, include_collections=False):
+            alteradas.add(obj.__table__.name)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _anota_tabelas_em_lote(estado):
+    # insert()/update()/delete() em lote não passam pelo flush
+    if (estado.is_insert or estado.is_update or estado.is_delete) and _cache_ligado():
+        tabela = getattr(estado.statement, 'table', None)
+        if tabela is not None and getattr(tabela, 'name', None) != VersaoDados.__tablename__:
+            estado.session.info.setdefault('tabelas_alteradas', set()).add(tabela.name)
+
+@event.listens_for(Session, 'before_commit')
+def _fecha_tabelas(sessao):
+    if _cache_ligado():
+        sessao.flush() # O flush final do commit ainda não rodou: garante que entre nas tabelas anotadas
+
+def _sobe_versoes_em(conexao, alteradas):
+    tabela = VersaoDados.__table__
+    dialeto = conexao.dialect.name
+    if dialeto in ('sqlite', 'postgresql'):
+        if dialeto == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as insert_dialeto
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialeto
+        # Ordem alfabética: duas subidas travam as linhas na mesma ordem (sem deadlock)
+        comando = insert_dialeto(tabela).values([{'tabela': t, 'versao': 1} for t in alteradas])
+        conexao.execute(comando.on_conflict_do_update(index_elements=['tabela'], set_={'versao': tabela.c.versao + 1}))
+        return
+    for nome in alteradas:
+        if not conexao.execute(tabela.update().where(tabela.c.tabela == nome).values(versao=tabela.c.versao + 1)).rowcount:
+            conexao.execute(tabela.insert().values(tabela=nome, versao=1))
+
+@event.listens_for(Session, 'after_commit')
+def _sobe_versoes(sessao):
+    alteradas = sorted(t for t in sessao.info.pop('tabelas_alteradas', ()) if t != VersaoDados.__tablename__)
+    if not alteradas or not _cache_ligado():
+        return
+    try:
+        with sessao.get_bind().begin() as conexao:
+            if _tabela_versoes_existe(conexao):
+                _sobe_versoes_em(conexao, alteradas)
+    except Exception:
+        # Os dados já estão gravados: não derruba a requisição. Esvazia o cache deste processo para
+        # ele não servir o que ficou velho (os outros workers só se acertam na próxima subida).
+        current_app.logger.exception('Falha ao subir versões do cache (%s)', ', '.join(alteradas))
+        backend = current_app.extensions.get('cache_resultados')
+        if backend is not None:
+            backend.limpa()
+
+@event.listens_for(Session, 'after_rollback')
+def _descarta_tabelas(sessao):
+    sessao.info.pop('tabelas_alteradas', None)
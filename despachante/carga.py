@@ -0,0 +1,284 @@
+import io
+import re
+import csv
+import time
+import random
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import http.cookiejar
+from collections import defaultdict
+from datetime import date, timedelta
+
+from .extensoes import db
+from .modelos import Usuario, Cliente, Servico
+from .helpers import _digito_verificador, formata_documento
+from .importacao import importa_csv
+
+# ----------------------------------------------------
+# 4.11. TESTE DE CARGA (um dia de escritório simulado)
+# ----------------------------------------------------
+# "flask carga-semear" enche o banco (clientes e serviços pela mesma importação em CSV da tela,
+# mais os usuários carga01..N). "flask carga-simular" abre N sessões HTTP em paralelo contra um
+# servidor rodando (ou sobe um gunicorn com --workers/--threads), cada uma logando pelo /login e
+# repetindo as tarefas do dia na proporção de MIX_TAREFAS. Sem serviço externo: só a biblioteca padrão.
+
+SENHA_CARGA = 'carga123'
+
+# (tarefa, peso): atendimento e consultas dominam; PDFs e despesas são raros
+MIX_TAREFAS = (
+    ('dashboard', 10),
+    ('servicos_filtros', 14),
+    ('caixa', 8),
+    ('agenda', 5),
+    ('cadastro_cliente', 4),
+    ('cadastro_servico', 8),
+    ('pagamento', 10),
+    ('despesa', 3),
+    ('relatorio_debitos', 8),
+    ('relatorio_despesas', 4),
+    ('relatorio_fluxo_caixa', 8),
+    ('pdf_debitos', 3),
+    ('pdf_gerencial', 2),
+)
+
+# Mensagens de trava/conflito do SQLite e do PostgreSQL (a tela mostra o erro no flash)
+_TRAVAS = re.compile(r'database is locked|could not obtain lock|deadlock detected|lock timeout|could not serialize', re.I)
+_TIPOS = ('Transferência', 'Licenciamento', 'Vistoria', 'Primeiro Emplacamento', '2ª Via de CRV')
+_NOMES = ('Ana', 'Bruno', 'Carla', 'Diego', 'Elaine', 'Fábio', 'Gabriela', 'Hugo', 'Íris', 'João', 'Karina', 'Luís')
+_SOBRENOMES = ('Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Lima', 'Costa', 'Ferreira', 'Almeida', 'Ribeiro')
+
+
+def cpf_aleatorio(rnd):
+    base = ''.join(str(rnd.randint(0, 9)) for _ in range(9))
+    base += _digito_verificador(base, range(10, 1, -1))
+    base += _digito_verificador(base, range(11, 1, -1))
+    return formata_documento(base)
+
+def placa_aleatoria(rnd):
+    letras = ''.join(rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(3))
+    return f'{letras}{rnd.randint(0, 9)}{rnd.choice("ABCDEFGHIJ0123456789")}{rnd.randint(10, 99)}'
+
+def _csv_em_memoria(colunas, linhas):
+    saida = io.StringIO()
+    escritor = csv.writer(saida, delimiter=';')
+    escritor.writerow(colunas)
+    escritor.writerows(linhas)
+    saida.seek(0)
+    return saida
+
+def semeia_banco(clientes=2000, servicos_por_cliente=3, usuarios=10, semente=42, referencia=None):
+    """Usuários carga01..N, clientes e serviços dos 2 anos até 'referencia' (padrão: hoje), em lote. Faz commit."""
+    rnd = random.Random(semente)
+    existentes = {u.login for u in Usuario.query.filter(Usuario.login.like('carga%'))}
+    for i in range(1, usuarios + 1):
+        login = f'carga{i:02d}'
+        if login not in existentes:
+            usuario = Usuario(nome=f'Carga {i:02d}', login=login, nivel_acesso='COLABORADOR')
+            usuario.set_senha(SENHA_CARGA)
+            db.session.add(usuario)
+    db.session.commit()
+
+    documentos = [cpf_aleatorio(rnd) for _ in range(clientes)]
+    linhas = [[f'{rnd.choice(_NOMES)} {rnd.choice(_SOBRENOMES)} {i}', doc, f'(11) 9{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}']
+              for i, doc in enumerate(documentos)]
+    totais_clientes = importa_csv('clientes', _csv_em_memoria(['nome', 'cpf_cnpj', 'telefone'], linhas))
+
+    hoje = referencia or date.today()
+    linhas = []
+    for doc in documentos:
+        placa = placa_aleatoria(rnd)
+        for _ in range(rnd.randint(1, servicos_por_cliente * 2 - 1)):
+            data_servico = hoje - timedelta(days=rnd.randint(1, 730))
+            total = rnd.choice((150, 250, 380, 500, 720, 1200))
+            recebido = rnd.choice((0, total // 2, total, total))
+            linhas.append([doc, rnd.choice(_TIPOS), data_servico.isoformat(), placa,
+                           (data_servico + timedelta(days=30)).isoformat(), f'{total},00', f'{recebido},00'])
+    totais_servicos = importa_csv('servicos', _csv_em_memoria(
+        ['cpf_cnpj', 'tipo_servico', 'data_servico', 'placa', 'data_vencimento', 'valor_total', 'valor_recebido'], linhas))
+    return {'usuarios': usuarios, 'clientes': totais_clientes, 'servicos': totais_servicos}
+
+
+# ----------------------------------------------------
+# Simulação
+# ----------------------------------------------------
+
+class _Sessao:
+    """Um funcionário: cookies próprios, login no início e uma tarefa sorteada por vez."""
+
+    def __init__(self, url, login, rnd, dados, resultados):
+        self.url, self.login, self.rnd, self.dados, self.resultados = url.rstrip('/'), login, rnd, dados, resultados
+        self.abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.tarefas, self.pesos = zip(*MIX_TAREFAS)
+
+    def _pede(self, tarefa, caminho, dados=None):
+        corpo = urllib.parse.urlencode(dados).encode() if dados is not None else None
+        inicio = time.perf_counter()
+        status, texto = 0, ''
+        try:
+            with self.abridor.open(self.url + caminho, data=corpo, timeout=120) as resposta:
+                status = resposta.status
+                if 'text/html' in resposta.headers.get('Content-Type', ''):
+                    texto = resposta.read().decode('utf-8', 'replace')
+                else:
+                    resposta.read()
+        except urllib.error.HTTPError as e:
+            status, texto = e.code, e.read().decode('utf-8', 'replace')
+        except (urllib.error.URLError, OSError):
+            status = 0  # Conexão recusada / timeout
+        self.resultados.anota(tarefa, status, time.perf_counter() - inicio, bool(_TRAVAS.search(texto)))
+
+    def entra(self):
+        self._pede('login', '/login', {'login': self.login, 'senha': SENHA_CARGA})
+
+    def executa(self, tarefa):
+        rnd, hoje = self.rnd, date.today().isoformat()
+        if tarefa == 'dashboard':
+            self._pede(tarefa, '/')
+        elif tarefa == 'servicos_filtros':
+            self._pede(tarefa, '/servicos/filtros?' + urllib.parse.urlencode(
+                rnd.choice(({'placa': rnd.choice('ABCDEFGH')}, {'cliente': rnd.choice(self.dados['clientes'])},
+                            {'status': 'Pendente'}))))
+        elif tarefa == 'caixa':
+            self._pede(tarefa, '/caixa')
+        elif tarefa == 'agenda':
+            self._pede(tarefa, '/agenda?dias=14')
+        elif tarefa == 'cadastro_cliente':
+            self._pede(tarefa, '/clientes/cadastro', {
+                'nome': f'{rnd.choice(_NOMES)} {rnd.choice(_SOBRENOMES)} (carga)', 'cpf_cnpj': cpf_aleatorio(rnd)})
+        elif tarefa == 'cadastro_servico':
+            total = rnd.choice((150, 250, 380, 500))
+            self._pede(tarefa, '/servicos/cadastro', {
+                'cliente_id': rnd.choice(self.dados['clientes']), 'tipo_servico': rnd.choice(_TIPOS),
+                'placa_veiculo': placa_aleatoria(rnd), 'data_servico': hoje,
+                'valor_total': f'{total},00', 'valor_recebido_inicial': rnd.choice(('0,00', f'{total},00'))})
+        elif tarefa == 'pagamento':
+            self._pede(tarefa, '/servicos/pagamento', {
+                'servico_id': rnd.choice(self.dados['servicos_abertos']), 'valor_pago': '10,00',
+                'data_pagamento': hoje, 'metodo_pagamento': 'PIX'})
+        elif tarefa == 'despesa':
+            self._pede(tarefa, '/despesas/registro', {
+                'descricao': 'Despesa (carga)', 'valor': f'{rnd.randint(10, 200)},00',
+                'data_pagamento': hoje, 'categoria': rnd.choice(('FIXA', 'VARIAVEL', 'OUTRAS'))})
+        elif tarefa == 'relatorio_debitos':
+            self._pede(tarefa, '/relatorios/debitos' + rnd.choice(('', f'?cliente_id={rnd.choice(self.dados["clientes"])}')))
+        elif tarefa == 'relatorio_despesas':
+            self._pede(tarefa, '/relatorios/despesas')
+        elif tarefa == 'relatorio_fluxo_caixa':
+            inicio = (date.today() - timedelta(days=rnd.choice((7, 30, 90)))).isoformat()
+            self._pede(tarefa, f'/relatorios/fluxo_caixa?data_inicio={inicio}')
+        elif tarefa == 'pdf_debitos':
+            self._pede(tarefa, f'/exportar_debitos_pdf?cliente_id={rnd.choice(self.dados["clientes"])}')
+        elif tarefa == 'pdf_gerencial':
+            self._pede(tarefa, '/exportar_relatorio_pdf', {'data_inicio': (date.today() - timedelta(days=30)).isoformat()})
+
+    def roda(self, fim, pensar):
+        self.entra()
+        while time.monotonic() < fim:
+            self.executa(self.rnd.choices(self.tarefas, self.pesos)[0])
+            if pensar:
+                time.sleep(self.rnd.uniform(0, 2 * pensar))  # Tempo de "digitação" entre uma tela e outra
+
+
+class _Resultados:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.tempos = defaultdict(list)
+        self.erros = defaultdict(int)
+        self.travas = defaultdict(int)
+
+    def anota(self, tarefa, status, segundos, travou):
+        with self._trava:
+            self.tempos[tarefa].append(segundos)
+            if status == 0 or status >= 500:
+                self.erros[tarefa] += 1
+            if travou:
+                self.travas[tarefa] += 1
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados) + 0.5)) - 1))]
+
+def _le_metricas(url, token):
+    """{(nome, rotulos): valor} do /metrics do servidor; {} sem token ou se não responder."""
+    if not token:
+        return {}
+    pedido = urllib.request.Request(url.rstrip('/') + '/metrics', headers={'Authorization': f'Bearer {token}'})
+    try:
+        with urllib.request.urlopen(pedido, timeout=10) as resposta:
+            texto = resposta.read().decode('utf-8')
+    except (urllib.error.URLError, OSError):
+        return {}
+    valores = {}
+    for linha in texto.splitlines():
+        if linha and not linha.startswith('#'):
+            chave, valor = linha.rsplit(' ', 1)
+            valores[chave] = float(valor)
+    return valores
+
+def dados_para_simulacao():
+    """Ids sorteados pelas sessões (lidos do mesmo banco que o servidor usa)."""
+    clientes = [i for (i,) in db.session.query(Cliente.id).limit(5000)]
+    abertos = [i for (i,) in db.session.query(Servico.id).filter(
+        Servico.deleted_at.is_(None), Servico.valor_total - Servico.valor_recebido > 50).limit(5000)]
+    usuarios = [u for (u,) in db.session.query(Usuario.login).filter(Usuario.login.like('carga%')).order_by(Usuario.login)]
+    return {'clientes': clientes, 'servicos_abertos': abertos, 'usuarios': usuarios}
+
+def simula_escritorio(url, dados, sessoes=10, duracao=60, pensar=0.5, semente=1, token_metricas=None):
+    """Roda as sessões por 'duracao' segundos e devolve o relatório (dict)."""
+    if not dados['clientes'] or not dados['servicos_abertos'] or not dados['usuarios']:
+        raise ValueError('Banco sem dados de carga: rode "flask carga-semear" antes.')
+    antes = _le_metricas(url, token_metricas)
+    resultados = _Resultados()
+    fim = time.monotonic() + duracao
+    threads = []
+    for i in range(sessoes):
+        sessao = _Sessao(url, dados['usuarios'][i % len(dados['usuarios'])], random.Random(semente + i), dados, resultados)
+        threads.append(threading.Thread(target=sessao.roda, args=(fim, pensar), daemon=True))
+    inicio = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.monotonic() - inicio
+    depois = _le_metricas(url, token_metricas)
+
+    rotas = {}
+    for tarefa, tempos in sorted(resultados.tempos.items()):
+        tempos.sort()
+        rotas[tarefa] = {
+            'requisicoes': len(tempos),
+            'p50_ms': round(1000 * _percentil(tempos, 50), 1),
+            'p95_ms': round(1000 * _percentil(tempos, 95), 1),
+            'p99_ms': round(1000 * _percentil(tempos, 99), 1),
+            'max_ms': round(1000 * tempos[-1], 1),
+            'erros': resultados.erros[tarefa],
+            'travas': resultados.travas[tarefa],
+        }
+    total = sum(r['requisicoes'] for r in rotas.values())
+    todos = sorted(t for tempos in resultados.tempos.values() for t in tempos)
+    relatorio = {
+        'url': url, 'sessoes': sessoes, 'segundos': round(decorrido, 1),
+        'requisicoes': total,
+        'por_segundo': round(total / decorrido, 1) if decorrido else 0.0,
+        'p50_ms': round(1000 * _percentil(todos, 50), 1),
+        'p95_ms': round(1000 * _percentil(todos, 95), 1),
+        'p99_ms': round(1000 * _percentil(todos, 99), 1),
+        'taxa_erros': round(sum(resultados.erros.values()) / total, 4) if total else 0.0,
+        'taxa_travas': round(sum(resultados.travas.values()) / total, 4) if total else 0.0,
+        'rotas': rotas,
+    }
+    if antes or depois:
+        # Disputa no banco pelo /metrics do servidor: tempo total em SQL e média por comando no período
+        soma = sum(v - antes.get(k, 0.0) for k, v in depois.items() if k.startswith('despachante_db_duracao_segundos_sum'))
+        comandos = sum(v - antes.get(k, 0.0) for k, v in depois.items() if k.startswith('despachante_db_duracao_segundos_count'))
+        relatorio['banco'] = {
+            'comandos': int(comandos),
+            'segundos_em_sql': round(soma, 3),
+            'media_comando_ms': round(1000 * soma / comandos, 3) if comandos else 0.0,
+            'sql_por_requisicao_ms': round(1000 * soma / total, 2) if total else 0.0,
+        }
+    return relatorio
@@ -0,0 +1,175 @@
+import re
+import time
+import unicodedata
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import event, func, insert, update
+from sqlalchemy.orm import Session
+
+from .extensoes import db
+from .modelos import TipoServico, ItemTipoServico, Servico
+
+# ----------------------------------------------------
+# 4.4. CATÁLOGO DE TIPOS DE SERVIÇO (cache em memória)
+# ----------------------------------------------------
+# O catálogo é pequeno e muda pouco: fica em memória no processo, como SimpleNamespace
+# (sem objetos ORM presos a uma sessão). Commit que mexe no catálogo limpa o cache deste
+# processo na hora; os outros workers recarregam quando passar CATALOGO_TTL.
+
+_cache = {'tipos': None, 'por_id': {}, 'por_chave': {}, 'carregado_em': 0.0}
+
+
+def chave_tipo(nome):
+    """'  Transferência  de Propriedade' -> 'transferencia de propriedade'."""
+    sem_acento = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', sem_acento).strip().casefold()
+
+def invalida_catalogo():
+    _cache['tipos'] = None
+
+def _carrega_catalogo():
+    """Duas consultas (tipos e itens padrão) montam o catálogo inteiro."""
+    itens = {}
+    for item in ItemTipoServico.query.order_by(ItemTipoServico.tipo_servico_id, ItemTipoServico.ordem, ItemTipoServico.id):
+        itens.setdefault(item.tipo_servico_id, []).append(
+            SimpleNamespace(descricao=item.descricao, valor=item.valor or 0.0)
+        )
+    tipos = [
+        SimpleNamespace(id=t.id, nome=t.nome, chave=t.chave, valor_padrao=t.valor_padrao or 0.0,
+                        ativo=t.ativo, itens=itens.get(t.id, []))
+        for t in TipoServico.query.order_by(TipoServico.nome)
+    ]
+    _cache.update(
+        tipos=tipos,
+        por_id={t.id: t for t in tipos},
+        por_chave={t.chave: t for t in tipos},
+        carregado_em=time.monotonic(),
+    )
+
+def _catalogo():
+    if _cache['tipos'] is None or time.monotonic() - _cache['carregado_em'] > current_app.config['CATALOGO_TTL']:
+        _carrega_catalogo()
+    return _cache
+
+def tipos_servico(somente_ativos=True):
+    """Tipos do catálogo em ordem alfabética (sem consulta ao banco enquanto o cache vale)."""
+    tipos = _catalogo()['tipos']
+    return [t for t in tipos if t.ativo] if somente_ativos else list(tipos)
+
+def tipo_por_id(tipo_id):
+    return _catalogo()['por_id'].get(tipo_id)
+
+def tipo_por_nome(nome):
+    """Tipo do catálogo para um nome digitado (qualquer variação de acento/maiúscula/espaço)."""
+    return _catalogo()['por_chave'].get(chave_tipo(nome))
+
+def nome_exibicao(digitado, tipo):
+    """Nome gravado em Servico.tipo_servico: o digitado, com os espaços normalizados.
+
+    O nome do catálogo só entra quando o digitado não traz nada além da chave (tudo minúsculo
+    e sem acento, ex.: "transferencia"), ou quando veio vazio.
+    """
+    nome = ' '.join((digitado or '').split())
+    if tipo is not None and (not nome or nome == chave_tipo(nome)):
+        return tipo.nome
+    return nome
+
+def renomeia_tipo(tipo_id, nome):
+    """Troca o nome do tipo e dos serviços ligados a ele (o nome fica copiado em Servico.tipo_servico)."""
+    db.session.execute(update(TipoServico).where(TipoServico.id == tipo_id).values(nome=nome))
+    db.session.execute(
+        update(Servico).where(Servico.tipo_servico_id == tipo_id).values(tipo_servico=nome)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.info['catalogo_alterado'] = True # UPDATE em lote não passa pelo before_flush
+
+def obtem_tipo_servico(nome):
+    """Tipo do catálogo para o nome digitado; cria um tipo novo (sem itens) se ainda não existir.
+
+    Tipo criado sem acento nem maiúscula (ex.: "transferencia") ganha a primeira grafia mais
+    completa que for digitada depois ("Transferência"), junto com os serviços dele.
+    """
+    from sqlalchemy.exc import IntegrityError
+
+    tipo = tipo_por_nome(nome)
+    if tipo is not None:
+        digitado = ' '.join(nome.split())
+        if tipo.nome == tipo.chave and digitado != tipo.chave:
+            renomeia_tipo(tipo.id, digitado)
+            tipo = SimpleNamespace(**dict(vars(tipo), nome=digitado))
+        return tipo
+    chave = chave_tipo(nome)
+    if not chave:
+        return None
+    try:
+        with db.session.begin_nested():
+            novo = TipoServico(nome=' '.join(nome.split()), chave=chave, valor_padrao=0.0, ativo=True)
+            db.session.add(novo)
+    except IntegrityError:
+        novo = TipoServico.query.filter_by(chave=chave).one() # Outro worker criou o mesmo tipo
+    return SimpleNamespace(id=novo.id, nome=novo.nome, chave=novo.chave, valor_padrao=novo.valor_padrao or 0.0,
+                           ativo=novo.ativo, itens=[])
+
+def filtro_tipo_servico(nome):
+    """Condição SQL para "serviços deste tipo": pelo tipo_servico_id (índice) quando o nome está
+    no catálogo, e pelo texto exato só para nomes fora dele."""
+    tipo = tipo_por_nome(nome)
+    if tipo is not None:
+        return Servico.tipo_servico_id == tipo.id
+    return Servico.tipo_servico == nome
+
+
+@event.listens_for(Session, 'before_flush')
+def _marca_alteracao_catalogo(sessao, contexto, instancias):
+    alterados = list(sessao.new) + list(sessao.dirty) + list(sessao.deleted)
+    if any(isinstance(obj, (TipoServico, ItemTipoServico)) for obj in alterados):
+        sessao.info['catalogo_alterado'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalida_apos_commit(sessao):
+    if sessao.info.pop('catalogo_alterado', False):
+        invalida_catalogo()
+
+@event.listens_for(Session, 'after_rollback')
+def _descarta_marca(sessao):
+    sessao.info.pop('catalogo_alterado', None)
+
+
+def migra_tipos_servico():
+    """Cria o catálogo a partir do texto livre de Servico.tipo_servico e liga os serviços.
+
+    Uma consulta agrupada lê as variações; as que têm a mesma chave (acento, maiúsculas,
+    espaços) viram um só tipo, com o nome da variação mais usada. Os serviços são
+    ligados com um UPDATE por tipo. Retorna (tipos_criados, servicos_vinculados).
+    """
+    variacoes = db.session.query(Servico.tipo_servico, func.count(Servico.id)).filter(
+        Servico.tipo_servico_id.is_(None), Servico.tipo_servico.isnot(None)
+    ).group_by(Servico.tipo_servico).all()
+
+    grupos = {}
+    for nome, quantidade in variacoes:
+        chave = chave_tipo(nome)
+        if chave:
+            grupos.setdefault(chave, []).append((quantidade, nome))
+    if not grupos:
+        return 0, 0
+
+    existentes = dict(db.session.query(TipoServico.chave, TipoServico.id))
+    novos = [
+        {'nome': re.sub(r'\s+', ' ', max(nomes)[1]).strip(), 'chave': chave, 'valor_padrao': 0.0, 'ativo': True}
+        for chave, nomes in grupos.items() if chave not in existentes
+    ]
+    if novos:
+        db.session.execute(insert(TipoServico), novos)
+        existentes = dict(db.session.query(TipoServico.chave, TipoServico.id))
+
+    vinculados = 0
+    for chave, nomes in grupos.items():
+        vinculados += db.session.execute(
+            update(Servico).where(
+                Servico.tipo_servico_id.is_(None), Servico.tipo_servico.in_([nome for _, nome in nomes])
+            ).values(tipo_servico_id=existentes[chave]).execution_options(synchronize_session=False)
+        ).rowcount
+    db.session.info['catalogo_alterado'] = True # INSERT em lote não passa pelo before_flush
+    return len(novos), vinculados
@@ -0,0 +1,82 @@
+from datetime import date, datetime
+from itertools import groupby
+
+from sqlalchemy import insert, delete
+
+from .extensoes import db
+from .modelos import Cliente, Servico, ListaCobranca
+
+# ----------------------------------------------------
+# 4.7. AGENDA DE VENCIMENTOS E LISTA DE COBRANÇA
+# ----------------------------------------------------
+# A agenda lê os serviços a cobrar pelo índice (data_vencimento, status_pagamento).
+# A lista de cobrança é uma foto gerada à noite: a tela da manhã lê uma tabela pequena
+# já com cliente, contato, valor e dias de atraso, sem juntar nem calcular nada.
+
+STATUS_A_COBRAR = ('A Cobrar', 'Parcial')
+
+
+def consulta_agenda(inicio, fim, incluir_vencidos=True):
+    """Serviços ativos a cobrar com vencimento em [inicio, fim] (com os já vencidos antes de 'inicio')."""
+    filtros = [
+        Servico.deleted_at.is_(None),
+        Servico.data_vencimento <= fim,
+        Servico.status_pagamento.in_(STATUS_A_COBRAR),
+    ]
+    filtros.append(Servico.data_vencimento.isnot(None) if incluir_vencidos else Servico.data_vencimento >= inicio)
+    return db.session.query(
+        Servico.id,
+        Servico.data_vencimento,
+        Servico.tipo_servico,
+        Servico.placa_veiculo,
+        Servico.status_pagamento,
+        (Servico.valor_total - Servico.valor_recebido).label('saldo_pendente'),
+        Servico.cliente_id,
+        Cliente.nome.label('cliente'),
+        Cliente.telefone
+    ).join(Cliente, Servico.cliente_id == Cliente.id).filter(*filtros).order_by(
+        Servico.data_vencimento, Servico.id
+    ).all()
+
+def agenda_por_dia(linhas, hoje=None):
+    """Agrupa as linhas da agenda por dia de vencimento: [{data, vencido, total, servicos}]."""
+    hoje = hoje or date.today()
+    dias = []
+    for dia, servicos in groupby(linhas, key=lambda s: s.data_vencimento):
+        servicos = list(servicos)
+        dias.append({
+            'data': dia,
+            'vencido': dia < hoje,
+            'total': sum(s.saldo_pendente or 0.0 for s in servicos),
+            'servicos': servicos,
+        })
+    return dias
+
+def gera_lista_cobranca(hoje=None):
+    """Recria ListaCobranca com os serviços vencidos (ou vencendo hoje) e ainda a cobrar. Não faz commit.
+
+    Uma consulta pelo índice de vencimento + um INSERT em lote; retorna quantas linhas gerou.
+    """
+    hoje = hoje or date.today()
+    agora = datetime.utcnow()
+    linhas = db.session.query(
+        Servico.id, Servico.cliente_id, Servico.tipo_servico, Servico.placa_veiculo, Servico.data_vencimento,
+        (Servico.valor_total - Servico.valor_recebido).label('saldo_pendente'),
+        Cliente.nome, Cliente.telefone, Cliente.email
+    ).join(Cliente, Servico.cliente_id == Cliente.id).filter(
+        Servico.deleted_at.is_(None),
+        Servico.data_vencimento <= hoje,
+        Servico.status_pagamento.in_(STATUS_A_COBRAR)
+    ).all()
+
+    db.session.execute(delete(ListaCobranca))
+    registros = [{
+        'servico_id': s.id, 'cliente_id': s.cliente_id, 'cliente_nome': s.nome,
+        'telefone': s.telefone, 'email': s.email, 'tipo_servico': s.tipo_servico,
+        'placa_veiculo': s.placa_veiculo, 'data_vencimento': s.data_vencimento,
+        'valor_aberto': round(s.saldo_pendente or 0.0, 2),
+        'dias_atraso': (hoje - s.data_vencimento).days, 'gerado_em': agora,
+    } for s in linhas if (s.saldo_pendente or 0.0) > 0.01]
+    if registros:
+        db.session.execute(insert(ListaCobranca), registros)
+    return len(registros)
@@ -0,0 +1,5 @@
+"""Comandos "flask ..." (tarefas em lote, manutenção e medições), um módulo por área."""
+from . import pagamentos, arquivo, particoes, cadastros, caixa, carga, manutencao
+
+# Registrados em create_app(), todos sem prefixo de grupo (flask saldos-clientes, flask reconciliar, ...)
+COMANDOS = (pagamentos.bp, arquivo.bp, particoes.bp, cadastros.bp, caixa.bp, carga.bp, manutencao.bp)
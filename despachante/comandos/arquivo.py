@@ -0,0 +1,217 @@
+"""Comandos de arquivamento: serviços antigos para as tabelas *_arquivo e anos fechados para o arquivo frio."""
+import os
+import csv
+import gzip
+import json
+import hashlib
+from datetime import datetime, timedelta, date
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import func, or_
+
+from ..extensoes import db
+from ..modelos import (
+    Cliente, Servico, ItemServico, MovimentacaoCaixa, Despesa, servico_arquivo, item_servico_arquivo,
+    movimentacao_caixa_arquivo
+)
+from ..arquivo_frio import anos_arquivo_frio
+from .comum import em_lotes, grava_manifesto
+
+bp = Blueprint('comandos_arquivo', __name__, cli_group=None)
+
+# ----------------------------------------------------
+# 12.1 ARQUIVAMENTO (tabelas *_arquivo e arquivo frio dos anos fechados)
+# ----------------------------------------------------
+
+
+@bp.cli.command('arquivar-servicos')
+@click.option('--dias', type=int, default=365, show_default=True,
+              help='Serviços Concluído + Pago com data anterior a hoje menos N dias são arquivados.')
+@click.option('--lote', type=int, default=500, show_default=True, help='Serviços por transação.')
+def arquivar_servicos(dias, lote):
+    """Move serviços excluídos e os encerrados há muito tempo (com itens) para as tabelas *_arquivo.
+
+    As movimentações de serviços excluídos também vão para o arquivo. As dos serviços
+    encerrados ficam no caixa, pois compõem os saldos e relatórios por período.
+    """
+    from sqlalchemy import delete, insert, literal, select
+
+    limite = date.today() - timedelta(days=dias)
+    criterio = or_(
+        Servico.deleted_at.isnot(None),
+        (Servico.status_processo == 'Concluído') & (Servico.status_pagamento == 'Pago') & (Servico.data_servico < limite)
+    )
+
+    def copia(origem, destino, condicao):
+        colunas = [c.name for c in origem.columns]
+        consulta = select(*origem.columns, literal(agora, db.DateTime)).where(condicao)
+        db.session.execute(insert(destino).from_select(colunas + ['arquivado_em'], consulta))
+
+    total_servicos = total_itens = total_movimentos = 0
+    while True:
+        ids = [row.id for row in Servico.query.with_entities(Servico.id).filter(criterio).order_by(Servico.id).limit(lote)]
+        if not ids:
+            break
+        agora = datetime.utcnow()
+        movimentos_excluidos = (MovimentacaoCaixa.referencia_tipo == 'Servico') & \
+            MovimentacaoCaixa.referencia_id.in_(ids) & MovimentacaoCaixa.deleted_at.isnot(None)
+
+        copia(Servico.__table__, servico_arquivo, Servico.id.in_(ids))
+        copia(ItemServico.__table__, item_servico_arquivo, ItemServico.servico_id.in_(ids))
+        copia(MovimentacaoCaixa.__table__, movimentacao_caixa_arquivo, movimentos_excluidos)
+
+        total_itens += db.session.execute(delete(ItemServico).where(ItemServico.servico_id.in_(ids))).rowcount
+        total_movimentos += db.session.execute(delete(MovimentacaoCaixa).where(movimentos_excluidos)).rowcount
+        total_servicos += db.session.execute(delete(Servico).where(Servico.id.in_(ids))).rowcount
+        db.session.commit()
+        click.echo(f'  lote arquivado: {len(ids)} serviço(s) (até #{ids[-1]})')
+
+    click.echo(f'Arquivados: {total_servicos} serviço(s), {total_itens} item(ns), {total_movimentos} movimentação(ões).')
+
+
+def _grava_tabela_fria(caminho, tabela, ids, lote, extras=(), juncao=None):
+    """Grava as linhas 'ids' de 'tabela' num CSV.gz; retorna (linhas, sha256 do arquivo)."""
+    from sqlalchemy import select
+
+    colunas = list(tabela.columns) + list(extras)
+    linhas = 0
+    with gzip.open(caminho, 'wt', newline='', encoding='utf-8') as arq:
+        escritor = csv.writer(arq)
+        escritor.writerow([c.name for c in colunas])
+        for ids_lote in em_lotes(ids, lote):
+            consulta = select(*colunas).select_from(juncao if juncao is not None else tabela)
+            for row in db.session.execute(consulta.where(tabela.c.id.in_(ids_lote)).order_by(tabela.c.id)):
+                escritor.writerow(['' if v is None else v.isoformat() if isinstance(v, (date, datetime)) else v
+                                   for v in row])
+                linhas += 1
+
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arq:
+        for bloco in iter(lambda: arq.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return linhas, sha.hexdigest()
+
+
+@bp.cli.command('arquivo-frio-exportar')
+@click.argument('ano', type=int)
+@click.option('--lote', type=int, default=1000, show_default=True, help='Linhas por consulta/exclusão.')
+@click.option('--manter-no-banco', is_flag=True, help='Só exporta (conferência), sem apagar do banco.')
+def arquivo_frio_exportar(ano, lote, manter_no_banco):
+    """Exporta um ano fechado (serviços, itens, caixa e despesas) para CSV.gz e tira do banco.
+
+    Ficam no banco os serviços do ano ainda com saldo em aberto ou com pagamento
+    lançado depois do ano, e as movimentações desses serviços, para que saldos e
+    conciliação continuem fechando. Os relatórios leem o ano exportado pelo
+    registros_arquivados() quando o período pedido chega nele.
+    """
+    from sqlalchemy import delete, exists
+
+    if ano >= date.today().year:
+        raise click.ClickException('Só é possível arquivar anos já encerrados.')
+    pasta = os.path.join(current_app.config['ARQUIVO_FRIO_DIR'], str(ano))
+    caminho_manifesto = os.path.join(pasta, 'manifesto.json')
+    if ano in anos_arquivo_frio():
+        raise click.ClickException(f'O ano {ano} já está no arquivo frio ({pasta}).')
+    os.makedirs(pasta, exist_ok=True)
+
+    inicio, fim = date(ano, 1, 1), date(ano, 12, 31)
+
+    # --- 1. Seleção: serviços encerrados do ano e o que depende deles ---
+    pagamento_posterior = exists().where(
+        MovimentacaoCaixa.referencia_tipo == 'Servico',
+        MovimentacaoCaixa.referencia_id == Servico.id,
+        MovimentacaoCaixa.data > fim
+    )
+    ids_servicos = [row.id for row in Servico.query.with_entities(Servico.id).filter(
+        Servico.data_servico.between(inicio, fim),
+        or_(Servico.deleted_at.isnot(None),
+            func.coalesce(Servico.valor_total, 0.0) - func.coalesce(Servico.valor_recebido, 0.0) <= 0.01),
+        ~pagamento_posterior
+    ).order_by(Servico.id)]
+    exportados = set(ids_servicos)
+
+    ids_itens = []
+    for ids_lote in em_lotes(ids_servicos, lote):
+        ids_itens += [row.id for row in ItemServico.query.with_entities(ItemServico.id).filter(
+            ItemServico.servico_id.in_(ids_lote))]
+
+    # Movimentações do ano, menos as de serviços que continuam no banco
+    ids_movimentos = [
+        row.id for row in db.session.query(MovimentacaoCaixa.id, Servico.id.label('servico_id')).outerjoin(
+            Servico, (MovimentacaoCaixa.referencia_tipo == 'Servico') & (Servico.id == MovimentacaoCaixa.referencia_id)
+        ).filter(MovimentacaoCaixa.data.between(inicio, fim)).order_by(MovimentacaoCaixa.id)
+        if row.servico_id is None or row.servico_id in exportados
+    ]
+    ids_despesas = [row.id for row in Despesa.query.with_entities(Despesa.id).filter(
+        Despesa.data.between(inicio, fim)).order_by(Despesa.id)]
+
+    # --- 2. Arquivos + manifesto (status 'pendente' até o banco ser limpo) ---
+    cliente = Cliente.__table__
+    exportacoes = {
+        'servico': (Servico.__table__, ids_servicos, [cliente.c.nome.label('cliente_nome')],
+                    Servico.__table__.outerjoin(cliente, cliente.c.id == Servico.__table__.c.cliente_id)),
+        'item_servico': (ItemServico.__table__, ids_itens, [], None),
+        'movimentacao_caixa': (MovimentacaoCaixa.__table__, ids_movimentos, [], None),
+        'despesa': (Despesa.__table__, ids_despesas, [], None),
+    }
+    manifesto = {'ano': ano, 'status': 'pendente', 'gerado_em': datetime.now().isoformat(timespec='seconds'),
+                 'tabelas': {}}
+    for nome, (tabela, ids, extras, juncao) in exportacoes.items():
+        arquivo = f'{nome}.csv.gz'
+        linhas, sha256 = _grava_tabela_fria(os.path.join(pasta, arquivo), tabela, ids, lote, extras, juncao)
+        if linhas != len(ids):
+            raise click.ClickException(f'{nome}: {linhas} linha(s) gravada(s), {len(ids)} esperada(s). Nada foi apagado.')
+        manifesto['tabelas'][nome] = {'arquivo': arquivo, 'linhas': linhas, 'sha256': sha256}
+        click.echo(f'  {arquivo}: {linhas} linha(s)')
+    grava_manifesto(caminho_manifesto, manifesto)
+
+    if manter_no_banco:
+        click.echo(f'Exportação de {ano} em {pasta} (status pendente; banco não alterado).')
+        return
+
+    # --- 3. Limpeza do banco numa transação; o manifesto só vira 'concluido' junto com ela ---
+    try:
+        for ids_lote in em_lotes(ids_movimentos, lote):
+            db.session.execute(delete(MovimentacaoCaixa).where(MovimentacaoCaixa.id.in_(ids_lote)))
+        for ids_lote in em_lotes(ids_itens, lote):
+            db.session.execute(delete(ItemServico).where(ItemServico.id.in_(ids_lote)))
+        for ids_lote in em_lotes(ids_servicos, lote):
+            db.session.execute(delete(Servico).where(Servico.id.in_(ids_lote)))
+        for ids_lote in em_lotes(ids_despesas, lote):
+            db.session.execute(delete(Despesa).where(Despesa.id.in_(ids_lote)))
+        manifesto['status'] = 'concluido'
+        grava_manifesto(caminho_manifesto, manifesto)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        manifesto['status'] = 'pendente'
+        grava_manifesto(caminho_manifesto, manifesto)
+        raise
+
+    click.echo(f'Ano {ano} arquivado em {pasta}: {len(ids_servicos)} serviço(s), {len(ids_itens)} item(ns), '
+               f'{len(ids_movimentos)} movimentação(ões), {len(ids_despesas)} despesa(s).')
+
+
+@bp.cli.command('arquivo-frio-listar')
+def arquivo_frio_listar():
+    """Lista os anos do arquivo frio e confere o sha256 de cada arquivo."""
+    base = current_app.config['ARQUIVO_FRIO_DIR']
+    pastas = sorted(n for n in os.listdir(base) if n.isdigit()) if os.path.isdir(base) else []
+    if not pastas:
+        click.echo('Arquivo frio vazio.')
+    for nome in pastas:
+        caminho_manifesto = os.path.join(base, nome, 'manifesto.json')
+        if not os.path.exists(caminho_manifesto):
+            click.echo(f'{nome}: sem manifesto (exportação interrompida)')
+            continue
+        with open(caminho_manifesto, encoding='utf-8') as f:
+            manifesto = json.load(f)
+        click.echo(f"{nome}: {manifesto['status']} em {manifesto['gerado_em']}")
+        for tabela, info in manifesto['tabelas'].items():
+            sha = hashlib.sha256()
+            with open(os.path.join(base, nome, info['arquivo']), 'rb') as arq:
+                for bloco in iter(lambda: arq.read(1024 * 1024), b''):
+                    sha.update(bloco)
+            situacao = 'ok' if sha.hexdigest() == info['sha256'] else 'SHA256 DIVERGENTE'
+            click.echo(f"  {tabela}: {info['linhas']} linha(s) [{situacao}]")
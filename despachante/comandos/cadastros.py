@@ -0,0 +1,145 @@
+"""Comandos de cadastros: CPF/CNPJ duplicado, placas, tipos de serviço e importação."""
+import os
+
+import click
+from flask import Blueprint
+from sqlalchemy import update
+
+from ..extensoes import db
+from ..modelos import Cliente, Veiculo, Servico, SaldoCliente, servico_arquivo
+from ..helpers import (
+    atualiza_saldo_cliente, somente_digitos, documento_valido, preenche_documentos, vincula_veiculos
+)
+from ..catalogo import migra_tipos_servico
+from ..importacao import importa_csv, IMPORTADORES
+
+bp = Blueprint('comandos_cadastros', __name__, cli_group=None)
+
+# ----------------------------------------------------
+# 12.3 CADASTROS (CPF/CNPJ duplicado, placas e tipos de serviço)
+# ----------------------------------------------------
+
+@bp.cli.command('clientes-deduplicar')
+@click.option('--aplicar', is_flag=True, help='Faz a fusão (sem a opção só lista os grupos encontrados).')
+@click.option('--lote', type=int, default=100, show_default=True, help='Grupos de duplicados por transação.')
+def clientes_deduplicar(aplicar, lote):
+    """Junta clientes com o mesmo CPF/CNPJ (só dígitos) no cadastro mais antigo.
+
+    Os serviços (ativos e arquivados) dos duplicados são religados ao cliente mantido com
+    UPDATE ... WHERE cliente_id IN (...) por lote, os campos vazios dele são completados com os
+    dos duplicados e o livro de saldos é recalculado. No fim preenche Cliente.documento.
+    """
+    grupos = {}
+    for cliente_id, cpf_cnpj in db.session.query(Cliente.id, Cliente.cpf_cnpj).order_by(Cliente.id):
+        digitos = somente_digitos(cpf_cnpj)
+        if digitos:
+            grupos.setdefault(digitos, []).append(cliente_id)
+    duplicados = {doc: ids for doc, ids in grupos.items() if len(ids) > 1}
+    invalidos = [doc for doc in grupos if not documento_valido(doc)]
+
+    click.echo(f'{len(grupos)} documento(s) distinto(s), {len(duplicados)} com mais de um cliente, '
+               f'{len(invalidos)} com dígitos verificadores inválidos.')
+    for doc, ids in list(duplicados.items())[:50]:
+        click.echo(f'  {doc}: mantém #{ids[0]}, junta {", ".join(f"#{i}" for i in ids[1:])}')
+
+    if not aplicar:
+        if duplicados:
+            click.echo('Nada alterado (use --aplicar para juntar).')
+        return
+
+    campos = ('telefone', 'email', 'endereco')
+    itens = list(duplicados.items())
+    total_servicos = total_clientes = 0
+    for inicio in range(0, len(itens), lote):
+        for doc, ids in itens[inicio:inicio + lote]:
+            mantido_id, outros = ids[0], ids[1:]
+
+            total_servicos += db.session.execute(
+                update(Servico).where(Servico.cliente_id.in_(outros)).values(cliente_id=mantido_id)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.execute(
+                servico_arquivo.update().where(servico_arquivo.c.cliente_id.in_(outros)).values(cliente_id=mantido_id)
+            )
+            db.session.execute(
+                update(Veiculo).where(Veiculo.cliente_id.in_(outros)).values(cliente_id=mantido_id)
+                .execution_options(synchronize_session=False)
+            )
+
+            # Completa telefone/e-mail/endereço vazios com o primeiro duplicado que tiver
+            mantido = db.session.get(Cliente, mantido_id)
+            for outro in Cliente.query.filter(Cliente.id.in_(outros)).order_by(Cliente.id):
+                for campo in campos:
+                    if not getattr(mantido, campo) and getattr(outro, campo):
+                        setattr(mantido, campo, getattr(outro, campo))
+
+            SaldoCliente.query.filter(SaldoCliente.cliente_id.in_(outros)).delete(synchronize_session=False)
+            total_clientes += Cliente.query.filter(Cliente.id.in_(outros)).delete(synchronize_session=False)
+            db.session.flush()  # libera o documento dos duplicados antes de gravar no mantido
+            mantido.documento = doc
+            atualiza_saldo_cliente(mantido_id)
+        db.session.commit()
+        click.echo(f'  lote: {min(inicio + lote, len(itens))}/{len(itens)} grupo(s)')
+
+    preenchidos, restantes = preenche_documentos()
+    db.session.commit()
+    click.echo(f'Fusão: {total_clientes} cliente(s) removido(s), {total_servicos} serviço(s) religado(s), '
+               f'{preenchidos} documento(s) preenchido(s).')
+    if restantes:
+        click.echo(f'Atenção: {len(restantes)} cliente(s) ainda sem documento: {restantes[:20]}', err=True)
+
+
+@bp.cli.command('veiculos-vincular')
+@click.option('--lote', type=int, default=1000, show_default=True, help='Serviços por UPDATE em lote.')
+def veiculos_vincular(lote):
+    """Cria os veículos a partir das placas digitadas e liga os serviços sem veiculo_id."""
+    criados, vinculados = vincula_veiculos(lote)
+    db.session.commit()
+    sem_placa = Servico.query.filter(Servico.veiculo_id.is_(None)).count()
+    click.echo(f'{criados} veículo(s) criado(s), {vinculados} serviço(s) vinculado(s); '
+               f'{sem_placa} serviço(s) sem placa ficaram sem veículo.')
+
+
+@bp.cli.command('tipos-servico-migrar')
+def tipos_servico_migrar():
+    """Monta o catálogo TipoServico a partir do texto livre dos serviços e liga os serviços a ele."""
+    criados, vinculados = migra_tipos_servico()
+    db.session.commit()
+    sem_tipo = Servico.query.filter(Servico.tipo_servico_id.is_(None)).count()
+    click.echo(f'{criados} tipo(s) criado(s), {vinculados} serviço(s) vinculado(s); {sem_tipo} sem tipo.')
+
+
+@bp.cli.command('importar')
+@click.argument('tipo', type=click.Choice(list(IMPORTADORES)))
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--lote', type=int, default=1000, show_default=True, help='Linhas por INSERT em lote (e por commit).')
+@click.option('--erros', 'arquivo_erros', default=None,
+              help='Relatório das linhas rejeitadas (padrão: <arquivo>.erros.csv).')
+def importar(tipo, arquivo, lote, arquivo_erros):
+    """Importa clientes, serviços (com itens e recebimento inicial) ou pagamentos de um CSV.
+
+    Colunas: clientes = nome, cpf_cnpj[, telefone, email, endereco];
+    servicos = cpf_cnpj, tipo_servico, data_servico[, placa, data_vencimento, valor_total,
+    valor_recebido, status_processo, detalhes, itens ("desc:valor|desc:valor")];
+    pagamentos = valor, data_pagamento e servico_id ou cpf_cnpj + placa + data_servico[, metodo].
+    Separador ';' ou ','; datas AAAA-MM-DD ou DD/MM/AAAA.
+    """
+    arquivo_erros = arquivo_erros or f'{arquivo}.erros.csv'
+
+    def progresso(totais):
+        click.echo(f"  {totais['importadas']} importada(s), {totais['rejeitadas']} rejeitada(s)...")
+
+    with open(arquivo, encoding='utf-8-sig', newline='') as entrada, \
+            open(arquivo_erros, 'w', encoding='utf-8-sig', newline='') as erros:
+        try:
+            totais = importa_csv(tipo, entrada, erros, lote=lote, progresso=progresso)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+    click.echo(f"{totais['lidas']} linha(s) lida(s): {totais['importadas']} importada(s), "
+               f"{totais['rejeitadas']} rejeitada(s) em {totais['segundos']:.1f} s "
+               f"({totais['lidas'] / max(totais['segundos'], 0.001):.0f} linhas/s).")
+    if totais['rejeitadas']:
+        click.echo(f'Linhas rejeitadas (com o motivo) em {arquivo_erros}')
+    else:
+        os.remove(arquivo_erros)
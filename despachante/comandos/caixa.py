@@ -0,0 +1,66 @@
+"""Comandos do caixa: fechamento/reabertura e lista de cobrança do dia."""
+from datetime import datetime
+
+import click
+from flask import Blueprint
+
+from ..extensoes import db
+from ..fechamento import PERIODOS_FECHAMENTO, fecha_caixa, reabre_caixa, saldo_caixa
+from ..cobranca import gera_lista_cobranca
+
+bp = Blueprint('comandos_caixa', __name__, cli_group=None)
+
+# ----------------------------------------------------
+# 12.4 FECHAMENTO DE CAIXA
+# ----------------------------------------------------
+
+@bp.cli.command('caixa-fechar')
+@click.option('--ate', default=None, help='Último dia a fechar (AAAA-MM-DD; padrão: ontem).')
+@click.option('--periodo', type=click.Choice(PERIODOS_FECHAMENTO), default='dia', show_default=True,
+              help='Um fechamento por dia ou por mês (mês: só meses completos).')
+def caixa_fechar(ate, periodo):
+    """Fecha o caixa do dia seguinte ao último fechamento até --ate (rodar todo dia no cron)."""
+    try:
+        ate = datetime.strptime(ate, '%Y-%m-%d').date() if ate else None
+        criados = fecha_caixa(ate, periodo, usuario='cron')
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    db.session.commit()
+    if not criados:
+        click.echo('Nada a fechar.')
+        return
+    click.echo(f'{len(criados)} fechamento(s) de {criados[0]["data_inicio"]:%d/%m/%Y} a {criados[-1]["data_fim"]:%d/%m/%Y}; '
+               f'saldo final R$ {criados[-1]["saldo_final"]:.2f}.')
+
+
+@bp.cli.command('caixa-reabrir')
+@click.argument('desde')
+@click.option('--sim', is_flag=True, help='Não pede confirmação.')
+def caixa_reabrir(desde, sim):
+    """Apaga os fechamentos que terminam em DESDE (AAAA-MM-DD) ou depois, liberando esses dias para correção."""
+    try:
+        desde = datetime.strptime(desde, '%Y-%m-%d').date()
+    except ValueError:
+        raise click.ClickException('Data inválida (use AAAA-MM-DD).')
+    if not sim:
+        click.confirm(f'Reabrir o caixa a partir de {desde:%d/%m/%Y}?', abort=True)
+    removidos = reabre_caixa(desde)
+    db.session.commit()
+    click.echo(f'{removidos} fechamento(s) removido(s). Saldo atual do caixa: R$ {saldo_caixa():.2f}.')
+
+
+# ----------------------------------------------------
+# 12.5 COBRANÇA (lista do dia)
+# ----------------------------------------------------
+
+@bp.cli.command('cobranca-gerar')
+@click.option('--data', default=None, help='Data de referência dos dias de atraso (AAAA-MM-DD; padrão: hoje).')
+def cobranca_gerar(data):
+    """Recria a lista de cobrança (serviços vencidos a cobrar); rodar de madrugada no cron."""
+    try:
+        hoje = datetime.strptime(data, '%Y-%m-%d').date() if data else None
+    except ValueError:
+        raise click.ClickException('Data inválida (use AAAA-MM-DD).')
+    quantidade = gera_lista_cobranca(hoje)
+    db.session.commit()
+    click.echo(f'Lista de cobrança gerada: {quantidade} serviço(s).')
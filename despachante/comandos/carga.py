@@ -0,0 +1,168 @@
+"""Comandos de medição: teste de carga, planos de consulta e subida do worker."""
+import os
+import json
+import time
+
+import click
+from flask import Blueprint, current_app
+
+from ..extensoes import db
+from ..carga import semeia_banco, dados_para_simulacao, simula_escritorio
+from ..planos import ARQUIVO_PLANOS, captura_planos, compara_planos, le_foto, grava_foto
+
+bp = Blueprint('comandos_carga', __name__, cli_group=None)
+
+# ----------------------------------------------------
+# 12.7 TESTE DE CARGA (ver despachante/carga.py)
+# ----------------------------------------------------
+
+@bp.cli.command('carga-semear')
+@click.option('--clientes', type=int, default=2000, show_default=True)
+@click.option('--servicos-por-cliente', type=int, default=3, show_default=True, help='Média de serviços por cliente.')
+@click.option('--usuarios', type=int, default=10, show_default=True, help='Usuários carga01..N (senha: carga123).')
+@click.option('--semente', type=int, default=42, show_default=True)
+def carga_semear(clientes, servicos_por_cliente, usuarios, semente):
+    """Enche o banco para o teste de carga (use um banco separado: DATABASE_URL=...)."""
+    totais = semeia_banco(clientes, servicos_por_cliente, usuarios, semente)
+    click.echo(f"{totais['usuarios']} usuário(s) de carga; clientes: {totais['clientes']['importadas']} importado(s); "
+               f"serviços: {totais['servicos']['importadas']} importado(s).")
+
+
+def _espera_servidor(url, processo, limite=60):
+    import urllib.request
+    import urllib.error
+
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise click.ClickException('O gunicorn terminou antes de aceitar conexões (veja a saída acima).')
+        try:
+            urllib.request.urlopen(url + '/login', timeout=2).close()
+            return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    raise click.ClickException(f'Servidor não respondeu em {limite} s.')
+
+
+@bp.cli.command('carga-simular')
+@click.option('--url', default='http://127.0.0.1:8000', show_default=True, help='Servidor já rodando (ignorado com --workers).')
+@click.option('--workers', type=int, default=0, help='Sobe um gunicorn próprio com N workers (0 = usa --url).')
+@click.option('--threads', type=int, default=1, show_default=True, help='Threads por worker do gunicorn próprio.')
+@click.option('--porta', type=int, default=8099, show_default=True, help='Porta do gunicorn próprio.')
+@click.option('--sessoes', type=int, default=10, show_default=True, help='Funcionários simultâneos.')
+@click.option('--duracao', type=int, default=60, show_default=True, help='Segundos de simulação.')
+@click.option('--pensar', type=float, default=0.5, show_default=True, help='Pausa média entre telas (s); 0 = sem pausa.')
+@click.option('--json', 'arquivo_json', default=None, help='Acrescenta o resultado (uma linha JSON) neste arquivo.')
+def carga_simular(url, workers, threads, porta, sessoes, duracao, pensar, arquivo_json):
+    """Simula um dia de escritório: N sessões logadas fazendo cadastros, pagamentos, relatórios e PDFs."""
+    import subprocess
+    import sys
+
+    import secrets
+
+    dados = dados_para_simulacao()
+    processo = None
+    # Servidor externo (--url): as métricas só vêm se ele tiver o mesmo METRICAS_TOKEN deste ambiente
+    token = current_app.config['METRICAS_TOKEN']
+    if workers:
+        url = f'http://127.0.0.1:{porta}'
+        token = token or secrets.token_hex(16)
+        processo = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{porta}',
+             '--workers', str(workers), '--threads', str(threads)],
+            cwd=os.path.dirname(current_app.root_path),
+            env=dict(os.environ, METRICAS_ATIVAS='1', METRICAS_TOKEN=token, METRICAS_INTERVALO='1')
+        )
+    try:
+        if processo:
+            _espera_servidor(url, processo)
+        relatorio = simula_escritorio(url.rstrip('/'), dados, sessoes, duracao, pensar, token_metricas=token)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        if processo:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    relatorio.update(banco_dados=db.engine.url.get_backend_name(), workers=workers or None, threads=threads if workers else None)
+    click.echo(f"{relatorio['banco_dados']} | {relatorio['sessoes']} sessões | {relatorio['requisicoes']} requisições em "
+               f"{relatorio['segundos']} s = {relatorio['por_segundo']} req/s | p50 {relatorio['p50_ms']} ms, "
+               f"p95 {relatorio['p95_ms']} ms, p99 {relatorio['p99_ms']} ms | erros {100 * relatorio['taxa_erros']:.2f}%, "
+               f"travas {100 * relatorio['taxa_travas']:.2f}%")
+    click.echo(f"{'rota':<24}{'req':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'erros':>7}{'travas':>7}")
+    for rota, r in relatorio['rotas'].items():
+        click.echo(f"{rota:<24}{r['requisicoes']:>7}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                   f"{r['max_ms']:>9.1f}{r['erros']:>7}{r['travas']:>7}")
+    if 'banco' in relatorio:
+        b = relatorio['banco']
+        click.echo(f"SQL: {b['comandos']} comandos, {b['segundos_em_sql']} s no total, {b['media_comando_ms']} ms por comando, "
+                   f"{b['sql_por_requisicao_ms']} ms por requisição.")
+    else:
+        click.echo('SQL: /metrics do servidor não respondeu (METRICAS_ATIVAS=0 ou METRICAS_TOKEN diferente).')
+    if arquivo_json:
+        with open(arquivo_json, 'a', encoding='utf-8') as arq:
+            arq.write(json.dumps(relatorio, ensure_ascii=False) + '\n')
+
+
+# ----------------------------------------------------
+# 12.8 PLANOS DE CONSULTA (regressão; ver despachante/planos.py)
+# ----------------------------------------------------
+
+@bp.cli.command('planos-consultas')
+@click.option('--atualizar', is_flag=True, help='Grava a foto atual em vez de comparar (depois de uma mudança aceita).')
+@click.option('--arquivo', default=None, help=f'Foto dos planos (padrão: {ARQUIVO_PLANOS} na raiz do projeto).')
+@click.option('--clientes', type=int, default=300, show_default=True, help='Tamanho do banco semeado.')
+def planos_consultas(atualizar, arquivo, clientes):
+    """Confere comandos SQL e planos (EXPLAIN) das rotas de relatório contra a foto; sai com erro se piorou."""
+    arquivo = arquivo or os.path.join(os.path.dirname(current_app.root_path), ARQUIVO_PLANOS)
+    atual = captura_planos(clientes=clientes)
+    for nome, dados in atual.items():
+        varreduras = ', '.join(f'{t} {n}x' for t, n in dados['varreduras'].items()) or '-'
+        click.echo(f"{nome:<32}{dados['status']:>5}{dados['comandos']:>5} comando(s)   SCAN: {varreduras}")
+
+    if atualizar or not os.path.exists(arquivo):
+        grava_foto(arquivo, atual)
+        click.echo(f'Foto gravada em {arquivo}.')
+        return
+    problemas = compara_planos(le_foto(arquivo), atual)
+    for problema in problemas:
+        click.echo(problema)
+    if any(not p.startswith('+ ') for p in problemas):
+        raise click.ClickException('Regressão nos planos de consulta (se a mudança é intencional: --atualizar).')
+    click.echo('Planos de consulta iguais ou melhores que a foto.')
+
+
+# Executado num processo novo a cada medição: o import frio é justamente o que se quer medir
+_CODIGO_BENCHMARK = '''
+import json, sys, time
+inicio = time.perf_counter()
+from despachante import create_app
+app = create_app()
+criado = time.perf_counter()
+app.test_client().get('/login')
+fim = time.perf_counter()
+print(json.dumps({'create_app': (criado - inicio) * 1000, 'primeira_requisicao': (fim - criado) * 1000,
+                  'reportlab': 'reportlab' in sys.modules}))
+'''
+
+
+@bp.cli.command('benchmark-inicializacao')
+@click.option('--repeticoes', type=int, default=5, show_default=True)
+def benchmark_inicializacao(repeticoes):
+    """Mede a subida de um worker (import + create_app) e a 1ª requisição, sem e com AQUECER."""
+    import statistics
+    import subprocess
+    import sys
+
+    raiz = os.path.dirname(current_app.root_path)
+    for aquecer in ('0', '1'):
+        medidas = []
+        for _ in range(repeticoes):
+            ambiente = dict(os.environ, AQUECER=aquecer, INICIALIZAR_BANCO='0')
+            saida = subprocess.run([sys.executable, '-c', _CODIGO_BENCHMARK], cwd=raiz, env=ambiente,
+                                   capture_output=True, text=True, check=True).stdout
+            medidas.append(json.loads(saida.strip().splitlines()[-1]))
+        criar = statistics.median(m['create_app'] for m in medidas)
+        primeira = statistics.median(m['primeira_requisicao'] for m in medidas)
+        click.echo(f"AQUECER={aquecer}: create_app {criar:.0f} ms | 1ª requisição {primeira:.1f} ms | "
+                   f"ReportLab carregado na subida: {'sim' if any(m['reportlab'] for m in medidas) else 'não'}")
@@ -0,0 +1,16 @@
+"""Utilitários comuns aos comandos em lote."""
+import os
+import json
+
+
+def em_lotes(ids, tamanho):
+    ids = list(ids)
+    for i in range(0, len(ids), tamanho):
+        yield ids[i:i + tamanho]
+
+
+def grava_manifesto(caminho, manifesto):
+    """Grava o manifesto JSON por cima do anterior sem deixar um arquivo pela metade."""
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(caminho + '.tmp', caminho)
@@ -0,0 +1,136 @@
+"""Comandos de manutenção e deploy: cache de relatórios, banco SQLite e estáticos comprimidos."""
+import os
+import sqlite3
+import mimetypes
+from datetime import datetime
+
+import click
+from flask import Blueprint, current_app
+
+from ..extensoes import db
+from ..cache_resultados import backend_cache, estatisticas_cache
+
+bp = Blueprint('comandos_manutencao', __name__, cli_group=None)
+
+# ----------------------------------------------------
+# 12.6 CACHE DE RELATÓRIOS
+# ----------------------------------------------------
+
+@bp.cli.command('cache-relatorios')
+@click.option('--limpar', is_flag=True, help='Esvazia o backend (no modo memória, só o deste processo).')
+def cache_relatorios(limpar):
+    """Mostra o uso do cache de relatórios; com --limpar, descarta tudo."""
+    backend = backend_cache()
+    if backend is None:
+        raise click.ClickException('Cache de relatórios desligado (CACHE_RELATORIOS) ou banco sem a tabela versao_dados.')
+    if limpar:
+        backend.limpa()
+    estatisticas = estatisticas_cache()
+    click.echo(f"Backend {estatisticas['backend']}: {estatisticas['itens']} resultado(s), "
+               f"{estatisticas['bytes'] / 1024:.1f} KB de {estatisticas['limite_bytes'] // (1024 * 1024)} MB.")
+
+
+# ----------------------------------------------------
+# 12.9 BANCO SQLITE E DEPLOY
+# ----------------------------------------------------
+
+def _caminho_banco_sqlite():
+    """Caminho do arquivo SQLite em uso; encerra o comando se o banco não for SQLite."""
+    if db.engine.dialect.name != 'sqlite' or not db.engine.url.database:
+        raise click.ClickException('Este comando só se aplica ao banco SQLite em arquivo.')
+    return db.engine.url.database
+
+
+@bp.cli.command('sqlite-manutencao')
+@click.option('--vacuum', is_flag=True,
+              help='Também roda VACUUM (reescreve o arquivo e bloqueia gravações: use fora do expediente).')
+def sqlite_manutencao(vacuum):
+    """Checkpoint do WAL, ANALYZE/optimize e, opcionalmente, VACUUM do banco SQLite."""
+    caminho = _caminho_banco_sqlite()
+    tamanho_antes = os.path.getsize(caminho)
+
+    conexao = sqlite3.connect(caminho, timeout=current_app.config['SQLITE_PRAGMAS']['busy_timeout'] / 1000)
+    try:
+        ocupado, paginas_wal, paginas_copiadas = conexao.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+        click.echo(f'Checkpoint do WAL: {paginas_copiadas}/{paginas_wal} página(s) copiadas'
+                   f'{" (parcial: havia leitores ativos)" if ocupado else ""}.')
+        conexao.execute('ANALYZE')
+        conexao.execute('PRAGMA optimize')
+        click.echo('Estatísticas do planejador atualizadas (ANALYZE/optimize).')
+        if vacuum:
+            conexao.execute('VACUUM')
+            click.echo('VACUUM concluído.')
+    finally:
+        conexao.close()
+
+    click.echo(f'Tamanho do banco: {tamanho_antes / 1024:.0f} KiB -> {os.path.getsize(caminho) / 1024:.0f} KiB')
+
+
+@bp.cli.command('sqlite-backup')
+@click.argument('destino', required=False)
+@click.option('--paginas', type=int, default=1024, show_default=True,
+              help='Páginas copiadas por etapa quando o banco não está em WAL.')
+def sqlite_backup(destino, paginas):
+    """Cópia online do banco SQLite pela API de backup (não interrompe quem está gravando).
+
+    Em WAL a cópia é feita de uma vez sobre um snapshot de leitura, que não bloqueia
+    gravações; fora do WAL ela anda em etapas, liberando o lock entre uma e outra.
+    """
+    caminho = _caminho_banco_sqlite()
+    if not destino:
+        pasta = os.path.join(current_app.instance_path, 'backups')
+        os.makedirs(pasta, exist_ok=True)
+        destino = os.path.join(pasta, f"despachante_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
+
+    origem = sqlite3.connect(caminho, timeout=current_app.config['SQLITE_PRAGMAS']['busy_timeout'] / 1000)
+    copia = sqlite3.connect(destino)
+    try:
+        modo = origem.execute('PRAGMA journal_mode').fetchone()[0]
+        etapa = -1 if modo.lower() == 'wal' else paginas
+
+        def progresso(status, restantes, total):
+            if total:
+                click.echo(f'\r  {total - restantes}/{total} páginas', nl=False)
+
+        origem.backup(copia, pages=etapa, progress=progresso, sleep=0.05)
+        click.echo('')
+        resultado = copia.execute('PRAGMA quick_check').fetchone()[0]
+    finally:
+        copia.close()
+        origem.close()
+
+    if resultado != 'ok':
+        raise click.ClickException(f'Backup gravado em {destino}, mas a verificação falhou: {resultado}')
+    click.echo(f'Backup concluído e verificado: {destino} ({os.path.getsize(destino) / 1024:.0f} KiB)')
+
+
+@bp.cli.command('inicializar-banco')
+def inicializar_banco():
+    """Cria/atualiza as tabelas e índices (use no deploy, antes de subir o gunicorn)."""
+    from ..banco import inicializa_banco
+
+    inicializa_banco()
+    click.echo('Banco de dados inicializado.')
+
+
+@bp.cli.command('comprimir-estaticos')
+@click.option('--minimo', type=int, default=None, help='Tamanho mínimo em bytes (padrão: COMPRESSAO_MINIMO).')
+def comprimir_estaticos(minimo):
+    """Gera os .gz/.br dos arquivos de static/ (rodar no deploy); servidos no lugar do original."""
+    from ..compressao import comprime_arquivo
+
+    minimo = current_app.config['COMPRESSAO_MINIMO'] if minimo is None else minimo
+    tipos = current_app.config['COMPRESSAO_TIPOS']
+    total_original = total_gzip = 0
+    for pasta, _, arquivos in os.walk(current_app.static_folder):
+        for nome in sorted(arquivos):
+            caminho = os.path.join(pasta, nome)
+            tipo = mimetypes.guess_type(nome)[0]
+            if nome.endswith(('.gz', '.br')) or tipo not in tipos or os.path.getsize(caminho) < minimo:
+                continue
+            tamanhos = comprime_arquivo(caminho, current_app.config)
+            total_original += tamanhos['original']
+            total_gzip += tamanhos['gzip']
+            click.echo(f"{os.path.relpath(caminho, current_app.static_folder)}: {tamanhos['original']} -> "
+                       + ', '.join(f'{k} {v}' for k, v in tamanhos.items() if k != 'original'))
+    click.echo(f'Total: {total_original} -> {total_gzip} bytes (gzip).')
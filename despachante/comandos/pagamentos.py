@@ -0,0 +1,492 @@
+"""Comandos de pagamentos: demonstrativos de débitos, livro de saldos, estresse e reconciliação do caixa."""
+import os
+import json
+import uuid
+import time
+from datetime import datetime, date
+
+import click
+from flask import Blueprint
+from sqlalchemy import func, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from ..extensoes import db
+from ..modelos import Cliente, Veiculo, Servico, MovimentacaoCaixa, SaldoCliente, servico_arquivo
+from ..helpers import (
+    atualiza_status_pagamento, expressao_status_pagamento, registra_pagamento, consulta_saldos_abertos,
+    atualiza_saldo_cliente, reconstroi_saldos_clientes
+)
+from ..fechamento import caixa_fechado_ate
+from ..pdf import gera_pdf_debitos
+from .comum import em_lotes, grava_manifesto
+
+bp = Blueprint('comandos_pagamentos', __name__, cli_group=None)
+
+# ----------------------------------------------------
+# 12. PAGAMENTOS E SALDOS (demonstrativos, livro de saldos, reconciliação)
+# ----------------------------------------------------
+
+
+def _nome_arquivo_demonstrativo(cliente_id, nome):
+    """Gera um nome de arquivo estável (e sem acentos) para o PDF do cliente."""
+    import re
+    import unicodedata
+
+    slug = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode('ascii')
+    slug = re.sub(r'[^a-z0-9]+', '_', slug.lower()).strip('_')[:40]
+    return f"debitos_{cliente_id:06d}_{slug or 'cliente'}.pdf"
+
+
+def _renderiza_demonstrativo(tarefa):
+    """Executado nos processos filhos: gera o PDF de um cliente e grava no destino."""
+    destino, arquivo, cliente, debitos = tarefa
+    pdf = gera_pdf_debitos(debitos, cliente=cliente, por_cliente=True)
+
+    # Grava em arquivo temporário e renomeia: um PDF pela metade nunca conta como pronto
+    caminho = os.path.join(destino, arquivo)
+    with open(caminho + '.tmp', 'wb') as f:
+        f.write(pdf)
+    os.replace(caminho + '.tmp', caminho)
+    return cliente['id'], len(pdf)
+
+
+@bp.cli.command('demonstrativos-debitos')
+@click.option('--destino', default='demonstrativos_debitos', show_default=True,
+              help='Pasta base; cada lote fica numa subpasta própria (destino/<lote>).')
+@click.option('--lote', default=None,
+              help='Identificador do lote (padrão: mês atual, AAAA-MM). Só se retoma dentro do mesmo lote.')
+@click.option('--workers', type=int, default=None,
+              help='Processos de renderização (padrão: número de núcleos).')
+@click.option('--zip', 'arquivo_zip', default=None,
+              help='Se informado, empacota os PDFs e o manifesto neste arquivo .zip ao final.')
+@click.option('--recomecar', is_flag=True,
+              help='Ignora o manifesto existente e gera todos os PDFs novamente.')
+def demonstrativos_debitos(destino, lote, workers, arquivo_zip, recomecar):
+    """Gera o demonstrativo de débitos de cada cliente em aberto, em paralelo.
+
+    Os PDFs já listados no manifesto do lote (e presentes na pasta) são pulados, então
+    basta rodar o comando de novo para retomar um lote interrompido. Cliente cujo débito
+    mudou desde então é gerado de novo; quem quitou sai do manifesto.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from itertools import groupby
+
+    # Um lote por mês: o do mês que vem nunca reaproveita os PDFs (já velhos) deste
+    lote = lote or date.today().strftime('%Y-%m')
+    destino = os.path.join(destino, lote)
+    os.makedirs(destino, exist_ok=True)
+    caminho_manifesto = os.path.join(destino, 'manifesto.json')
+
+    manifesto = {'lote': lote, 'gerado_em': datetime.now().isoformat(timespec='seconds'), 'clientes': {}}
+    if not recomecar and os.path.exists(caminho_manifesto):
+        with open(caminho_manifesto, encoding='utf-8') as f:
+            anterior = json.load(f)
+        if anterior.get('lote') == lote:
+            manifesto = anterior
+        else:
+            click.echo(f'Manifesto de outro lote ({anterior.get("lote")}) ignorado.')
+
+    # --- 1. Uma única consulta de débitos, ordenada (agrupada) por cliente ---
+    debitos_raw = db.session.query(
+        Servico.id,
+        Servico.data_servico,
+        Servico.placa_veiculo,
+        Servico.tipo_servico,
+        Servico.valor_total,
+        Servico.valor_recebido,
+        (Servico.valor_total - Servico.valor_recebido).label('saldo_devedor'),
+        Servico.status_processo,
+        Cliente.id.label('cliente_id'),
+        Cliente.nome.label('cliente_nome'),
+        Cliente.cpf_cnpj,
+        Cliente.endereco,
+        Cliente.telefone,
+        Cliente.email
+    ).join(Cliente, Servico.cliente_id == Cliente.id).filter(
+        Servico.deleted_at.is_(None), Servico.valor_total > Servico.valor_recebido
+    ).order_by(Servico.cliente_id, Servico.data_servico.asc()).all()
+
+    # --- 2. Monta uma tarefa (dados simples, serializáveis) por cliente ---
+    tarefas = []
+    resumo = {}
+    concluidos = set()
+    for cliente_id, grupo in groupby(debitos_raw, key=lambda r: r.cliente_id):
+        grupo = list(grupo)
+        primeiro = grupo[0]
+        cliente = {
+            'id': cliente_id,
+            'nome': primeiro.cliente_nome,
+            'cpf_cnpj': primeiro.cpf_cnpj,
+            'endereco': primeiro.endereco,
+            'telefone': primeiro.telefone,
+            'email': primeiro.email,
+        }
+        debitos = [dict(row._mapping) for row in grupo]
+        arquivo = _nome_arquivo_demonstrativo(cliente_id, primeiro.cliente_nome)
+        resumo[cliente_id] = {
+            'arquivo': arquivo,
+            'nome': primeiro.cliente_nome,
+            'servicos': len(debitos),
+            'saldo': round(sum(d['saldo_devedor'] for d in debitos), 2),
+        }
+        # Já gerado neste lote e com o mesmo débito: pula
+        info = manifesto['clientes'].get(str(cliente_id))
+        if (info and os.path.exists(os.path.join(destino, info['arquivo']))
+                and info['servicos'] == resumo[cliente_id]['servicos'] and info['saldo'] == resumo[cliente_id]['saldo']):
+            concluidos.add(str(cliente_id))
+            continue
+        tarefas.append((destino, arquivo, cliente, debitos))
+
+    # Quem quitou (ou mudou de débito) desde a última rodada sai do manifesto e da pasta
+    for cid in set(manifesto['clientes']) - concluidos:
+        info = manifesto['clientes'].pop(cid)
+        novo = resumo.get(int(cid))
+        if (not novo or novo['arquivo'] != info['arquivo']) and os.path.exists(os.path.join(destino, info['arquivo'])):
+            os.remove(os.path.join(destino, info['arquivo']))
+
+    total = len(tarefas) + len(concluidos)
+    click.echo(f'{total} cliente(s) com débito; {len(concluidos)} já gerado(s), {len(tarefas)} a gerar.')
+
+    # --- 3. Renderização paralela, gravando o manifesto a cada PDF concluído ---
+    feitos = len(concluidos)
+    falhas = 0
+    if tarefas:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(_renderiza_demonstrativo, t): t[2]['id'] for t in tarefas}
+            try:
+                for futuro in as_completed(futuros):
+                    cliente_id = futuros[futuro]
+                    try:
+                        _, tamanho = futuro.result()
+                    except Exception as e:
+                        falhas += 1
+                        click.echo(f'  ERRO cliente #{cliente_id}: {e}', err=True)
+                        continue
+
+                    feitos += 1
+                    manifesto['clientes'][str(cliente_id)] = dict(resumo[cliente_id], bytes=tamanho)
+                    grava_manifesto(caminho_manifesto, manifesto)
+                    click.echo(f'[{feitos}/{total}] {resumo[cliente_id]["arquivo"]}')
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                click.echo('Interrompido. Rode o mesmo comando para continuar de onde parou.', err=True)
+                raise SystemExit(1)
+
+    grava_manifesto(caminho_manifesto, manifesto)
+
+    # --- 4. Empacotamento opcional em um único ZIP ---
+    if arquivo_zip and not falhas:
+        import zipfile
+        with zipfile.ZipFile(arquivo_zip, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.write(caminho_manifesto, 'manifesto.json')
+            for info in manifesto['clientes'].values():
+                zf.write(os.path.join(destino, info['arquivo']), info['arquivo'])
+        click.echo(f'ZIP gerado: {arquivo_zip}')
+
+    click.echo(f'Concluído: {feitos}/{total} PDF(s), {falhas} falha(s).')
+    if falhas:
+        raise SystemExit(1)
+
+
+@bp.cli.command('saldos-clientes')
+@click.option('--reconstruir', is_flag=True, help='Recria todo o livro de saldos a partir de Servico.')
+def saldos_clientes(reconstruir):
+    """Confere (ou reconstrói) o livro SaldoCliente contra a tabela Servico."""
+    if reconstruir:
+        reconstroi_saldos_clientes()
+        db.session.commit()
+        click.echo(f'Livro de saldos reconstruído: {SaldoCliente.query.count()} cliente(s).')
+        return
+
+    esperado = {row.cliente_id: row for row in consulta_saldos_abertos().all()}
+    registrado = {s.cliente_id: s for s in SaldoCliente.query.all()}
+
+    divergencias = 0
+    for cliente_id in sorted(set(esperado) | set(registrado)):
+        e = esperado.get(cliente_id)
+        r = registrado.get(cliente_id)
+        saldo_e, qtd_e, data_e = (e.saldo_aberto, e.servicos_abertos, e.data_mais_antiga) if e else (0.0, 0, None)
+        saldo_r, qtd_r, data_r = (r.saldo_aberto, r.servicos_abertos, r.data_mais_antiga) if r else (0.0, 0, None)
+        if abs((saldo_e or 0.0) - (saldo_r or 0.0)) > 0.01 or qtd_e != qtd_r or data_e != data_r:
+            divergencias += 1
+            click.echo(f'Cliente #{cliente_id}: esperado {saldo_e:.2f} ({qtd_e}, {data_e}) | livro {saldo_r:.2f} ({qtd_r}, {data_r})')
+
+    click.echo(f'{len(esperado)} cliente(s) com saldo em aberto, {divergencias} divergência(s).')
+    if divergencias:
+        click.echo('Use "flask saldos-clientes --reconstruir" para corrigir.')
+        raise SystemExit(1)
+
+
+@bp.cli.command('estresse-pagamentos')
+@click.option('--threads', type=int, default=8, show_default=True)
+@click.option('--pagamentos', type=int, default=200, show_default=True)
+@click.option('--valor', type=float, default=1.0, show_default=True)
+@click.option('--database-url', default=None,
+              help='Banco descartável (ex.: um PostgreSQL de teste, vazio). Padrão: SQLite temporário.')
+def estresse_pagamentos(threads, pagamentos, valor, database_url):
+    """Dispara pagamentos paralelos (e reenvios duplicados) num banco descartável e confere os totais.
+
+    Nunca roda no banco do app: sem --database-url usa um SQLite temporário, e o banco
+    informado precisa ser outro e estar vazio.
+    """
+    import tempfile
+    from ..banco import app_descartavel
+
+    if database_url:
+        database_url = database_url.replace('postgres://', 'postgresql://')
+        if _mesmo_banco(make_url(database_url), db.engine.url):
+            raise click.ClickException('--database-url é o banco do próprio app; use um banco de teste.')
+
+    with tempfile.TemporaryDirectory() as pasta:
+        app = app_descartavel(pasta, database_url)
+        with app.app_context():
+            if Cliente.query.first() is not None:
+                raise click.ClickException('O banco informado já tem clientes: use um banco vazio, só para o teste.')
+            try:
+                problemas = _estresse_pagamentos(app, threads, pagamentos, valor)
+            finally:
+                if database_url:
+                    # Banco de teste externo: não deixa nada para trás, nem se o teste quebrar no meio
+                    db.session.rollback()
+                    for modelo in (MovimentacaoCaixa, SaldoCliente, Servico, Veiculo, Cliente):
+                        modelo.query.delete()
+                    db.session.commit()
+            db.engine.dispose()
+
+    if problemas:
+        for p in problemas:
+            click.echo(f'FALHA: {p}', err=True)
+        raise SystemExit(1)
+    click.echo('OK: nenhum pagamento perdido ou duplicado.')
+
+
+def _mesmo_banco(url, outra):
+    if url.get_backend_name() != outra.get_backend_name():
+        return False
+    if url.get_backend_name() == 'sqlite':
+        return os.path.realpath(url.database or '') == os.path.realpath(outra.database or '')
+    return (url.host, url.port, url.database) == (outra.host, outra.port, outra.database)
+
+
+def _estresse_pagamentos(app, threads, pagamentos, valor):
+    """Executa o estresse no app (descartável) do contexto atual; devolve a lista de problemas."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    marca = uuid.uuid4().hex[:12]
+    cliente = Cliente(nome=f'ESTRESSE {marca}', cpf_cnpj='529.982.247-25', documento='52998224725')
+    db.session.add(cliente)
+    db.session.flush()
+    servico = Servico(
+        cliente_id=cliente.id, tipo_servico='Teste de Estresse', placa_veiculo='EST0000',
+        data_servico=date.today(), valor_total=pagamentos * valor, valor_recebido=0.0,
+        status_processo='Pendente'
+    )
+    atualiza_status_pagamento(servico)
+    db.session.add(servico)
+    atualiza_saldo_cliente(cliente.id)
+    db.session.commit()
+    cliente_id, servico_id = cliente.id, servico.id
+
+    def paga(i):
+        # Cada thread usa o próprio contexto (e sessão/conexão) como um worker separado
+        with app.app_context():
+            for tentativa in range(20):
+                try:
+                    registra_pagamento(servico_id, valor, date.today(), 'ESTRESSE', f'{marca}-{i}')
+                    db.session.commit()
+                    return 'ok'
+                except IntegrityError:
+                    db.session.rollback()
+                    return 'duplicado'
+                except OperationalError:
+                    # SQLite: "database is locked" — tenta de novo, como o usuário faria
+                    db.session.rollback()
+                    time.sleep(0.05 * (tentativa + 1))
+            return 'erro'
+
+    # Cada chave é enviada duas vezes para simular o duplo clique no formulário
+    envios = [i for i in range(pagamentos) for _ in range(2)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        resultados = list(executor.map(paga, envios))
+    duracao = time.perf_counter() - inicio
+
+    db.session.expire_all()
+    servico = db.session.get(Servico, servico_id)
+    soma_mov, qtd_mov = db.session.query(
+        func.coalesce(func.sum(MovimentacaoCaixa.valor), 0.0), func.count(MovimentacaoCaixa.id)
+    ).filter(MovimentacaoCaixa.referencia_tipo == 'Servico', MovimentacaoCaixa.referencia_id == servico_id).one()
+    saldo = db.session.get(SaldoCliente, cliente_id)
+
+    esperado = pagamentos * valor
+    problemas = []
+    if resultados.count('erro'):
+        problemas.append(f"{resultados.count('erro')} envio(s) falharam mesmo após novas tentativas")
+    if qtd_mov != pagamentos:
+        problemas.append(f'{qtd_mov} movimentações (esperado {pagamentos})')
+    if abs(servico.valor_recebido - esperado) > 0.001 or abs(soma_mov - esperado) > 0.001:
+        problemas.append(f'recebido {servico.valor_recebido:.2f} / caixa {soma_mov:.2f} (esperado {esperado:.2f})')
+    if servico.status_pagamento != 'Pago' or (saldo and saldo.servicos_abertos):
+        problemas.append(f'status {servico.status_pagamento} / saldo do cliente {saldo.saldo_aberto if saldo else None}')
+
+    click.echo(f'{len(envios)} envios em {duracao:.2f}s com {threads} threads: '
+               f"{resultados.count('ok')} ok, {resultados.count('duplicado')} duplicados ignorados.")
+    return problemas
+
+
+@bp.cli.command('reconciliar')
+@click.option('--reparar', is_flag=True,
+              help='Corrige em lotes: religa/remove órfãos e ajusta valor_recebido ao caixa.')
+@click.option('--remover-duplicados', is_flag=True,
+              help='Com --reparar, também apaga as movimentações duplicadas (mantém a mais antiga).')
+@click.option('--lote', type=int, default=1000, show_default=True, help='Linhas por transação no reparo.')
+@click.option('--detalhes', type=int, default=20, show_default=True, help='Quantos exemplos listar por tipo.')
+def reconciliar(reparar, remover_duplicados, lote, detalhes):
+    """Concilia Servico.valor_recebido com as MovimentacaoCaixa de referencia_tipo='Servico'.
+
+    Tudo é feito com consultas agrupadas (uma passada por tabela), sem buscar
+    serviço por serviço, para poder rodar toda noite em bases grandes. Só entram
+    linhas ativas (deleted_at IS NULL); o reparo também usa exclusão lógica.
+    """
+    from sqlalchemy import and_, exists, select, true
+    from sqlalchemy.orm import aliased
+
+    eh_servico = and_(MovimentacaoCaixa.referencia_tipo == 'Servico', MovimentacaoCaixa.deleted_at.is_(None))
+    # Serviços arquivados continuam válidos como referência das movimentações que ficaram no caixa
+    sem_servico = and_(
+        ~exists().where(Servico.id == MovimentacaoCaixa.referencia_id, Servico.deleted_at.is_(None)),
+        ~exists().where(servico_arquivo.c.id == MovimentacaoCaixa.referencia_id, servico_arquivo.c.deleted_at.is_(None))
+    )
+
+    # --- 1. Órfãs: movimentos de serviço sem serviço ativo correspondente ---
+    orfas = db.session.query(
+        MovimentacaoCaixa.id, MovimentacaoCaixa.referencia_id, MovimentacaoCaixa.data,
+        MovimentacaoCaixa.valor, MovimentacaoCaixa.descricao
+    ).filter(eh_servico, MovimentacaoCaixa.referencia_id.is_(None) | sem_servico).order_by(MovimentacaoCaixa.id).all()
+
+    # --- 2. Duplicadas: mesmo serviço, data, valor e descrição ---
+    m2 = aliased(MovimentacaoCaixa)
+    duplicadas = db.session.query(
+        MovimentacaoCaixa.id, MovimentacaoCaixa.referencia_id, MovimentacaoCaixa.data, MovimentacaoCaixa.valor
+    ).join(
+        m2, and_(
+            m2.referencia_tipo == 'Servico',
+            m2.deleted_at.is_(None),
+            m2.referencia_id == MovimentacaoCaixa.referencia_id,
+            m2.data == MovimentacaoCaixa.data,
+            m2.valor == MovimentacaoCaixa.valor,
+            m2.descricao == MovimentacaoCaixa.descricao,
+            m2.id < MovimentacaoCaixa.id
+        )
+    ).filter(eh_servico).distinct().order_by(MovimentacaoCaixa.id).all()
+
+    # --- 3. Divergências: valor_recebido x soma do caixa, num único LEFT JOIN agrupado ---
+    def consulta_divergencias():
+        soma_caixa = db.session.query(
+            MovimentacaoCaixa.referencia_id.label('servico_id'),
+            func.sum(MovimentacaoCaixa.valor).label('total_caixa')
+        ).filter(eh_servico, MovimentacaoCaixa.referencia_id.isnot(None)).group_by(
+            MovimentacaoCaixa.referencia_id
+        ).subquery()
+        total_caixa = func.coalesce(soma_caixa.c.total_caixa, 0.0)
+        return db.session.query(
+            Servico.id, Servico.cliente_id, Servico.valor_recebido, total_caixa.label('total_caixa')
+        ).outerjoin(soma_caixa, soma_caixa.c.servico_id == Servico.id).filter(
+            Servico.deleted_at.is_(None),
+            func.abs(func.coalesce(Servico.valor_recebido, 0.0) - total_caixa) > 0.01
+        ).order_by(Servico.id).all()
+
+    divergencias = consulta_divergencias()
+
+    click.echo(f'Movimentações órfãs: {len(orfas)} (R$ {sum(o.valor for o in orfas):.2f})')
+    for o in orfas[:detalhes]:
+        click.echo(f'  mov #{o.id} -> serviço #{o.referencia_id} {o.data} R$ {o.valor:.2f} "{o.descricao}"')
+    click.echo(f'Movimentações duplicadas (suspeitas): {len(duplicadas)}')
+    for d in duplicadas[:detalhes]:
+        click.echo(f'  mov #{d.id} repete um lançamento do serviço #{d.referencia_id} (R$ {d.valor:.2f})')
+    click.echo(f'Serviços com valor_recebido diferente do caixa: {len(divergencias)}')
+    for d in divergencias[:detalhes]:
+        click.echo(f'  serviço #{d.id}: recebido R$ {d.valor_recebido or 0:.2f} | caixa R$ {d.total_caixa:.2f}')
+
+    if not reparar:
+        if orfas or divergencias or duplicadas:
+            raise SystemExit(1)
+        return
+
+    # --- 4. Reparo em lotes ---
+    # Os UPDATE em lote não passam pelo before_flush: movimentações de dias já fechados ficam
+    # como estão (o fechamento congelou os totais) e são só listadas para ajuste ou caixa-reabrir.
+    fechado_ate = caixa_fechado_ate()
+    em_aberto = MovimentacaoCaixa.data > fechado_ate if fechado_ate else true()
+    fechadas = [m for m in orfas + (duplicadas if remover_duplicados else []) if fechado_ate and m.data <= fechado_ate]
+    if fechadas:
+        click.echo(f'{len(fechadas)} movimentação(ões) em período fechado (até {fechado_ate:%d/%m/%Y}) '
+                   'não foram alteradas; corrija com um lançamento de ajuste ou "flask caixa-reabrir":')
+        for m in fechadas[:detalhes]:
+            click.echo(f'  mov #{m.id} {m.data} R$ {m.valor:.2f}')
+    fechadas = {m.id for m in fechadas}
+
+    # 4.1 "Recebimento Inicial" gravado sem referencia_id (bug antigo do cadastro):
+    #     religa quando existe exatamente um serviço do mesmo dia/tipo a quem falta esse valor.
+    faltando = {d.id: (d.valor_recebido or 0.0) - d.total_caixa for d in divergencias}
+    religadas = 0
+    for o in orfas:
+        if o.id in fechadas or o.referencia_id is not None or not (o.descricao or '').startswith('Recebimento Inicial'):
+            continue
+        candidatos = [
+            s.id for s in Servico.query.with_entities(Servico.id, Servico.tipo_servico).filter(
+                Servico.data_servico == o.data, Servico.deleted_at.is_(None), Servico.id.in_(list(faltando))
+            ) if (o.descricao or '').endswith(f' - {s.tipo_servico}') and abs(faltando[s.id] - o.valor) <= 0.01
+        ]
+        if len(candidatos) == 1:
+            servico_id = candidatos[0]
+            MovimentacaoCaixa.query.filter(MovimentacaoCaixa.id == o.id, em_aberto).update({
+                'referencia_id': servico_id,
+                'descricao': (o.descricao or '').replace('Serviço #None', f'Serviço #{servico_id}')
+            }, synchronize_session=False)
+            faltando.pop(servico_id)
+            religadas += 1
+    db.session.commit()
+
+    # 4.2 Órfãs restantes (serviço excluído ou sem vínculo possível) saem do caixa por exclusão
+    #     lógica; as religadas acima já apontam para um serviço e não casam com o filtro.
+    agora = datetime.utcnow()
+    removidas = 0
+    for ids in em_lotes([o.id for o in orfas if o.id not in fechadas], lote):
+        removidas += MovimentacaoCaixa.query.filter(
+            MovimentacaoCaixa.id.in_(ids), em_aberto, MovimentacaoCaixa.referencia_id.is_(None) | sem_servico
+        ).update({'deleted_at': agora}, synchronize_session=False)
+        db.session.commit()
+
+    duplicadas_removidas = 0
+    if remover_duplicados:
+        for ids in em_lotes([d.id for d in duplicadas if d.id not in fechadas], lote):
+            duplicadas_removidas += MovimentacaoCaixa.query.filter(MovimentacaoCaixa.id.in_(ids), em_aberto).update(
+                {'deleted_at': agora}, synchronize_session=False
+            )
+            db.session.commit()
+
+    # 4.3 O caixa é a referência: valor_recebido, saldo e status recalculados em SQL
+    recebido = select(func.coalesce(func.sum(MovimentacaoCaixa.valor), 0.0)).where(
+        eh_servico, MovimentacaoCaixa.referencia_id == Servico.id
+    ).scalar_subquery()
+    total = func.coalesce(Servico.valor_total, 0.0)
+    ajustados = 0
+    for ids in em_lotes([d.id for d in consulta_divergencias()], lote):
+        ajustados += db.session.execute(
+            update(Servico).where(Servico.id.in_(ids)).values(
+                valor_recebido=recebido,
+                saldo_pendente=total - recebido,
+                status_pagamento=expressao_status_pagamento(total, recebido)
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+    reconstroi_saldos_clientes()
+    db.session.commit()
+    click.echo(f'Reparo: {religadas} recebimento(s) inicial(is) religado(s), '
+               f'{removidas} órfã(s) removida(s), '
+               f'{duplicadas_removidas} duplicada(s) removida(s), '
+               f'{ajustados} serviço(s) ajustado(s) ao caixa. Livro de saldos reconstruído.')
@@ -0,0 +1,281 @@
+"""Comandos de particionamento por data das tabelas grandes (somente PostgreSQL)."""
+import json
+from datetime import timedelta, date
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import text
+
+from ..extensoes import db
+from ..modelos import Servico, MovimentacaoCaixa, Despesa
+
+bp = Blueprint('comandos_particoes', __name__, cli_group=None)
+
+# ----------------------------------------------------
+# 12.2 PARTICIONAMENTO POR DATA (somente PostgreSQL)
+# ----------------------------------------------------
+
+# Tabela -> coluna de data usada como chave de partição (a mesma dos filtros dos relatórios)
+TABELAS_PARTICIONAVEIS = {
+    'movimentacao_caixa': 'data',
+    'servico': 'data_servico',
+    'despesa': 'data',
+}
+
+def _exige_postgres():
+    if db.engine.dialect.name != 'postgresql':
+        raise click.ClickException('Particionamento só está disponível no PostgreSQL.')
+
+def tabela_particionada(tabela):
+    return db.session.execute(
+        text('SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))'),
+        {'t': tabela}
+    ).scalar()
+
+def lista_particoes(tabela):
+    """[(nome, data_inicial, data_final)] das partições de intervalo (a DEFAULT fica de fora)."""
+    import re
+
+    linhas = db.session.execute(text(
+        'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:t) ORDER BY c.relname'
+    ), {'t': tabela}).all()
+    particoes = []
+    for nome, limite in linhas:
+        datas = re.findall(r"'(\d{4}-\d{2}-\d{2})'", limite or '')
+        if len(datas) == 2:
+            particoes.append((nome, date.fromisoformat(datas[0]), date.fromisoformat(datas[1])))
+    return particoes
+
+def _periodos(inicio, fim, granularidade):
+    """Gera (sufixo, data_inicial, data_final_exclusiva) de cada período entre as datas."""
+    atual = date(inicio.year, 1, 1) if granularidade == 'anual' else date(inicio.year, inicio.month, 1)
+    while atual <= fim:
+        if granularidade == 'anual':
+            proximo, sufixo = date(atual.year + 1, 1, 1), f'{atual.year}'
+        else:
+            proximo = date(atual.year + 1, 1, 1) if atual.month == 12 else date(atual.year, atual.month + 1, 1)
+            sufixo = f'{atual.year}{atual.month:02d}'
+        yield sufixo, atual, proximo
+        atual = proximo
+
+def garante_particoes(tabela, inicio, fim, granularidade):
+    """Cria (se faltarem) as partições de 'tabela' que cobrem o intervalo [inicio, fim]."""
+    criadas = []
+    for sufixo, de, ate in _periodos(inicio, fim, granularidade):
+        nome = f'{tabela}_p{sufixo}'
+        if db.session.execute(text('SELECT to_regclass(:n)'), {'n': nome}).scalar():
+            continue
+        db.session.execute(text(
+            f"CREATE TABLE {nome} PARTITION OF {tabela} FOR VALUES FROM ('{de.isoformat()}') TO ('{ate.isoformat()}')"
+        ))
+        criadas.append(nome)
+    return criadas
+
+def _granularidade_atual(tabela):
+    """Deduz a granularidade pelas partições existentes (cai na configuração se não houver)."""
+    particoes = lista_particoes(tabela)
+    if not particoes:
+        return current_app.config['PARTICOES_GRANULARIDADE']
+    _, de, ate = particoes[-1]
+    return 'mensal' if (ate - de).days < 40 else 'anual'
+
+def mantem_particoes(meses_a_frente=12):
+    """Cria as partições futuras de todas as tabelas já particionadas; retorna as criadas."""
+    criadas = []
+    fim = date.today() + timedelta(days=31 * meses_a_frente)
+    for tabela in TABELAS_PARTICIONAVEIS:
+        if tabela_particionada(tabela):
+            criadas += garante_particoes(tabela, date.today(), fim, _granularidade_atual(tabela))
+    db.session.commit()
+    return criadas
+
+
+@bp.cli.command('particionar')
+@click.option('--tabela', 'tabelas', multiple=True, type=click.Choice(list(TABELAS_PARTICIONAVEIS)),
+              default=('movimentacao_caixa', 'servico'), show_default=True)
+@click.option('--granularidade', type=click.Choice(['anual', 'mensal']), default=None,
+              help='Padrão: PARTICOES_GRANULARIDADE da configuração.')
+@click.option('--meses-a-frente', type=int, default=12, show_default=True)
+@click.option('--remover-legado', is_flag=True, help='Apaga a tabela antiga (*_legado) depois da cópia.')
+@click.option('--sem-fk', is_flag=True,
+              help='Confirma a remoção das chaves estrangeiras que apontam para a tabela (ex.: item_servico -> servico).')
+def particionar(tabelas, granularidade, meses_a_frente, remover_legado, sem_fk):
+    """Migra tabelas sem partição para o layout particionado por intervalo de datas.
+
+    Para cada tabela: renomeia a atual para *_legado, cria a nova com as mesmas colunas
+    (PARTITION BY RANGE), as partições do período existente + uma DEFAULT, recria os
+    índices e copia as linhas, tudo numa transação com a tabela travada.
+
+    Limitações do PostgreSQL tratadas aqui: a chave primária vira um índice único
+    (id, data) e índices únicos ganham a coluna de data. As chaves estrangeiras da
+    tabela (ex.: servico -> cliente) são recriadas na nova; as que apontam para ela
+    (ex.: item_servico -> servico) não têm como continuar e só são removidas com --sem-fk.
+    A chave de idempotência dos pagamentos deixa de ser única sozinha (vira chave + data):
+    registra_pagamento a confere explicitamente, com o serviço travado.
+    """
+    _exige_postgres()
+    granularidade = granularidade or current_app.config['PARTICOES_GRANULARIDADE']
+    fim = date.today() + timedelta(days=31 * meses_a_frente)
+
+    for tabela in tabelas:
+        coluna = TABELAS_PARTICIONAVEIS[tabela]
+        if tabela_particionada(tabela):
+            click.echo(f'{tabela}: já está particionada.')
+            continue
+
+        legado = f'{tabela}_legado'
+        db.session.execute(text(f'LOCK TABLE {tabela} IN ACCESS EXCLUSIVE MODE'))
+        inicio = db.session.execute(text(f'SELECT MIN({coluna}) FROM {tabela}')).scalar() or date.today()
+        sequencia = db.session.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {'t': tabela}).scalar()
+
+        # 1. Chaves estrangeiras que apontam para a tabela não sobrevivem ao particionamento
+        #    (o id sozinho deixa de ser único); as da própria tabela são recriadas no passo 4
+        entrada = db.session.execute(text(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = to_regclass(:t)"
+        ), {'t': tabela}).all()
+        if entrada and not sem_fk:
+            db.session.rollback()
+            raise click.ClickException(
+                f'{tabela}: as chaves estrangeiras {", ".join(f"{r}.{c}" for r, c in entrada)} apontam para a tabela '
+                'e seriam removidas (o banco deixa de garantir esses vínculos). Rode de novo com --sem-fk para confirmar.')
+        for relacao, restricao in entrada:
+            db.session.execute(text(f'ALTER TABLE {relacao} DROP CONSTRAINT {restricao}'))
+            click.echo(f'  ATENÇÃO: chave estrangeira removida: {relacao}.{restricao}')
+        saida = db.session.execute(text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conrelid = to_regclass(:t)"
+        ), {'t': tabela}).all()
+
+        # 2. Tabela e índices atuais passam a ser *_legado (nomes de índice são globais no schema)
+        indices = db.session.execute(text(
+            'SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :t'
+        ), {'t': tabela}).scalars().all()
+        db.session.execute(text(f'ALTER TABLE {tabela} RENAME TO {legado}'))
+        for indice in indices:
+            db.session.execute(text(f'ALTER INDEX {indice} RENAME TO {indice[:55]}_legado'))
+
+        # 3. Nova tabela particionada (LIKE ... INCLUDING DEFAULTS reaproveita a sequência do id)
+        db.session.execute(text(f'CREATE TABLE {tabela} (LIKE {legado} INCLUDING DEFAULTS) PARTITION BY RANGE ({coluna})'))
+        db.session.execute(text(f'CREATE TABLE {tabela}_padrao PARTITION OF {tabela} DEFAULT'))
+        criadas = garante_particoes(tabela, inicio, fim, granularidade)
+
+        # 4. Índices: (id, data) no lugar da chave primária + os índices declarados no modelo
+        db.session.execute(text(f'CREATE UNIQUE INDEX {tabela}_id_key ON {tabela} (id, {coluna})'))
+        for indice in db.metadata.tables[tabela].indexes:
+            colunas = [c.name for c in indice.columns]
+            if indice.unique and coluna not in colunas:
+                colunas.append(coluna)
+            sql = f"CREATE {'UNIQUE ' if indice.unique else ''}INDEX {indice.name} ON {tabela} ({', '.join(colunas)})"
+            where = indice.dialect_options['postgresql'].get('where')
+            if where is not None:
+                sql += f' WHERE {where}'
+            db.session.execute(text(sql))
+
+        # 5. Cópia das linhas e posse da sequência
+        copiadas = db.session.execute(text(f'INSERT INTO {tabela} SELECT * FROM {legado}')).rowcount
+        # LIKE não copia chaves estrangeiras: recria as da tabela depois da cópia (uma validação só)
+        for restricao, definicao in saida:
+            db.session.execute(text(f'ALTER TABLE {tabela} ADD CONSTRAINT {restricao} {definicao}'))
+            click.echo(f'  chave estrangeira recriada: {tabela}.{restricao}')
+        if sequencia:
+            db.session.execute(text(f'ALTER SEQUENCE {sequencia} OWNED BY {tabela}.id'))
+        if remover_legado:
+            db.session.execute(text(f'DROP TABLE {legado}'))
+        db.session.commit()
+        db.session.execute(text(f'ANALYZE {tabela}'))
+        db.session.commit()
+        click.echo(f'{tabela}: {copiadas} linha(s) em {len(criadas)} partição(ões) {granularidade}(is)'
+                   f'{"" if remover_legado else f"; tabela antiga mantida como {legado}"}.')
+
+
+@bp.cli.command('particoes-manter')
+@click.option('--meses-a-frente', type=int, default=12, show_default=True)
+def particoes_manter(meses_a_frente):
+    """Cria antecipadamente as partições futuras (agendar mensalmente; a DEFAULT deve ficar vazia)."""
+    _exige_postgres()
+    criadas = mantem_particoes(meses_a_frente)
+    click.echo(f'{len(criadas)} partição(ões) criada(s){": " + ", ".join(criadas) if criadas else "."}')
+
+
+@bp.cli.command('particoes-desanexar')
+@click.argument('ate')
+@click.option('--tabela', 'tabelas', multiple=True, type=click.Choice(list(TABELAS_PARTICIONAVEIS)))
+@click.option('--concorrente', is_flag=True, help='DETACH ... CONCURRENTLY (PostgreSQL 14+, sem travar leituras).')
+def particoes_desanexar(ate, tabelas, concorrente):
+    """Desanexa as partições que terminam até a data ATE (AAAA-MM-DD) para armazenamento frio.
+
+    A partição vira uma tabela comum com o mesmo nome: pode ser exportada (pg_dump -t)
+    e apagada, ou reanexada com ALTER TABLE ... ATTACH PARTITION.
+    """
+    _exige_postgres()
+    limite = date.fromisoformat(ate)
+    tabelas = tabelas or [t for t in TABELAS_PARTICIONAVEIS if tabela_particionada(t)]
+
+    comandos = []
+    for tabela in tabelas:
+        for nome, _, fim in lista_particoes(tabela):
+            if fim <= limite + timedelta(days=1):
+                comandos.append(f'ALTER TABLE {tabela} DETACH PARTITION {nome}{" CONCURRENTLY" if concorrente else ""}')
+
+    # DETACH CONCURRENTLY não pode rodar dentro de uma transação
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+        for sql in comandos:
+            conexao.execute(text(sql))
+            click.echo(sql)
+    click.echo(f'{len(comandos)} partição(ões) desanexada(s).')
+
+
+@bp.cli.command('particoes-benchmark')
+@click.option('--inicio', required=True, help='Data inicial (AAAA-MM-DD) do período consultado.')
+@click.option('--fim', required=True, help='Data final (AAAA-MM-DD) do período consultado.')
+@click.option('--repeticoes', type=int, default=5, show_default=True)
+def particoes_benchmark(inicio, fim, repeticoes):
+    """Mede as consultas de período dos relatórios: partições lidas e tempo (x tabela *_legado)."""
+    import statistics
+
+    _exige_postgres()
+    inicio, fim = date.fromisoformat(inicio), date.fromisoformat(fim)
+
+    # Mesmos filtros usados por visualizar_caixa, relatorio_fluxo_caixa e relatorio_despesas
+    consultas = {
+        'visualizar_caixa': ('movimentacao_caixa', MovimentacaoCaixa.query.filter(
+            MovimentacaoCaixa.deleted_at.is_(None), MovimentacaoCaixa.data >= inicio, MovimentacaoCaixa.data <= fim
+        ).order_by(MovimentacaoCaixa.data.desc(), MovimentacaoCaixa.id.desc())),
+        'relatorio_fluxo_caixa': ('servico', Servico.query.filter(
+            Servico.deleted_at.is_(None), Servico.data_servico >= inicio, Servico.data_servico <= fim
+        )),
+        'relatorio_despesas': ('despesa', Despesa.query.filter(
+            Despesa.data >= inicio, Despesa.data <= fim
+        ).order_by(Despesa.data.desc())),
+    }
+
+    def relacoes(plano):
+        nomes = [plano['Relation Name']] if 'Relation Name' in plano else []
+        for filho in plano.get('Plans', []):
+            nomes += relacoes(filho)
+        return nomes
+
+    def mede(sql):
+        tempos, lidas = [], []
+        for _ in range(repeticoes):
+            resultado = db.session.execute(text(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}')).scalar()
+            plano = resultado[0] if isinstance(resultado, list) else json.loads(resultado)[0]
+            tempos.append(plano['Planning Time'] + plano['Execution Time'])
+            lidas = relacoes(plano['Plan'])
+        return statistics.median(tempos), lidas
+
+    for rota, (tabela, consulta) in consultas.items():
+        sql = str(consulta.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        tempo, lidas = mede(sql)
+        total = len(lista_particoes(tabela)) + 1 if tabela_particionada(tabela) else 1
+        click.echo(f'{rota}: {tempo:.2f} ms, {len(set(lidas))}/{total} partição(ões) lida(s)')
+
+        legado = f'{tabela}_legado'
+        if db.session.execute(text('SELECT to_regclass(:n)'), {'n': legado}).scalar():
+            import re
+            sql_legado = re.sub(rf'\b{tabela}\b', legado, sql)
+            tempo_legado, _ = mede(sql_legado)
+            click.echo(f'  sem partição ({legado}): {tempo_legado:.2f} ms -> {tempo_legado / max(tempo, 0.001):.1f}x')
+    db.session.rollback()
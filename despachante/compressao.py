@@ -0,0 +1,191 @@
+import os
+import zlib
+import mimetypes
+from collections import defaultdict
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+# Brotli é opcional (pip install brotli): sem ele fica só o gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ----------------------------------------------------
+# COMPRESSÃO DAS RESPOSTAS (gzip / brotli)
+# ----------------------------------------------------
+# Relatórios de períodos longos passam de megabytes em HTML; nos links lentos do escritório
+# o gzip/brotli reduz isso a uma fração. Respostas em streaming são comprimidas pedaço a
+# pedaço (com flush), então continuam chegando aos poucos no navegador.
+
+# Bytes economizados por rota desde a subida do processo: {endpoint: [respostas, original, enviado]}
+economia_por_rota = defaultdict(lambda: [0, 0, 0])
+
+
+def _codificacoes_aceitas():
+    """Codificações do Accept-Encoding com q > 0 (o werkzeug já trata '*' e os pesos)."""
+    return {nome for nome in ('br', 'gzip') if request.accept_encodings.quality(nome) > 0}
+
+
+def _escolhe_codificacao(config):
+    aceitas = _codificacoes_aceitas()
+    if brotli is not None and config['COMPRESSAO_BROTLI'] and 'br' in aceitas:
+        return 'br'
+    if 'gzip' in aceitas:
+        return 'gzip'
+    return None
+
+
+class _Compressor:
+    """Interface única para gzip (zlib) e brotli, com flush para o streaming."""
+
+    def __init__(self, codificacao, config):
+        self.codificacao = codificacao
+        if codificacao == 'br':
+            self._obj = brotli.Compressor(quality=config['COMPRESSAO_NIVEL_BROTLI'])
+        else:
+            # wbits=31: cabeçalho e rodapé gzip
+            self._obj = zlib.compressobj(config['COMPRESSAO_NIVEL_GZIP'], zlib.DEFLATED, 31)
+
+    def comprime(self, dados, flush=False):
+        if self.codificacao == 'br':
+            saida = self._obj.process(dados)
+            return saida + self._obj.flush() if flush else saida
+        saida = self._obj.compress(dados)
+        return saida + self._obj.flush(zlib.Z_SYNC_FLUSH) if flush else saida
+
+    def finaliza(self):
+        return self._obj.finish() if self.codificacao == 'br' else self._obj.flush()
+
+
+def _registra_economia(app, endpoint, codificacao, original, enviado, streaming=False):
+    totais = economia_por_rota[endpoint]
+    totais[0] += 1
+    totais[1] += original
+    totais[2] += enviado
+    if app.config['COMPRESSAO_LOG']:
+        app.logger.info(
+            'compressão %s %s%s: %d -> %d bytes (-%d, %.0f%%)',
+            endpoint, codificacao, ' streaming' if streaming else '', original, enviado,
+            original - enviado, 100.0 * (original - enviado) / original if original else 0
+        )
+
+
+def _comprime_streaming(app, resposta, compressor, endpoint):
+    """Troca o iterável da resposta por um gerador que comprime (e dá flush) a cada pedaço."""
+    pedacos = resposta.response
+
+    def gerador():
+        original = enviado = 0
+        try:
+            for pedaco in pedacos:
+                if isinstance(pedaco, str):
+                    pedaco = pedaco.encode('utf-8')
+                if not pedaco:
+                    continue
+                original += len(pedaco)
+                saida = compressor.comprime(pedaco, flush=True)
+                enviado += len(saida)
+                yield saida
+            saida = compressor.finaliza()
+            enviado += len(saida)
+            yield saida
+        finally:
+            if hasattr(pedacos, 'close'):
+                pedacos.close()
+            _registra_economia(app, endpoint, compressor.codificacao, original, enviado, streaming=True)
+
+    resposta.response = gerador()
+
+
+def _deve_comprimir(resposta, config):
+    if resposta.status_code < 200 or resposta.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in resposta.headers or resposta.direct_passthrough:
+        return False  # já comprimida ou arquivo (send_file): os estáticos usam os pré-comprimidos
+    if 'no-transform' in resposta.headers.get('Cache-Control', ''):
+        return False
+    return resposta.mimetype in config['COMPRESSAO_TIPOS']
+
+
+def registra_compressao(app):
+    """Liga a compressão no after_request e a entrega dos estáticos pré-comprimidos (.br/.gz)."""
+    if not app.config['COMPRESSAO_ATIVA']:
+        return
+
+    @app.after_request
+    def comprime_resposta(resposta):
+        resposta.vary.add('Accept-Encoding')
+        if request.method == 'HEAD' or not _deve_comprimir(resposta, app.config):
+            return resposta
+        codificacao = _escolhe_codificacao(app.config)
+        if codificacao is None:
+            return resposta
+
+        endpoint = request.endpoint or request.path
+        compressor = _Compressor(codificacao, app.config)
+
+        if resposta.is_streamed:
+            # Tamanho desconhecido: comprime sempre (stream_template, CSV gerado aos poucos)
+            _comprime_streaming(app, resposta, compressor, endpoint)
+            resposta.headers.pop('Content-Length', None)
+        else:
+            dados = resposta.get_data()
+            if len(dados) < app.config['COMPRESSAO_MINIMO']:
+                return resposta
+            comprimido = compressor.comprime(dados) + compressor.finaliza()
+            resposta.set_data(comprimido)
+            _registra_economia(app, endpoint, codificacao, len(dados), len(comprimido))
+
+        resposta.headers['Content-Encoding'] = codificacao
+        if resposta.headers.get('ETag'):
+            # A mesma entidade em outra codificação não pode ter o mesmo ETag forte
+            etag, fraco = resposta.get_etag()
+            resposta.set_etag(f'{etag}-{codificacao}', weak=fraco)
+        return resposta
+
+    estatico_original = app.view_functions.get('static')
+    if estatico_original is None:
+        return
+
+    def estatico_precomprimido(filename):
+        """Serve arquivo.br / arquivo.gz (gerados por "flask comprimir-estaticos") quando existirem."""
+        aceitas = _codificacoes_aceitas()
+        original = safe_join(app.static_folder, filename)
+        if original and os.path.isfile(original):
+            for codificacao, extensao in (('br', '.br'), ('gzip', '.gz')):
+                caminho = original + extensao
+                if codificacao not in aceitas or not os.path.isfile(caminho):
+                    continue
+                if os.path.getmtime(caminho) < os.path.getmtime(original):
+                    continue  # pré-comprimido desatualizado: serve o original
+                resposta = send_from_directory(
+                    app.static_folder, filename + extensao,
+                    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    max_age=app.get_send_file_max_age(filename)
+                )
+                resposta.headers['Content-Encoding'] = codificacao
+                resposta.vary.add('Accept-Encoding')
+                return resposta
+        return estatico_original(filename=filename)
+
+    app.view_functions['static'] = estatico_precomprimido
+
+
+def comprime_arquivo(caminho, config):
+    """Grava caminho.gz (e caminho.br, se houver brotli) no nível máximo; retorna os tamanhos."""
+    import gzip
+
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    tamanhos = {'original': len(dados)}
+    with open(caminho + '.gz', 'wb') as f:
+        # mtime=0: mesmo conteúdo gera o mesmo .gz (ETag estável entre deploys)
+        f.write(gzip.compress(dados, compresslevel=9, mtime=0))
+    tamanhos['gzip'] = os.path.getsize(caminho + '.gz')
+    if brotli is not None and config['COMPRESSAO_BROTLI']:
+        with open(caminho + '.br', 'wb') as f:
+            f.write(brotli.compress(dados, quality=11))
+        tamanhos['br'] = os.path.getsize(caminho + '.br')
+    return tamanhos
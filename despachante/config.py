@@ -0,0 +1,93 @@
+import os
+
+# ----------------------------------------------------
+# 1. CONFIGURAÇÃO BÁSICA DO FLASK E SQLALCHEMY
+# ----------------------------------------------------
+
+def carrega_configuracao(app):
+    """Preenche app.config a partir das variáveis de ambiente (create_app ainda aplica as sobrescritas)."""
+    # Chave secreta de ambiente (DEVE ser alterada em produção)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'sua_chave_secreta_padrao_muito_segura')
+
+    # ⭐⭐ TRECHO ALTERADO PARA SUPORTAR POSTGRESQL (NEON) ⭐⭐
+    # Tenta usar a variável de ambiente 'DATABASE_URL'. Se não existir, usa o SQLite.
+    # O .replace() é essencial para corrigir o esquema de conexão do Neon para o SQLAlchemy/Psycopg2.
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'DATABASE_URL', 
+        'sqlite:///despachante.db'
+    ).replace('postgres://', 'postgresql://') 
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Log de todas as queries SQL no console: SQLALCHEMY_ECHO=1 para depurar em desenvolvimento.
+    # Desligado por padrão: em produção o echo custa caro e enche o log do gunicorn.
+    app.config['SQLALCHEMY_ECHO'] = os.environ.get('SQLALCHEMY_ECHO', '0').lower() in ('1', 'true', 'sim')
+
+    # ⭐ PERFIL SQLITE DE PRODUÇÃO (escritórios que rodam sem o PostgreSQL)
+    # WAL deixa os relatórios lerem enquanto os pagamentos gravam; busy_timeout faz a conexão
+    # esperar o lock em vez de falhar na hora com "database is locked".
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)), # negativo = KiB (64 MB)
+        # Chaves estrangeiras não eram conferidas no SQLite: ligar num banco antigo pode fazer exclusões
+        # e edições falharem por causa de órfãos. Só com SQLITE_FOREIGN_KEYS=1, depois do "flask reconciliar".
+        'foreign_keys': 'ON' if os.environ.get('SQLITE_FOREIGN_KEYS', '0').lower() in ('1', 'true', 'sim') else 'OFF',
+        'temp_store': 'MEMORY',
+    }
+
+    # Arquivo frio: anos fechados exportados para CSV.gz (ver "flask arquivo-frio-exportar")
+    app.config['ARQUIVO_FRIO_DIR'] = os.environ.get('ARQUIVO_FRIO_DIR', os.path.join(app.instance_path, 'arquivo_frio'))
+
+    # Particionamento por data no PostgreSQL (opcional, ver "flask particionar"): 'anual' ou 'mensal'
+    app.config['PARTICOES_GRANULARIDADE'] = os.environ.get('PARTICOES_GRANULARIDADE', 'anual')
+
+    # Relatórios de erros das importações em CSV feitas pela tela (ver "flask importar")
+    app.config['IMPORTACAO_DIR'] = os.environ.get('IMPORTACAO_DIR', os.path.join(app.instance_path, 'importacoes'))
+
+    # Catálogo de tipos de serviço em memória: outros workers veem alterações em até N segundos
+    app.config['CATALOGO_TTL'] = int(os.environ.get('CATALOGO_TTL', 60))
+
+    # Cache dos resultados dos relatórios (ver despachante/cache_resultados.py):
+    # 'memoria' (LRU por worker), 'sqlite' (arquivo compartilhado pelos workers) ou 'desligado'
+    app.config['CACHE_RELATORIOS'] = os.environ.get('CACHE_RELATORIOS', 'memoria').lower()
+    app.config['CACHE_RELATORIOS_ITENS'] = int(os.environ.get('CACHE_RELATORIOS_ITENS', 256))
+    app.config['CACHE_RELATORIOS_MB'] = int(os.environ.get('CACHE_RELATORIOS_MB', 64))
+    app.config['CACHE_RELATORIOS_ARQUIVO'] = os.environ.get(
+        'CACHE_RELATORIOS_ARQUIVO', os.path.join(app.instance_path, 'cache_relatorios.db'))
+
+    # Métricas no formato do Prometheus em /metrics (ver despachante/metricas.py).
+    # Cada worker grava as suas em METRICAS_DIR a cada METRICAS_INTERVALO segundos; a coleta soma todos.
+    # Desligadas por padrão; ligadas, a coleta exige "Authorization: Bearer <METRICAS_TOKEN>" (sem token, 403).
+    app.config['METRICAS_ATIVAS'] = os.environ.get('METRICAS_ATIVAS', '0').lower() in ('1', 'true', 'sim')
+    app.config['METRICAS_DIR'] = os.environ.get('METRICAS_DIR', os.path.join(app.instance_path, 'metricas'))
+    app.config['METRICAS_INTERVALO'] = float(os.environ.get('METRICAS_INTERVALO', 5))
+    app.config['METRICAS_TOKEN'] = os.environ.get('METRICAS_TOKEN', '')
+
+    # Perfil de requisições (ver despachante/perfilador.py): ADMIN pede com ?perfil=1; com PERFIL_LENTO_MS > 0
+    # toda requisição mais lenta que isso é amostrada e gravada. As capturas ficam num anel em PERFIL_DIR.
+    app.config['PERFIL_LENTO_MS'] = float(os.environ.get('PERFIL_LENTO_MS', 0)) # 0 = só sob demanda
+    app.config['PERFIL_INTERVALO_MS'] = float(os.environ.get('PERFIL_INTERVALO_MS', 10))
+    app.config['PERFIL_DIR'] = os.environ.get('PERFIL_DIR', os.path.join(app.instance_path, 'perfis'))
+    app.config['PERFIL_MAX_CAPTURAS'] = int(os.environ.get('PERFIL_MAX_CAPTURAS', 50))
+    app.config['PERFIL_MAX_MB'] = int(os.environ.get('PERFIL_MAX_MB', 50))
+
+    # Compressão gzip/brotli das respostas de texto (ver despachante/compressao.py)
+    app.config['COMPRESSAO_ATIVA'] = os.environ.get('COMPRESSAO_ATIVA', '1').lower() in ('1', 'true', 'sim')
+    app.config['COMPRESSAO_MINIMO'] = int(os.environ.get('COMPRESSAO_MINIMO', 1024)) # bytes; abaixo disso não compensa
+    app.config['COMPRESSAO_NIVEL_GZIP'] = int(os.environ.get('COMPRESSAO_NIVEL_GZIP', 6)) # 1 (rápido) a 9 (menor)
+    app.config['COMPRESSAO_NIVEL_BROTLI'] = int(os.environ.get('COMPRESSAO_NIVEL_BROTLI', 5)) # 0 a 11; 4-6 é o ponto bom on-the-fly
+    app.config['COMPRESSAO_BROTLI'] = os.environ.get('COMPRESSAO_BROTLI', '1').lower() in ('1', 'true', 'sim')
+    app.config['COMPRESSAO_LOG'] = os.environ.get('COMPRESSAO_LOG', '1').lower() in ('1', 'true', 'sim')
+    app.config['COMPRESSAO_TIPOS'] = {
+        'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+        'application/json', 'application/javascript', 'image/svg+xml',
+    }
+
+    # Inicialização e aquecimento (ver create_app e gunicorn.conf.py)
+    # INICIALIZAR_BANCO=1 roda inicializa_banco() ao criar o app (com preload, uma vez no master).
+    app.config['INICIALIZAR_BANCO'] = os.environ.get('INICIALIZAR_BANCO', '0').lower() in ('1', 'true', 'sim')
+    # AQUECER=1 pré-compila os templates e abre o pool de conexões antes da primeira requisição.
+    app.config['AQUECER'] = os.environ.get('AQUECER', '0').lower() in ('1', 'true', 'sim')
@@ -0,0 +1,52 @@
+import sqlite3
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+# Extensões criadas sem app; create_app() faz o init_app
+db = SQLAlchemy()
+
+
+# PRAGMAs aceitos em SQLITE_PRAGMAS e os valores válidos de cada um (os valores vêm de variáveis de ambiente
+# e entram direto no texto do PRAGMA, que não aceita parâmetros)
+_PALAVRAS_PRAGMA = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA', '0', '1', '2', '3'},
+    'foreign_keys': {'ON', 'OFF', '0', '1'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY', '0', '1', '2'},
+}
+_PRAGMAS_NUMERICOS = {'busy_timeout', 'mmap_size', 'cache_size'}
+
+
+def _valida_pragmas(pragmas):
+    validos = {}
+    for nome, valor in pragmas.items():
+        if nome in _PALAVRAS_PRAGMA:
+            valor = str(valor).upper()
+            if valor not in _PALAVRAS_PRAGMA[nome]:
+                raise ValueError(f'SQLITE_PRAGMAS: valor inválido para {nome}: {valor!r}')
+        elif nome in _PRAGMAS_NUMERICOS:
+            try:
+                valor = int(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f'SQLITE_PRAGMAS: {nome} precisa ser um número inteiro (veio {valor!r})')
+        else:
+            raise ValueError(f'SQLITE_PRAGMAS: PRAGMA não permitido: {nome!r}')
+        validos[nome] = valor
+    return validos
+
+
+def registra_perfil_sqlite(app):
+    """Aplica os PRAGMAs de SQLITE_PRAGMAS em cada nova conexão SQLite do app (ignora o PostgreSQL)."""
+    pragmas = _valida_pragmas(app.config['SQLITE_PRAGMAS'])
+    with app.app_context():
+        motor = db.engine
+
+    @event.listens_for(motor, 'connect')
+    def aplica_perfil_sqlite(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome}={valor}')
+        cursor.close()
@@ -0,0 +1,223 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func, case, insert, delete
+from sqlalchemy.orm import Session
+
+from .extensoes import db
+from .modelos import MovimentacaoCaixa, FechamentoCaixa
+from .arquivo_frio import registros_arquivados
+
+# ----------------------------------------------------
+# 4.6. FECHAMENTO DE CAIXA (fotos dos períodos encerrados)
+# ----------------------------------------------------
+# Cada fechamento guarda saldo inicial, entradas, saídas e saldo final de um dia ou mês.
+# Os saldos partem do último fechamento e só somam as movimentações depois dele, em vez
+# de percorrer o caixa desde o primeiro lançamento. Dia fechado não aceita movimentação
+# nova, alterada ou excluída (o estorno entra como lançamento no dia de hoje).
+
+PERIODOS_FECHAMENTO = ('dia', 'mes')
+
+
+class PeriodoFechado(ValueError):
+    """Gravação em data de caixa já fechado."""
+
+
+_eh_entrada = func.lower(MovimentacaoCaixa.tipo) == 'entrada'
+
+
+def _somas(inicio=None, fim=None):
+    """(entradas, saídas, quantidade) das movimentações ativas em [inicio, fim]: SUM no banco + arquivo frio."""
+    consulta = db.session.query(
+        func.coalesce(func.sum(case((_eh_entrada, MovimentacaoCaixa.valor), else_=0.0)), 0.0),
+        func.coalesce(func.sum(case((_eh_entrada, 0.0), else_=MovimentacaoCaixa.valor)), 0.0),
+        func.count(MovimentacaoCaixa.id)
+    ).filter(MovimentacaoCaixa.deleted_at.is_(None))
+    if inicio:
+        consulta = consulta.filter(MovimentacaoCaixa.data >= inicio)
+    if fim:
+        consulta = consulta.filter(MovimentacaoCaixa.data <= fim)
+    entradas, saidas, quantidade = consulta.one()
+
+    for m in registros_arquivados('movimentacao_caixa', inicio, fim):
+        if m.tipo and m.tipo.lower() == 'entrada':
+            entradas += m.valor or 0.0
+        else:
+            saidas += m.valor or 0.0
+        quantidade += 1
+    return entradas, saidas, quantidade
+
+def caixa_fechado_ate():
+    """Último dia fechado (ou None)."""
+    with db.session.no_autoflush:
+        return db.session.query(func.max(FechamentoCaixa.data_fim)).scalar()
+
+def ultimo_fechamento(ate=None):
+    """Fechamento mais recente que termina até 'ate' (None = o último de todos)."""
+    consulta = FechamentoCaixa.query
+    if ate:
+        consulta = consulta.filter(FechamentoCaixa.data_fim <= ate)
+    return consulta.order_by(FechamentoCaixa.data_fim.desc()).first()
+
+def saldo_caixa(ate=None):
+    """Saldo acumulado do caixa no fim do dia 'ate' (None = tudo): fechamento mais próximo + movimentos depois dele."""
+    fechamento = ultimo_fechamento(ate)
+    if fechamento is None:
+        entradas, saidas, _ = _somas(None, ate)
+        return entradas - saidas
+    entradas, saidas, _ = _somas(fechamento.data_fim + timedelta(days=1), ate)
+    return fechamento.saldo_final + entradas - saidas
+
+def totais_caixa(inicio=None, fim=None):
+    """Entradas, saídas e saldos de [inicio, fim] usando os fechamentos que cabem inteiros no período.
+
+    Só as pontas que os fechamentos não cobrem são somadas nas movimentações.
+    """
+    filtros = []
+    if inicio:
+        filtros.append(FechamentoCaixa.data_inicio >= inicio)
+    if fim:
+        filtros.append(FechamentoCaixa.data_fim <= fim)
+    primeiro, ultimo, entradas, saidas = db.session.query(
+        func.min(FechamentoCaixa.data_inicio), func.max(FechamentoCaixa.data_fim),
+        func.coalesce(func.sum(FechamentoCaixa.total_entradas), 0.0),
+        func.coalesce(func.sum(FechamentoCaixa.total_saidas), 0.0)
+    ).filter(*filtros).one()
+
+    if primeiro is None:
+        entradas, saidas, _ = _somas(inicio, fim)
+    else:
+        # Os fechamentos são contíguos: sobram no máximo um trecho antes e um depois
+        if inicio is None or inicio < primeiro:
+            e, s, _ = _somas(inicio, primeiro - timedelta(days=1))
+            entradas, saidas = entradas + e, saidas + s
+        e, s, _ = _somas(ultimo + timedelta(days=1), fim)
+        entradas, saidas = entradas + e, saidas + s
+
+    saldo_inicial = saldo_caixa(inicio - timedelta(days=1)) if inicio else 0.0
+    return {
+        'entradas': entradas,
+        'saidas': saidas,
+        'saldo_inicial': saldo_inicial,
+        'saldo_final': saldo_inicial + entradas - saidas,
+    }
+
+def _primeira_data():
+    datas = [db.session.query(func.min(MovimentacaoCaixa.data)).filter(MovimentacaoCaixa.deleted_at.is_(None)).scalar()]
+    datas += [m.data for m in registros_arquivados('movimentacao_caixa') if m.data]
+    datas = [d for d in datas if d]
+    return min(datas) if datas else None
+
+def _fim_do_periodo(dia, periodo):
+    if periodo == 'dia':
+        return dia
+    proximo_mes = (dia.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return proximo_mes - timedelta(days=1)
+
+def fecha_caixa(ate=None, periodo='dia', usuario=None):
+    """Fecha o caixa do dia seguinte ao último fechamento até 'ate' (padrão: ontem). Não faz commit.
+
+    Um GROUP BY por dia lê as movimentações do trecho inteiro; os fechamentos (um por dia ou
+    por mês) são gravados num INSERT em lote. Com periodo='mes' só entram meses completos.
+    Retorna a lista de fechamentos criados (dicts).
+    """
+    if periodo not in PERIODOS_FECHAMENTO:
+        raise ValueError(f'Período inválido: {periodo} (use {" ou ".join(PERIODOS_FECHAMENTO)}).')
+    hoje = date.today()
+    ate = ate or hoje - timedelta(days=1)
+    if ate >= hoje:
+        raise ValueError('Só é possível fechar dias já encerrados (até ontem).')
+
+    ultimo = ultimo_fechamento()
+    if ultimo is not None:
+        inicio, saldo = ultimo.data_fim + timedelta(days=1), ultimo.saldo_final
+    else:
+        inicio, saldo = _primeira_data(), 0.0
+    if inicio is None or inicio > ate:
+        return []
+    if periodo == 'mes' and _fim_do_periodo(ate, 'mes') != ate:
+        ate = ate.replace(day=1) - timedelta(days=1) # Mês corrente ainda aberto: fecha até o mês anterior
+        if ate < inicio:
+            return []
+
+    por_dia = {}
+    for dia, entradas, saidas, quantidade in db.session.query(
+        MovimentacaoCaixa.data,
+        func.coalesce(func.sum(case((_eh_entrada, MovimentacaoCaixa.valor), else_=0.0)), 0.0),
+        func.coalesce(func.sum(case((_eh_entrada, 0.0), else_=MovimentacaoCaixa.valor)), 0.0),
+        func.count(MovimentacaoCaixa.id)
+    ).filter(
+        MovimentacaoCaixa.deleted_at.is_(None), MovimentacaoCaixa.data >= inicio, MovimentacaoCaixa.data <= ate
+    ).group_by(MovimentacaoCaixa.data):
+        por_dia[dia] = [entradas, saidas, quantidade]
+    for m in registros_arquivados('movimentacao_caixa', inicio, ate):
+        totais = por_dia.setdefault(m.data, [0.0, 0.0, 0])
+        totais[0 if m.tipo and m.tipo.lower() == 'entrada' else 1] += m.valor or 0.0
+        totais[2] += 1
+
+    agora, fechamentos, dia = datetime.utcnow(), [], inicio
+    while dia <= ate:
+        fim = min(_fim_do_periodo(dia, periodo), ate)
+        entradas = saidas = 0.0
+        quantidade = 0
+        d = dia
+        while d <= fim:
+            e, s, q = por_dia.get(d, (0.0, 0.0, 0))
+            entradas, saidas, quantidade = entradas + e, saidas + s, quantidade + q
+            d += timedelta(days=1)
+        fechamentos.append({
+            'periodo': periodo, 'data_inicio': dia, 'data_fim': fim,
+            'saldo_inicial': saldo, 'total_entradas': entradas, 'total_saidas': saidas,
+            'saldo_final': saldo + entradas - saidas, 'movimentos': quantidade,
+            'fechado_em': agora, 'fechado_por': usuario,
+        })
+        saldo += entradas - saidas
+        dia = fim + timedelta(days=1)
+
+    db.session.execute(insert(FechamentoCaixa), fechamentos)
+    return fechamentos
+
+def reabre_caixa(desde):
+    """Apaga os fechamentos que terminam em 'desde' ou depois (ação de administrador; não faz commit)."""
+    return db.session.execute(delete(FechamentoCaixa).where(FechamentoCaixa.data_fim >= desde)).rowcount
+
+def confere_caixa_aberto(data, fechado_ate=None):
+    """Levanta PeriodoFechado se 'data' cai num período já fechado."""
+    if isinstance(data, datetime):
+        data = data.date()
+    fechado_ate = fechado_ate if fechado_ate is not None else caixa_fechado_ate()
+    if data is not None and fechado_ate is not None and data <= fechado_ate:
+        raise PeriodoFechado(
+            f'O caixa está fechado até {fechado_ate:%d/%m/%Y}: lançamentos em {data:%d/%m/%Y} não podem ser '
+            f'incluídos, alterados ou excluídos (registre o acerto numa data em aberto).'
+        )
+
+def confere_movimentos_abertos(*condicoes):
+    """Para UPDATE/DELETE em lote de MovimentacaoCaixa (que não passam pelo before_flush)."""
+    mais_antiga = db.session.query(func.min(MovimentacaoCaixa.data)).filter(
+        MovimentacaoCaixa.deleted_at.is_(None), *condicoes
+    ).scalar()
+    confere_caixa_aberto(mais_antiga)
+
+
+@event.listens_for(Session, 'before_flush')
+def _protege_caixa_fechado(sessao, contexto, instancias):
+    """Barra, no flush, qualquer mudança em fechamento ou em movimentação de dia fechado."""
+    for obj in list(sessao.dirty) + list(sessao.deleted):
+        if isinstance(obj, FechamentoCaixa) and (obj in sessao.deleted or sessao.is_modified(obj)):
+            raise PeriodoFechado('Fechamentos de caixa não podem ser alterados (use "flask caixa-reabrir").')
+
+    movimentos = [obj for obj in sessao.new if isinstance(obj, MovimentacaoCaixa)]
+    movimentos += [obj for obj in sessao.deleted if isinstance(obj, MovimentacaoCaixa)]
+    movimentos += [obj for obj in sessao.dirty if isinstance(obj, MovimentacaoCaixa) and sessao.is_modified(obj)]
+    if not movimentos:
+        return
+
+    fechado_ate = caixa_fechado_ate()
+    if fechado_ate is None:
+        return
+    for obj in movimentos:
+        datas = [obj.data]
+        if obj not in sessao.new:
+            datas += db.inspect(obj).attrs.data.history.deleted # Data anterior, se foi trocada
+        for data in datas:
+            confere_caixa_aberto(data, fechado_ate)
@@ -0,0 +1,396 @@
+import re
+from datetime import datetime
+
+from flask import request, render_template, stream_template, make_response, Response
+from sqlalchemy import func, case, update
+from sqlalchemy.exc import IntegrityError
+
+from .extensoes import db
+from .modelos import Cliente, Veiculo, Servico, ItemServico, MovimentacaoCaixa, SaldoCliente
+
+# ----------------------------------------------------
+# 4.1. FUNÇÃO AUXILIAR (NOVA)
+# ----------------------------------------------------
+
+def clean_currency_value(value_str):
+    """Limpa uma string de moeda (ex: 'R$ 1.200,50') e retorna um float."""
+    if not value_str:
+        return 0.00
+        
+    # Remove R$ e espaços
+    cleaned = value_str.replace('R$', '').replace(' ', '').strip()
+
+    # 1. Remove o ponto (separador de milhar)
+    cleaned = cleaned.replace('.', '')
+    
+    # 2. Substitui a vírgula (separador decimal) por ponto
+    cleaned = cleaned.replace(',', '.')
+    
+    try:
+        # Tenta converter para float (ex: "1200.50" -> 1200.5)
+        return float(cleaned)
+    except ValueError:
+        return 0.00
+
+def calcula_valor_total_servico(servico_id):
+    """Calcula o valor total do serviço somando os valores de todos os itens associados (SUM no banco)."""
+    return db.session.query(func.coalesce(func.sum(ItemServico.valor), 0.0)).filter(
+        ItemServico.servico_id == servico_id
+    ).scalar()
+
+def salva_itens_servico(servico, itens):
+    """Substitui os itens do serviço pelos de 'itens' numa só transação (não faz commit).
+
+    'itens' é uma lista de dicts {id (opcional), descricao, valor}: com id atualiza o item,
+    sem id insere, e os itens do serviço que não vierem na lista são apagados. Tudo em
+    lote (um DELETE, um UPDATE executemany e um INSERT executemany); depois um único
+    UPDATE recalcula valor_total com SUM e, no mesmo comando, saldo e status de pagamento.
+    Serviço que nunca teve itens mantém o valor_total digitado no cadastro; se os itens foram
+    todos apagados, o total volta a 0. Serviço marcado como "não cobrado" continua com
+    valor_total 0: a soma vai para valor_nao_cobrado.
+    """
+    from sqlalchemy import insert, delete, select
+
+    existentes = {row.id for row in db.session.query(ItemServico.id).filter(ItemServico.servico_id == servico.id)}
+    mantidos = [item for item in itens if item.get('id')]
+    estranhos = {item['id'] for item in mantidos} - existentes
+    if estranhos:
+        raise ValueError(f'Item(ns) {sorted(estranhos)} não pertence(m) ao serviço #{servico.id}.')
+
+    removidos = existentes - {item['id'] for item in mantidos}
+    if removidos:
+        db.session.execute(delete(ItemServico).where(ItemServico.id.in_(removidos)))
+    if mantidos:
+        db.session.execute(update(ItemServico), [
+            {'id': item['id'], 'descricao': item['descricao'], 'valor': item['valor']} for item in mantidos
+        ])
+    novos = [{'servico_id': servico.id, 'descricao': item['descricao'], 'valor': item['valor']}
+             for item in itens if not item.get('id')]
+    if novos:
+        db.session.execute(insert(ItemServico), novos)
+    if not existentes and not itens:
+        return
+
+    total = select(func.coalesce(func.sum(ItemServico.valor), 0.0)).where(
+        ItemServico.servico_id == servico.id
+    ).scalar_subquery()
+    if servico.valor_nao_cobrado is not None:
+        db.session.execute(
+            update(Servico).where(Servico.id == servico.id).values(valor_nao_cobrado=total)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(servico)
+        return
+    db.session.execute(
+        update(Servico).where(Servico.id == servico.id).values(
+            valor_total=total,
+            saldo_pendente=total - Servico.valor_recebido,
+            status_pagamento=expressao_status_pagamento(total, Servico.valor_recebido)
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.expire(servico) # valor_total/saldo/status mudaram no banco
+    atualiza_saldo_cliente(servico.cliente_id)
+
+def atualiza_status_pagamento(servico):
+    """Atualiza o saldo pendente e o status de pagamento de um objeto Servico."""
+    
+    # 1. Calcula Saldo Pendente
+    servico.saldo_pendente = servico.valor_total - servico.valor_recebido
+    
+    # 2. Define o Status de Pagamento
+    if servico.valor_total <= 0.01:
+        servico.status_pagamento = 'Não Cobrado'
+    elif servico.saldo_pendente <= 0.01:
+        servico.status_pagamento = 'Pago'
+    elif servico.valor_recebido > 0.01:
+        servico.status_pagamento = 'Parcial'
+    else:
+        servico.status_pagamento = 'A Cobrar'
+
+    return servico
+
+def expressao_status_pagamento(valor_total, valor_recebido):
+    """Mesma regra de atualiza_status_pagamento, em SQL (CASE), para UPDATEs atômicos/em lote."""
+    return case(
+        (valor_total <= 0.01, 'Não Cobrado'),
+        (valor_total - valor_recebido <= 0.01, 'Pago'),
+        (valor_recebido > 0.01, 'Parcial'),
+        else_='A Cobrar'
+    )
+
+class PagamentoDuplicado(IntegrityError):
+    """Chave de idempotência já usada (quem trata IntegrityError de chave duplicada trata esta também)."""
+
+    def __init__(self, chave):
+        super().__init__('chave_idempotencia', {'chave_idempotencia': chave},
+                         ValueError(f'Pagamento já registrado com a chave {chave}.'))
+
+def registra_pagamento(servico_id, valor, data_pagamento, metodo_pagamento, chave_idempotencia=None):
+    """Registra um pagamento de forma segura com vários workers (não faz commit).
+
+    - No PostgreSQL a linha do serviço fica travada (SELECT ... FOR UPDATE) até o commit;
+    - o valor é somado com um UPDATE atômico no próprio banco (sem ler-alterar-gravar em Python);
+    - a chave de idempotência é única: um formulário enviado duas vezes levanta IntegrityError.
+      Além do índice único, a chave é conferida com o serviço já travado: com movimentacao_caixa
+      particionada o índice vira (chave, data) e não pega um reenvio que caia em outro dia.
+    """
+    servico = Servico.query.filter_by(id=servico_id, deleted_at=None).with_for_update().first()
+    if servico is None:
+        raise LookupError(f'Serviço #{servico_id} não encontrado.')
+    if chave_idempotencia and db.session.query(
+        MovimentacaoCaixa.query.filter_by(chave_idempotencia=chave_idempotencia).exists()
+    ).scalar():
+        raise PagamentoDuplicado(chave_idempotencia)
+
+    descricao = f'Pagamento serviço #{servico.id} - {servico.tipo_servico} (Método: {metodo_pagamento})'
+    
+    # 🚀 CORREÇÃO PRINCIPAL: Assegurar o vínculo MovimentacaoCaixa <-> Servico
+    movimentacao = MovimentacaoCaixa(
+        data=data_pagamento,
+        tipo='ENTRADA', 
+        valor=valor,
+        descricao=descricao,
+        # ESTAS LINHAS SÃO ESSENCIAIS PARA O FLUXO DE CAIXA
+        referencia_id=servico.id,      # ID do Serviço sendo pago
+        referencia_tipo='Servico',     # Indica que a referência é um Serviço
+        chave_idempotencia=chave_idempotencia
+    )
+    db.session.add(movimentacao)
+    db.session.flush() # Chave duplicada falha aqui, antes de alterar o saldo do serviço
+
+    valor_total = func.coalesce(Servico.valor_total, 0.0)
+    valor_recebido = func.coalesce(Servico.valor_recebido, 0.0) + valor
+    db.session.execute(
+        update(Servico).where(Servico.id == servico.id).values(
+            valor_recebido=valor_recebido,
+            saldo_pendente=valor_total - valor_recebido,
+            status_pagamento=expressao_status_pagamento(valor_total, valor_recebido)
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.expire(servico) # Próximo acesso relê os valores gravados pelo UPDATE
+
+    atualiza_saldo_cliente(servico.cliente_id)
+    return movimentacao
+
+def consulta_saldos_abertos():
+    """Agregado por cliente dos serviços em aberto: (cliente_id, saldo, quantidade, data mais antiga)."""
+    saldo = Servico.valor_total - Servico.valor_recebido
+    return db.session.query(
+        Servico.cliente_id,
+        func.sum(saldo).label('saldo_aberto'),
+        func.count(Servico.id).label('servicos_abertos'),
+        func.min(Servico.data_servico).label('data_mais_antiga')
+    ).filter(Servico.deleted_at.is_(None), saldo > 0.01).group_by(Servico.cliente_id)
+
+def atualiza_saldo_cliente(cliente_id):
+    """Recalcula a linha do cliente em SaldoCliente dentro da transação corrente.
+
+    Deve ser chamada depois de criar, pagar ou excluir um serviço e ANTES do
+    commit, para que o livro de saldos nunca fique diferente de Servico.
+    """
+    db.session.flush()
+
+    # Trava a linha do cliente ANTES de agregar: duas transações do mesmo cliente
+    # no PostgreSQL ficam em fila e a segunda já enxerga o que a primeira gravou.
+    registro = SaldoCliente.query.filter_by(cliente_id=cliente_id).with_for_update().populate_existing().first()
+    agregado = consulta_saldos_abertos().filter(Servico.cliente_id == cliente_id).first()
+
+    if registro is None:
+        registro = SaldoCliente(cliente_id=cliente_id)
+        db.session.add(registro)
+
+    registro.saldo_aberto = agregado.saldo_aberto if agregado else 0.0
+    registro.servicos_abertos = agregado.servicos_abertos if agregado else 0
+    registro.data_mais_antiga = agregado.data_mais_antiga if agregado else None
+    registro.atualizado_em = datetime.utcnow()
+    return registro
+
+def reconstroi_saldos_clientes():
+    """Apaga e recria o livro SaldoCliente com um único INSERT ... SELECT agrupado."""
+    from sqlalchemy import insert, literal
+
+    SaldoCliente.query.delete()
+    agregado = consulta_saldos_abertos().add_columns(literal(datetime.utcnow(), db.DateTime))
+    db.session.execute(
+        insert(SaldoCliente).from_select(
+            ['cliente_id', 'saldo_aberto', 'servicos_abertos', 'data_mais_antiga', 'atualizado_em'],
+            agregado.statement
+        )
+    )
+
+
+# ----------------------------------------------------
+# 4.1.1. RESPOSTAS PARCIAIS (filtros que trocam só a tabela)
+# ----------------------------------------------------
+
+def pede_fragmento():
+    """True quando a página pediu só o trecho de resultados: header X-Fragmento: 1 ou ?fragmento=1."""
+    return request.headers.get('X-Fragmento') == '1' or request.args.get('fragmento') == '1'
+
+def renderiza_fragmento(template, **contexto):
+    """Renderiza só o parcial (sem base.html nem dropdowns); caches não devem misturar com a página."""
+    resposta = make_response(render_template(template, **contexto))
+    resposta.headers['Vary'] = 'X-Fragmento'
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+def renderiza_em_streaming(template, tamanho_bloco=16384, **contexto):
+    """stream_template em blocos de ~tamanho_bloco caracteres.
+
+    O Jinja solta um pedaço por trecho do template (dezenas por linha de tabela); juntar em
+    blocos evita um write/send no socket para cada um sem perder o envio progressivo.
+    """
+    pedacos_jinja = stream_template(template, **contexto) # Já vem com stream_with_context (sessão/request vivos)
+
+    def blocos():
+        pedacos, tamanho = [], 0
+        for pedaco in pedacos_jinja:
+            pedacos.append(pedaco)
+            tamanho += len(pedaco)
+            if tamanho >= tamanho_bloco:
+                yield ''.join(pedacos)
+                pedacos, tamanho = [], 0
+        if pedacos:
+            yield ''.join(pedacos)
+    return Response(blocos(), mimetype='text/html')
+
+
+# ----------------------------------------------------
+# 4.1.2. CPF / CNPJ
+# ----------------------------------------------------
+
+_PESOS_CNPJ = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+
+def somente_digitos(valor):
+    """'123.456.789-09' -> '12345678909'."""
+    return re.sub(r'\D', '', valor or '')
+
+def _digito_verificador(digitos, pesos):
+    resto = sum(int(d) * p for d, p in zip(digitos, pesos)) % 11
+    return '0' if resto < 2 else str(11 - resto)
+
+def documento_valido(digitos):
+    """Confere os dígitos verificadores de um CPF (11 dígitos) ou CNPJ (14 dígitos)."""
+    if len(digitos) not in (11, 14) or digitos == digitos[0] * len(digitos):
+        return False  # 000.000.000-00, 111.111.111-11... passam na conta mas não existem
+    if len(digitos) == 11:
+        return (digitos[9] == _digito_verificador(digitos[:9], range(10, 1, -1))
+                and digitos[10] == _digito_verificador(digitos[:10], range(11, 1, -1)))
+    return (digitos[12] == _digito_verificador(digitos[:12], _PESOS_CNPJ)
+            and digitos[13] == _digito_verificador(digitos[:13], [6] + _PESOS_CNPJ))
+
+def formata_documento(digitos):
+    """Forma de exibição: 123.456.789-09 ou 12.345.678/0001-95."""
+    if len(digitos) == 11:
+        return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+    if len(digitos) == 14:
+        return f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}'
+    return digitos
+
+def normaliza_documento(valor):
+    """Valida o CPF/CNPJ digitado e devolve só os dígitos; ValueError com a mensagem para o usuário."""
+    digitos = somente_digitos(valor)
+    if len(digitos) not in (11, 14):
+        raise ValueError('CPF deve ter 11 dígitos e CNPJ 14 dígitos.')
+    if not documento_valido(digitos):
+        raise ValueError(f'{"CPF" if len(digitos) == 11 else "CNPJ"} inválido (dígitos verificadores não conferem).')
+    return digitos
+
+def preenche_documentos():
+    """Preenche Cliente.documento onde está vazio (cadastros antigos), em um UPDATE por lote.
+
+    Quando o mesmo documento aparece em mais de um cliente só o mais antigo recebe o valor
+    (o índice é único); os demais ficam para o "flask clientes-deduplicar".
+    Retorna (preenchidos, ids que ficaram sem documento por duplicidade).
+    """
+    usados = {d for (d,) in db.session.query(Cliente.documento).filter(Cliente.documento.isnot(None))}
+    pendentes = db.session.query(Cliente.id, Cliente.cpf_cnpj).filter(
+        Cliente.documento.is_(None)
+    ).order_by(Cliente.id).all()
+
+    atualizacoes, duplicados = [], []
+    for cliente_id, cpf_cnpj in pendentes:
+        digitos = somente_digitos(cpf_cnpj)
+        if not digitos:
+            continue
+        if digitos in usados:
+            duplicados.append(cliente_id)
+            continue
+        usados.add(digitos)
+        atualizacoes.append({'id': cliente_id, 'documento': digitos})
+
+    if atualizacoes:
+        # UPDATE por chave primária em executemany (uma ida ao banco)
+        db.session.execute(update(Cliente), atualizacoes)
+    return len(atualizacoes), duplicados
+
+
+# ----------------------------------------------------
+# 4.1.3. VEÍCULOS (placa normalizada)
+# ----------------------------------------------------
+
+def normaliza_placa(valor):
+    """'abc-1234' / 'ABC 1D23' -> 'ABC1234' / 'ABC1D23' (chave única de Veiculo)."""
+    return re.sub(r'[^A-Z0-9]', '', (valor or '').upper())
+
+def obtem_veiculo(placa, cliente_id):
+    """Veículo da placa (cria se não existir) e marca o cliente do serviço como proprietário atual.
+
+    Roda dentro da transação corrente; dois cadastros simultâneos da mesma placa
+    não quebram: o segundo cai no índice único e relê o veículo gravado pelo primeiro.
+    """
+    from sqlalchemy.exc import IntegrityError
+
+    placa = normaliza_placa(placa)
+    if not placa:
+        return None
+    veiculo = Veiculo.query.filter_by(placa=placa).first()
+    if veiculo is None:
+        try:
+            with db.session.begin_nested():
+                veiculo = Veiculo(placa=placa, cliente_id=cliente_id)
+                db.session.add(veiculo)
+        except IntegrityError:
+            veiculo = Veiculo.query.filter_by(placa=placa).one()
+    if cliente_id and str(veiculo.cliente_id) != str(cliente_id):
+        veiculo.cliente_id = int(cliente_id)
+    return veiculo
+
+def vincula_veiculos(lote=1000):
+    """Liga os serviços sem veiculo_id ao Veiculo da sua placa, criando os veículos que faltam.
+
+    Uma leitura dos serviços pendentes, um INSERT em lote dos veículos novos e UPDATEs
+    por chave primária em executemany (um por lote). O proprietário é o cliente do
+    serviço mais recente da placa. Retorna (veiculos_criados, servicos_vinculados).
+    """
+    from sqlalchemy import insert
+
+    pendentes = db.session.query(
+        Servico.id, Servico.cliente_id, Servico.placa_veiculo
+    ).filter(
+        Servico.veiculo_id.is_(None), Servico.placa_veiculo.isnot(None)
+    ).order_by(Servico.data_servico, Servico.id).all()
+
+    por_placa = {}
+    for servico_id, cliente_id, placa in pendentes:
+        placa = normaliza_placa(placa)
+        if placa:
+            # Ordem por data: o último cliente visto é o proprietário mais recente
+            ids, _ = por_placa.get(placa, ([], None))
+            ids.append(servico_id)
+            por_placa[placa] = (ids, cliente_id)
+    if not por_placa:
+        return 0, 0
+
+    existentes = dict(db.session.query(Veiculo.placa, Veiculo.id))
+    novos = [{'placa': placa, 'cliente_id': cliente_id, 'criado_em': datetime.utcnow()}
+             for placa, (_, cliente_id) in por_placa.items() if placa not in existentes]
+    if novos:
+        db.session.execute(insert(Veiculo), novos)
+        existentes = dict(db.session.query(Veiculo.placa, Veiculo.id))
+
+    vinculos = [{'id': servico_id, 'veiculo_id': existentes[placa]}
+                for placa, (ids, _) in por_placa.items() for servico_id in ids]
+    for i in range(0, len(vinculos), lote):
+        db.session.execute(update(Servico), vinculos[i:i + lote])
+    return len(novos), len(vinculos)
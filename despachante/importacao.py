@@ -0,0 +1,331 @@
+import csv
+import time
+import hashlib
+from datetime import datetime, date
+from types import SimpleNamespace
+
+from sqlalchemy import insert, update, bindparam, func
+
+from .extensoes import db
+from .modelos import Cliente, Servico, ItemServico, MovimentacaoCaixa, STATUS_PROCESSO
+from .helpers import (
+    atualiza_status_pagamento, expressao_status_pagamento, reconstroi_saldos_clientes,
+    normaliza_documento, formata_documento, somente_digitos, normaliza_placa, vincula_veiculos
+)
+from .catalogo import tipo_por_nome, migra_tipos_servico, nome_exibicao
+from .fechamento import caixa_fechado_ate, confere_caixa_aberto
+
+# ----------------------------------------------------
+# 4.5. IMPORTAÇÃO EM LOTE (CSV de clientes, serviços e pagamentos)
+# ----------------------------------------------------
+# Lê o CSV linha a linha (sem carregar o arquivo inteiro), valida cada linha em Python
+# e grava em lotes com INSERT executemany, um commit por lote. As consultas de apoio
+# (clientes por documento, serviços existentes) são feitas uma vez no início.
+# Linhas rejeitadas vão para o relatório de erros: linha, erro e as colunas originais.
+
+TIPOS_IMPORTACAO = {
+    'clientes': {'obrigatorias': ['nome', 'cpf_cnpj'],
+                 'opcionais': ['telefone', 'email', 'endereco']},
+    'servicos': {'obrigatorias': ['cpf_cnpj', 'tipo_servico', 'data_servico'],
+                 'opcionais': ['placa', 'data_vencimento', 'valor_total', 'valor_recebido',
+                               'status_processo', 'detalhes', 'itens']},
+    'pagamentos': {'obrigatorias': ['valor', 'data_pagamento'],
+                   'opcionais': ['servico_id', 'cpf_cnpj', 'placa', 'data_servico', 'metodo']},
+}
+
+
+def _data(texto, campo):
+    texto = (texto or '').strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f'{campo}: data inválida "{texto}" (use AAAA-MM-DD ou DD/MM/AAAA)')
+
+def _valor(texto, campo, padrao=None):
+    """'R$ 1.200,50', '1200,50' e '1200.50' -> 1200.5 (ponto só é milhar quando há vírgula)."""
+    texto = (texto or '').replace('R$', '').replace(' ', '').strip()
+    if not texto:
+        if padrao is None:
+            raise ValueError(f'{campo}: obrigatório')
+        return padrao
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        return round(float(texto), 2)
+    except ValueError:
+        raise ValueError(f'{campo}: valor inválido "{texto}"')
+
+def _itens(texto):
+    """'Taxa DETRAN:100,00|Honorários:50,00' -> [(descricao, valor), ...]."""
+    itens = []
+    for parte in (texto or '').split('|'):
+        if not parte.strip():
+            continue
+        descricao, _, valor = parte.rpartition(':')
+        if not descricao.strip():
+            raise ValueError(f'itens: use "descrição:valor" separados por "|" ("{parte}")')
+        itens.append((descricao.strip(), _valor(valor, 'itens')))
+    return itens
+
+
+class _ImportaClientes:
+    def __init__(self):
+        self.documentos = {d for (d,) in db.session.query(Cliente.documento).filter(Cliente.documento.isnot(None))}
+        self.hoje = date.today()
+
+    def prepara(self, linha):
+        nome = ' '.join((linha.get('nome') or '').split())
+        if not nome:
+            raise ValueError('nome: obrigatório')
+        documento = normaliza_documento(linha.get('cpf_cnpj'))
+        if documento in self.documentos:
+            raise ValueError('cpf_cnpj: já cadastrado (no banco ou em linha anterior do arquivo)')
+        self.documentos.add(documento)
+        return {
+            'nome': nome, 'cpf_cnpj': formata_documento(documento), 'documento': documento,
+            'telefone': (linha.get('telefone') or '').strip() or None,
+            'email': (linha.get('email') or '').strip() or None,
+            'endereco': (linha.get('endereco') or '').strip() or None,
+            'data_cadastro': self.hoje,
+        }
+
+    def grava(self, dados):
+        db.session.execute(insert(Cliente), dados)
+
+    def finaliza(self):
+        pass
+
+
+class _ImportaServicos:
+    def __init__(self):
+        self.clientes = dict(db.session.query(Cliente.documento, Cliente.id).filter(Cliente.documento.isnot(None)))
+        self.fechado_ate = caixa_fechado_ate()
+
+    def prepara(self, linha):
+        documento = somente_digitos(linha.get('cpf_cnpj'))
+        cliente_id = self.clientes.get(documento)
+        if cliente_id is None:
+            raise ValueError(f'cpf_cnpj: cliente "{linha.get("cpf_cnpj")}" não cadastrado')
+
+        tipo = ' '.join((linha.get('tipo_servico') or '').split())
+        if not tipo:
+            raise ValueError('tipo_servico: obrigatório')
+        tipo_catalogo = tipo_por_nome(tipo) # Sem catálogo: ligado no fim por migra_tipos_servico
+
+        status = (linha.get('status_processo') or '').strip() or 'Pendente'
+        if status not in STATUS_PROCESSO:
+            raise ValueError(f'status_processo: "{status}" não é um dos {", ".join(STATUS_PROCESSO)}')
+
+        itens = _itens(linha.get('itens'))
+        valor_total = _valor(linha.get('valor_total'), 'valor_total', padrao=round(sum(v for _, v in itens), 2))
+        valor_recebido = _valor(linha.get('valor_recebido'), 'valor_recebido', padrao=0.0)
+        if valor_total < 0 or valor_recebido < 0:
+            raise ValueError('valores não podem ser negativos')
+        if valor_recebido > valor_total + 0.01:
+            raise ValueError('valor_recebido maior que valor_total')
+        data_servico = _data(linha.get('data_servico'), 'data_servico')
+        if valor_recebido > 0.01:
+            confere_caixa_aberto(data_servico, self.fechado_ate) # O recebimento inicial entra no caixa desse dia
+
+        servico = atualiza_status_pagamento(SimpleNamespace(valor_total=valor_total, valor_recebido=valor_recebido))
+        vencimento = linha.get('data_vencimento')
+        return {
+            'servico': {
+                'cliente_id': cliente_id,
+                'tipo_servico': nome_exibicao(tipo, tipo_catalogo),
+                'tipo_servico_id': tipo_catalogo.id if tipo_catalogo else None,
+                'placa_veiculo': normaliza_placa(linha.get('placa')) or None,
+                'detalhes': (linha.get('detalhes') or '').strip(),
+                'data_servico': data_servico,
+                'data_vencimento': _data(vencimento, 'data_vencimento') if (vencimento or '').strip() else None,
+                'valor_total': valor_total,
+                'valor_recebido': valor_recebido,
+                'saldo_pendente': servico.saldo_pendente,
+                'status_processo': status,
+                'status_pagamento': servico.status_pagamento,
+            },
+            'itens': itens,
+        }
+
+    def grava(self, dados):
+        # RETURNING em lote (insertmanyvalues) devolve os ids na ordem das linhas
+        ids = db.session.execute(
+            insert(Servico).returning(Servico.id, sort_by_parameter_order=True),
+            [d['servico'] for d in dados]
+        ).scalars().all()
+
+        itens, movimentos = [], []
+        for servico_id, d in zip(ids, dados):
+            s = d['servico']
+            itens.extend({'servico_id': servico_id, 'descricao': desc, 'valor': valor} for desc, valor in d['itens'])
+            if s['valor_recebido'] > 0.01:
+                movimentos.append({
+                    'tipo': 'Entrada', 'valor': s['valor_recebido'], 'data': s['data_servico'],
+                    'descricao': f"Recebimento Inicial - Serviço #{servico_id} - {s['tipo_servico']}",
+                    'referencia_id': servico_id, 'referencia_tipo': 'Servico',
+                })
+        if itens:
+            db.session.execute(insert(ItemServico), itens)
+        if movimentos:
+            db.session.execute(insert(MovimentacaoCaixa), movimentos)
+
+    def finaliza(self):
+        vincula_veiculos()
+        migra_tipos_servico()
+        reconstroi_saldos_clientes()
+
+
+class _ImportaPagamentos:
+    def __init__(self):
+        self.clientes = dict(db.session.query(Cliente.documento, Cliente.id).filter(Cliente.documento.isnot(None)))
+        self.servicos = {}     # id -> tipo_servico
+        self.por_chave = {}    # (cliente_id, placa, data_servico) -> [ids]
+        for servico_id, cliente_id, placa, data_servico, tipo in db.session.query(
+            Servico.id, Servico.cliente_id, Servico.placa_veiculo, Servico.data_servico, Servico.tipo_servico
+        ).filter(Servico.deleted_at.is_(None)):
+            self.servicos[servico_id] = tipo
+            self.por_chave.setdefault((cliente_id, normaliza_placa(placa), data_servico), []).append(servico_id)
+        # Chaves dos pagamentos já importados: reimportar o mesmo arquivo não duplica o caixa
+        self.chaves = {c for (c,) in db.session.query(MovimentacaoCaixa.chave_idempotencia).filter(
+            MovimentacaoCaixa.chave_idempotencia.like('imp-%'))}
+        self.ocorrencias = {}
+        self.afetados = set()
+        self.fechado_ate = caixa_fechado_ate()
+
+    def _servico(self, linha):
+        servico_id = (linha.get('servico_id') or '').strip()
+        if servico_id:
+            if not servico_id.isdigit() or int(servico_id) not in self.servicos:
+                raise ValueError(f'servico_id: serviço #{servico_id} não encontrado (ou excluído)')
+            return int(servico_id)
+        cliente_id = self.clientes.get(somente_digitos(linha.get('cpf_cnpj')))
+        if cliente_id is None:
+            raise ValueError('informe servico_id ou cpf_cnpj + placa + data_servico de um serviço existente')
+        ids = self.por_chave.get((cliente_id, normaliza_placa(linha.get('placa')), _data(linha.get('data_servico'), 'data_servico')), [])
+        if len(ids) != 1:
+            raise ValueError('nenhum serviço encontrado para cpf_cnpj + placa + data_servico' if not ids
+                             else f'mais de um serviço para cpf_cnpj + placa + data_servico ({ids}); use servico_id')
+        return ids[0]
+
+    def prepara(self, linha):
+        servico_id = self._servico(linha)
+        valor = _valor(linha.get('valor'), 'valor')
+        if valor <= 0:
+            raise ValueError('valor: deve ser maior que zero')
+        data_pagamento = _data(linha.get('data_pagamento'), 'data_pagamento')
+        confere_caixa_aberto(data_pagamento, self.fechado_ate)
+        metodo = (linha.get('metodo') or '').strip() or 'Importação'
+
+        # Mesma linha repetida no arquivo é outro pagamento: a ocorrência entra na chave
+        base = f'{servico_id}|{data_pagamento}|{valor:.2f}|{metodo}'
+        self.ocorrencias[base] = self.ocorrencias.get(base, 0) + 1
+        chave = 'imp-' + hashlib.sha1(f'{base}|{self.ocorrencias[base]}'.encode()).hexdigest()
+        if chave in self.chaves:
+            raise ValueError('pagamento já importado anteriormente')
+        self.chaves.add(chave)
+        return {
+            'tipo': 'ENTRADA', 'valor': valor, 'data': data_pagamento,
+            'descricao': f'Pagamento serviço #{servico_id} - {self.servicos[servico_id]} (Método: {metodo})',
+            'referencia_id': servico_id, 'referencia_tipo': 'Servico', 'chave_idempotencia': chave,
+        }
+
+    def grava(self, dados):
+        db.session.execute(insert(MovimentacaoCaixa), dados)
+
+        somas = {}
+        for d in dados:
+            somas[d['referencia_id']] = somas.get(d['referencia_id'], 0.0) + d['valor']
+        tabela = Servico.__table__
+        # Um UPDATE executemany soma os pagamentos do lote em cada serviço
+        db.session.execute(
+            update(tabela).where(tabela.c.id == bindparam('b_id')).values(
+                valor_recebido=func.coalesce(tabela.c.valor_recebido, 0.0) + bindparam('b_valor')
+            ),
+            [{'b_id': servico_id, 'b_valor': soma} for servico_id, soma in somas.items()]
+        )
+        ids = list(somas)
+        valor_total = func.coalesce(Servico.valor_total, 0.0)
+        valor_recebido = func.coalesce(Servico.valor_recebido, 0.0)
+        db.session.execute(
+            update(Servico).where(Servico.id.in_(ids)).values(
+                saldo_pendente=valor_total - valor_recebido,
+                status_pagamento=expressao_status_pagamento(valor_total, valor_recebido)
+            ).execution_options(synchronize_session=False)
+        )
+
+    def finaliza(self):
+        reconstroi_saldos_clientes()
+
+
+IMPORTADORES = {'clientes': _ImportaClientes, 'servicos': _ImportaServicos, 'pagamentos': _ImportaPagamentos}
+
+
+def _leitor_csv(arquivo):
+    """DictReader com separador detectado (';' do Excel brasileiro ou ',') e cabeçalho normalizado."""
+    cabecalho = arquivo.readline()
+    separador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    colunas = [c.strip().lower() for c in next(csv.reader([cabecalho], delimiter=separador), [])]
+    return csv.DictReader(arquivo, fieldnames=colunas, delimiter=separador), colunas
+
+def importa_csv(tipo, arquivo, relatorio_erros=None, lote=1000, progresso=None):
+    """Importa o CSV 'arquivo' (texto, lido em streaming) do 'tipo' informado.
+
+    Cada lote de linhas válidas é gravado e commitado junto; se o banco recusar um lote,
+    as linhas dele vão para o relatório de erros e a importação continua no próximo.
+    'relatorio_erros' (texto, opcional) recebe as linhas rejeitadas em CSV.
+    Retorna um dict com lidas, importadas, rejeitadas e segundos.
+    """
+    if tipo not in IMPORTADORES:
+        raise ValueError(f'Tipo de importação inválido: {tipo} (use {", ".join(IMPORTADORES)})')
+    inicio = time.perf_counter()
+    leitor, colunas = _leitor_csv(arquivo)
+    faltando = [c for c in TIPOS_IMPORTACAO[tipo]['obrigatorias'] if c not in colunas]
+    if faltando:
+        raise ValueError(f'Colunas obrigatórias ausentes no cabeçalho: {", ".join(faltando)}')
+
+    erros = None
+    if relatorio_erros is not None:
+        erros = csv.writer(relatorio_erros, delimiter=';')
+        erros.writerow(['linha', 'erro'] + colunas)
+
+    importador = IMPORTADORES[tipo]()
+    totais = {'lidas': 0, 'importadas': 0, 'rejeitadas': 0}
+    pendentes = []
+
+    def rejeita(numero, linha, mensagem):
+        totais['rejeitadas'] += 1
+        if erros is not None:
+            erros.writerow([numero, mensagem] + [linha.get(c, '') for c in colunas])
+
+    def grava_lote():
+        try:
+            importador.grava([dados for _, _, dados in pendentes])
+            db.session.commit()
+            totais['importadas'] += len(pendentes)
+        except Exception as e:
+            db.session.rollback()
+            for numero, linha, _ in pendentes:
+                rejeita(numero, linha, f'lote recusado pelo banco: {str(e).splitlines()[0]}')
+        pendentes.clear()
+        if progresso:
+            progresso(totais)
+
+    for numero, linha in enumerate(leitor, start=2): # linha 1 = cabeçalho
+        if not any((v or '').strip() for v in linha.values() if isinstance(v, str)):
+            continue # linha em branco
+        totais['lidas'] += 1
+        try:
+            pendentes.append((numero, linha, importador.prepara(linha)))
+        except ValueError as e:
+            rejeita(numero, linha, str(e))
+        if len(pendentes) >= lote:
+            grava_lote()
+    if pendentes:
+        grava_lote()
+
+    importador.finaliza()
+    db.session.commit()
+    totais['segundos'] = time.perf_counter() - inicio
+    return totais
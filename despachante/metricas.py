@@ -0,0 +1,287 @@
+import os
+import hmac
+import json
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import request, g, Response, abort
+from sqlalchemy import event
+
+from .extensoes import db
+
+# ----------------------------------------------------
+# 4.9. MÉTRICAS (formato Prometheus, em /metrics)
+# ----------------------------------------------------
+# Cada processo conta em memória e, de tempos em tempos (e a cada coleta), grava tudo em
+# METRICAS_DIR/<pid>.json. O /metrics soma os arquivos de todos os workers do gunicorn, então
+# não importa qual worker atendeu a coleta. Contadores de worker que já morreu continuam na
+# soma (não podem "voltar"); já o estado do pool só vale para os processos vivos. Arquivos de
+# execuções anteriores do servidor são apagados na subida (gunicorn: on_starting; outros: create_app).
+# Desligado por padrão; ligado, a coleta sempre exige METRICAS_TOKEN (atrás de um proxy na mesma
+# máquina todo acesso externo chega como 127.0.0.1, então "só local" não protege nada).
+# Sem dependência externa: o texto segue o formato de exposição 0.0.4 do Prometheus.
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# nome: (tipo, ajuda)
+DESCRICOES = {
+    'despachante_http_requisicoes_total': ('counter', 'Requisições atendidas por endpoint, método e status.'),
+    'despachante_http_duracao_segundos': ('histogram', 'Tempo até a resposta ficar pronta (streaming: até o 1º pedaço).'),
+    'despachante_db_comandos_total': ('counter', 'Comandos SQL executados, por tipo.'),
+    'despachante_db_duracao_segundos': ('histogram', 'Duração dos comandos SQL, por tipo.'),
+    'despachante_db_pool_conexoes': ('gauge', 'Conexões do pool por estado (só processos vivos).'),
+    'despachante_pdf_duracao_segundos': ('histogram', 'Tempo de montagem dos PDFs (ReportLab).'),
+    'despachante_login_tentativas_total': ('counter', 'Tentativas de login por resultado.'),
+    'despachante_cache_relatorios_total': ('counter', 'Consultas ao cache de relatórios por função e resultado.'),
+    'despachante_compressao_bytes_total': ('counter', 'Bytes das respostas comprimidas, antes e depois.'),
+}
+
+_trava = threading.Lock()
+_contadores = defaultdict(float)  # {(nome, rotulos): valor}
+_histogramas = {}  # {(nome, rotulos): [contagem por limite..., +Inf, soma]}
+_gravado_em = [0.0]
+
+
+def _rotulos(rotulos):
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+def conta(nome, valor=1, **rotulos):
+    with _trava:
+        _contadores[(nome, _rotulos(rotulos))] += valor
+
+def observa(nome, segundos, **rotulos):
+    chave = (nome, _rotulos(rotulos))
+    with _trava:
+        dados = _histogramas.get(chave)
+        if dados is None:
+            dados = _histogramas[chave] = [0] * (len(LIMITES_SEGUNDOS) + 1) + [0.0]
+        for i, limite in enumerate(LIMITES_SEGUNDOS):
+            if segundos <= limite:
+                dados[i] += 1
+                break
+        else:
+            dados[len(LIMITES_SEGUNDOS)] += 1
+        dados[-1] += segundos
+
+@contextmanager
+def mede(nome, **rotulos):
+    """with mede('despachante_pdf_duracao_segundos', relatorio='debitos'): ..."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observa(nome, time.perf_counter() - inicio, **rotulos)
+
+
+# ----------------------------------------------------
+# Arquivos por processo
+# ----------------------------------------------------
+
+def _medidores(app):
+    """Valores lidos na hora: estado do pool, cache de relatórios e compressão (já contados em outros módulos)."""
+    from .cache_resultados import metricas as metricas_cache
+    from .compressao import economia_por_rota
+
+    gauges = []
+    with app.app_context():
+        pool = db.engine.pool
+    if all(hasattr(pool, m) for m in ('size', 'checkedin', 'checkedout', 'overflow')):
+        for estado, valor in (('tamanho', pool.size()), ('livres', pool.checkedin()),
+                              ('em_uso', pool.checkedout()), ('excedentes', max(pool.overflow(), 0))):
+            gauges.append(['despachante_db_pool_conexoes', [['estado', estado]], valor])
+
+    contadores = []
+    for funcao, (acertos, falhas) in list(metricas_cache.items()):
+        funcao = funcao.rsplit('.', 1)[-1]
+        contadores.append(['despachante_cache_relatorios_total', [['funcao', funcao], ['resultado', 'acerto']], acertos])
+        contadores.append(['despachante_cache_relatorios_total', [['funcao', funcao], ['resultado', 'falha']], falhas])
+    for endpoint, (_, original, enviado) in list(economia_por_rota.items()):
+        contadores.append(['despachante_compressao_bytes_total', [['endpoint', endpoint], ['tipo', 'original']], original])
+        contadores.append(['despachante_compressao_bytes_total', [['endpoint', endpoint], ['tipo', 'enviado']], enviado])
+    return contadores, gauges
+
+def grava_metricas(app):
+    """Grava o estado deste processo em METRICAS_DIR/<pid>.json (troca atômica do arquivo)."""
+    diretorio = app.config['METRICAS_DIR']
+    os.makedirs(diretorio, exist_ok=True)
+    contadores, gauges = _medidores(app)
+    with _trava:
+        contadores += [[nome, list(map(list, rotulos)), valor] for (nome, rotulos), valor in _contadores.items()]
+        histogramas = [[nome, list(map(list, rotulos)), list(dados)] for (nome, rotulos), dados in _histogramas.items()]
+    caminho = os.path.join(diretorio, f'{os.getpid()}.json')
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arq:
+        json.dump({'pai': os.getppid(), 'contadores': contadores, 'histogramas': histogramas, 'gauges': gauges}, arq)
+    os.replace(temporario, caminho)
+    _gravado_em[0] = time.monotonic()
+
+def zera_metricas():
+    """Esquece o que o processo contou até aqui (worker recém-criado por fork herda as contas do master)."""
+    with _trava:
+        _contadores.clear()
+        _histogramas.clear()
+    _gravado_em[0] = 0.0
+
+def limpa_metricas(diretorio):
+    """Apaga os arquivos de uma execução anterior (gunicorn.conf.py chama na subida do master)."""
+    if not os.path.isdir(diretorio):
+        return
+    for nome in os.listdir(diretorio):
+        if nome.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(diretorio, nome))
+
+def limpa_metricas_orfas(diretorio):
+    """Apaga arquivos de processos mortos que não são da execução atual (outro processo pai).
+
+    Workers mortos do mesmo gunicorn (mesmo master) ficam: os contadores deles continuam na soma.
+    Pai 1 (init/systemd) não identifica execução nenhuma: esses arquivos também saem.
+    """
+    if not os.path.isdir(diretorio):
+        return
+    for nome in os.listdir(diretorio):
+        if not nome.endswith('.json') or not nome[:-5].isdigit() or _processo_vivo(int(nome[:-5])):
+            continue
+        caminho = os.path.join(diretorio, nome)
+        try:
+            with open(caminho, encoding='utf-8') as arq:
+                pai = json.load(arq).get('pai')
+        except (OSError, ValueError):
+            pai = None
+        if pai and pai > 1 and pai == os.getppid() and _processo_vivo(pai):
+            continue
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass  # Outro worker subindo junto apagou primeiro
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _formata_rotulos(rotulos):
+    if not rotulos:
+        return ''
+    texto = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                     for k, v in rotulos)
+    return '{' + texto + '}'
+
+def _numero(valor):
+    if isinstance(valor, float) and not valor.is_integer():
+        return repr(valor)
+    return str(int(valor))
+
+def texto_metricas(app):
+    """Soma os arquivos de todos os processos e devolve o texto no formato do Prometheus."""
+    grava_metricas(app)
+    contadores, histogramas, gauges = defaultdict(float), {}, []
+    diretorio = app.config['METRICAS_DIR']
+    for nome_arquivo in sorted(os.listdir(diretorio)):
+        if not nome_arquivo.endswith('.json'):
+            continue
+        pid = int(nome_arquivo[:-5])
+        try:
+            with open(os.path.join(diretorio, nome_arquivo), encoding='utf-8') as arq:
+                dados = json.load(arq)
+        except (OSError, ValueError):
+            continue  # Sumiu ou está sendo trocado: fica para a próxima coleta
+        for nome, rotulos, valor in dados['contadores']:
+            contadores[(nome, tuple(map(tuple, rotulos)))] += valor
+        for nome, rotulos, valores in dados['histogramas']:
+            chave = (nome, tuple(map(tuple, rotulos)))
+            atuais = histogramas.setdefault(chave, [0] * len(valores))
+            histogramas[chave] = [a + v for a, v in zip(atuais, valores)]
+        if _processo_vivo(pid):
+            gauges += [(nome, tuple(map(tuple, rotulos)) + (('pid', str(pid)),), valor)
+                       for nome, rotulos, valor in dados['gauges']]
+
+    por_nome = defaultdict(list)
+    for (nome, rotulos), valor in contadores.items():
+        por_nome[nome].append((rotulos, valor))
+    for nome, rotulos, valor in gauges:
+        por_nome[nome].append((rotulos, valor))
+    for (nome, rotulos), valores in histogramas.items():
+        por_nome[nome].append((rotulos, valores))
+
+    linhas = []
+    for nome in sorted(por_nome):
+        tipo, ajuda = DESCRICOES.get(nome, ('untyped', ''))
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        for rotulos, valor in sorted(por_nome[nome]):
+            if tipo != 'histogram':
+                linhas.append(f'{nome}{_formata_rotulos(rotulos)} {_numero(valor)}')
+                continue
+            acumulado = 0
+            for limite, quantidade in zip(LIMITES_SEGUNDOS + ('+Inf',), valor[:-1]):
+                acumulado += quantidade
+                linhas.append(f'{nome}_bucket{_formata_rotulos(rotulos + (("le", str(limite)),))} {acumulado}')
+            linhas.append(f'{nome}_sum{_formata_rotulos(rotulos)} {_numero(valor[-1])}')
+            linhas.append(f'{nome}_count{_formata_rotulos(rotulos)} {acumulado}')
+    return '\n'.join(linhas) + '\n'
+
+
+# ----------------------------------------------------
+# Ligação com o app (requisições, SQL e a rota /metrics)
+# ----------------------------------------------------
+
+def registra_metricas(app):
+    """Mede requisições e comandos SQL e expõe /metrics (ver METRICAS_* no config)."""
+    if not app.config['METRICAS_ATIVAS']:
+        return
+    if not app.config['METRICAS_TOKEN']:
+        app.logger.warning('METRICAS_ATIVAS sem METRICAS_TOKEN: /metrics vai recusar toda coleta.')
+    intervalo = app.config['METRICAS_INTERVALO']
+    limpa_metricas_orfas(app.config['METRICAS_DIR'])
+
+    @app.before_request
+    def marca_inicio():
+        g.inicio_requisicao = time.perf_counter()
+
+    @app.after_request
+    def mede_requisicao(resposta):
+        inicio = g.pop('inicio_requisicao', None)
+        if inicio is not None:
+            endpoint = request.endpoint or 'nao_encontrado' # 404 não vira um rótulo por URL
+            conta('despachante_http_requisicoes_total', endpoint=endpoint, metodo=request.method,
+                  status=resposta.status_code)
+            observa('despachante_http_duracao_segundos', time.perf_counter() - inicio, endpoint=endpoint)
+        if time.monotonic() - _gravado_em[0] >= intervalo:
+            grava_metricas(app)
+        return resposta
+
+    with app.app_context():
+        motor = db.engine
+
+    @event.listens_for(motor, 'before_cursor_execute')
+    def marca_comando(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('inicio_comandos', []).append(time.perf_counter())
+
+    @event.listens_for(motor, 'after_cursor_execute')
+    def mede_comando(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info['inicio_comandos'].pop()
+        tipo = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'vazio'
+        conta('despachante_db_comandos_total', tipo=tipo)
+        observa('despachante_db_duracao_segundos', time.perf_counter() - inicio, tipo=tipo)
+
+    @event.listens_for(motor, 'handle_error')
+    def descarta_comando(contexto):
+        # Comando que falhou não passa pelo after_cursor_execute
+        if contexto.connection is not None and contexto.connection.info.get('inicio_comandos'):
+            contexto.connection.info['inicio_comandos'].pop()
+
+    @app.route('/metrics')
+    def metricas_prometheus():
+        # Sem login (o Prometheus não tem sessão): só com o token no header
+        token = app.config['METRICAS_TOKEN']
+        if not token:
+            abort(403)
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+        return Response(texto_metricas(app), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,202 @@
+from datetime import datetime
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from .extensoes import db
+
+# ----------------------------------------------------
+# 2. MODELOS DO BANCO DE DADOS (NOVO: ItemServico ADICIONADO)
+# ----------------------------------------------------
+
+class Usuario(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    login = db.Column(db.String(50), unique=True, nullable=False)
+    senha_hash = db.Column(db.String(255), nullable=False)
+    nivel_acesso = db.Column(db.String(20), default='COLABORADOR')  # ADMIN, COLABORADOR
+
+    def set_senha(self, senha):
+        self.senha_hash = generate_password_hash(senha)
+
+    def check_senha(self, senha):
+        return check_password_hash(self.senha_hash, senha)
+
+class Cliente(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    cpf_cnpj = db.Column(db.String(20), unique=True, nullable=False)
+    # Só os dígitos do CPF/CNPJ: chave canônica para busca exata e para achar duplicados
+    # (cpf_cnpj guarda a forma exibida, com pontuação)
+    documento = db.Column(db.String(14), unique=True, index=True)
+    telefone = db.Column(db.String(20))
+    email = db.Column(db.String(100))
+    endereco = db.Column(db.String(255))
+    data_cadastro = db.Column(db.Date, default=datetime.utcnow)
+
+# NOVO MODELO: Veículo (placa normalizada, sem hífen/espaço e em maiúsculas)
+class Veiculo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    placa = db.Column(db.String(10), unique=True, nullable=False, index=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), index=True) # Proprietário atual
+    cliente = db.relationship('Cliente', backref=db.backref('veiculos', lazy=True))
+    renavam = db.Column(db.String(11))
+    modelo = db.Column(db.String(100))
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# NOVO MODELO: Catálogo de tipos de serviço (preço e itens padrão)
+class TipoServico(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(150), unique=True, nullable=False)
+    # Nome sem acentos/maiúsculas/espaços extras: "Transferência" e "transferencia " são o mesmo tipo
+    chave = db.Column(db.String(150), unique=True, nullable=False, index=True)
+    valor_padrao = db.Column(db.Float, default=0.0)
+    ativo = db.Column(db.Boolean, default=True)
+    itens_padrao = db.relationship('ItemTipoServico', order_by='ItemTipoServico.ordem',
+                                   cascade='all, delete-orphan', lazy=True)
+
+class ItemTipoServico(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tipo_servico_id = db.Column(db.Integer, db.ForeignKey('tipo_servico.id'), nullable=False, index=True)
+    descricao = db.Column(db.String(255), nullable=False)
+    valor = db.Column(db.Float, default=0.0)
+    ordem = db.Column(db.Integer, default=0)
+
+# Etapas do processo de um serviço (status_processo)
+STATUS_PROCESSO = ['Pendente', 'Em Andamento', 'Aguardando Retirada', 'Concluído', 'Cancelado']
+
+class Servico(db.Model):
+    # Índices parciais: só cobrem serviços ativos (deleted_at IS NULL), que é o que as telas consultam
+    __table_args__ = (
+        db.Index('ix_servico_ativo_data', 'data_servico',
+                 sqlite_where=text('deleted_at IS NULL'), postgresql_where=text('deleted_at IS NULL')),
+        db.Index('ix_servico_ativo_cliente', 'cliente_id', 'data_servico',
+                 sqlite_where=text('deleted_at IS NULL'), postgresql_where=text('deleted_at IS NULL')),
+        db.Index('ix_servico_ativo_veiculo', 'veiculo_id', 'data_servico',
+                 sqlite_where=text('deleted_at IS NULL'), postgresql_where=text('deleted_at IS NULL')),
+        # Agenda de vencimentos: "vence até tal dia e ainda está a cobrar"
+        db.Index('ix_servico_ativo_vencimento', 'data_vencimento', 'status_pagamento',
+                 sqlite_where=text('deleted_at IS NULL'), postgresql_where=text('deleted_at IS NULL')),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False, index=True)
+    cliente = db.relationship('Cliente', backref=db.backref('servicos', lazy=True))
+    
+    tipo_servico = db.Column(db.String(150), nullable=False)
+    tipo_servico_id = db.Column(db.Integer, db.ForeignKey('tipo_servico.id'), nullable=True, index=True)
+    detalhes = db.Column(db.Text)
+    placa_veiculo = db.Column(db.String(10), nullable=True) # Adicionado para filtro
+    veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculo.id'), nullable=True)
+    veiculo = db.relationship('Veiculo')
+
+    data_servico = db.Column(db.Date, default=datetime.utcnow)
+    data_vencimento = db.Column(db.Date) # Opcional
+    
+    valor_total = db.Column(db.Float, default=0.0)
+    valor_recebido = db.Column(db.Float, default=0.0)
+    saldo_pendente = db.Column(db.Float, default=0.0)
+    # Valor original enquanto o serviço está marcado como "não cobrado" (valor_total fica 0); NULL = cobrado
+    valor_nao_cobrado = db.Column(db.Float)
+    
+    status_processo = db.Column(db.String(50), default='Pendente') # Pendente, Em Andamento, Concluído, etc.
+    status_pagamento = db.Column(db.String(50), default='Não Cobrado') # Não Cobrado, A Cobrar, Parcial, Pago
+
+    # Exclusão lógica: preenchido por excluir_servico; o arquivamento move a linha depois
+    deleted_at = db.Column(db.DateTime)
+
+# NOVO MODELO: ItemServico para detalhamento
+class ItemServico(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'), nullable=False)
+    descricao = db.Column(db.String(255), nullable=False)
+    valor = db.Column(db.Float, default=0.0)
+    
+    # Relacionamento inverso (cascade para deletar itens se o serviço for deletado)
+    servico = db.relationship('Servico', backref=db.backref('itens_servico', cascade='all, delete-orphan', lazy=True))
+
+
+class MovimentacaoCaixa(db.Model):
+    # Índice usado pela conciliação (e pelas buscas de movimentos de um serviço)
+    __table_args__ = (
+        db.Index('ix_movimentacao_caixa_referencia', 'referencia_tipo', 'referencia_id'),
+        db.Index('ix_movimentacao_caixa_ativa_data', 'data',
+                 sqlite_where=text('deleted_at IS NULL'), postgresql_where=text('deleted_at IS NULL')),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, default=datetime.utcnow)
+    tipo = db.Column(db.String(10), nullable=False) # 'Entrada' ou 'Saida'
+    valor = db.Column(db.Float, nullable=False)
+    descricao = db.Column(db.String(255))
+    referencia_id = db.Column(db.Integer) # ID do Servico ou Despesa, se aplicável
+    referencia_tipo = db.Column(db.String(20)) # 'Servico' ou 'Despesa'
+    # Chave enviada pelo formulário de pagamento: um reenvio com a mesma chave não gera outra entrada
+    chave_idempotencia = db.Column(db.String(64), unique=True, index=True)
+    # Exclusão lógica (junto com o serviço de origem): os relatórios filtram deleted_at IS NULL
+    deleted_at = db.Column(db.DateTime)
+    
+class Despesa(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, default=datetime.utcnow)
+    valor = db.Column(db.Float, nullable=False)
+    descricao = db.Column(db.String(255), nullable=False)
+    # ⭐ COLUNA CORRIGIDA/ADICIONADA: Essencial para o relatório
+    categoria = db.Column(db.String(100), nullable=False) 
+    paga = db.Column(db.Boolean, default=False)
+
+# NOVO MODELO: Livro de saldos por cliente (mantido junto com Servico)
+class SaldoCliente(db.Model):
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), primary_key=True)
+    saldo_aberto = db.Column(db.Float, nullable=False, default=0.0)
+    servicos_abertos = db.Column(db.Integer, nullable=False, default=0)
+    data_mais_antiga = db.Column(db.Date) # Data do serviço em aberto mais antigo
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# NOVO MODELO: Fechamento de caixa (foto imutável de um dia ou mês já encerrado)
+class FechamentoCaixa(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    periodo = db.Column(db.String(10), nullable=False) # 'dia' ou 'mes'
+    data_inicio = db.Column(db.Date, nullable=False, unique=True)
+    data_fim = db.Column(db.Date, nullable=False, index=True)
+    saldo_inicial = db.Column(db.Float, nullable=False, default=0.0)
+    total_entradas = db.Column(db.Float, nullable=False, default=0.0)
+    total_saidas = db.Column(db.Float, nullable=False, default=0.0)
+    saldo_final = db.Column(db.Float, nullable=False, default=0.0)
+    movimentos = db.Column(db.Integer, nullable=False, default=0)
+    fechado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    fechado_por = db.Column(db.String(80))
+
+# NOVO MODELO: Lista de cobrança (recriada toda noite por "flask cobranca-gerar").
+# Sem chave estrangeira: é uma foto, e serviços/clientes podem ser arquivados ou fundidos.
+class ListaCobranca(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    servico_id = db.Column(db.Integer, nullable=False, unique=True)
+    cliente_id = db.Column(db.Integer, nullable=False, index=True)
+    cliente_nome = db.Column(db.String(100), nullable=False)
+    telefone = db.Column(db.String(20))
+    email = db.Column(db.String(100))
+    tipo_servico = db.Column(db.String(150))
+    placa_veiculo = db.Column(db.String(10))
+    data_vencimento = db.Column(db.Date, nullable=False)
+    valor_aberto = db.Column(db.Float, nullable=False, default=0.0)
+    dias_atraso = db.Column(db.Integer, nullable=False, default=0, index=True)
+    gerado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# NOVO MODELO: Versão dos dados de cada tabela (sobe a cada commit que grava nela).
+# Entra na chave do cache de relatórios: dado alterado = chave nova, sem invalidação manual.
+class VersaoDados(db.Model):
+    tabela = db.Column(db.String(64), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+# TABELAS DE ARQUIVO: mesmas colunas da tabela original + data do arquivamento.
+# Montadas a partir dos modelos para acompanharem qualquer coluna nova.
+def _tabela_arquivo(modelo):
+    colunas = [db.Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False)
+               for c in modelo.__table__.columns]
+    return db.Table(f'{modelo.__tablename__}_arquivo', *colunas,
+                    db.Column('arquivado_em', db.DateTime, nullable=False))
+
+servico_arquivo = _tabela_arquivo(Servico)
+item_servico_arquivo = _tabela_arquivo(ItemServico)
+movimentacao_caixa_arquivo = _tabela_arquivo(MovimentacaoCaixa)
@@ -0,0 +1,142 @@
+from datetime import datetime
+
+# ----------------------------------------------------
+# 4.2. GERAÇÃO DO PDF DE DÉBITOS (rota e lote mensal)
+# ----------------------------------------------------
+
+def gera_pdf_debitos(debitos, cliente=None, data_inicio=None, data_fim=None, por_cliente=False):
+    """Monta o demonstrativo de débitos em PDF e retorna os bytes.
+
+    Recebe apenas dados simples (listas de dicts), para poder rodar tanto na
+    rota quanto nos processos do lote mensal (ProcessPoolExecutor).
+    """
+    from io import BytesIO
+    from reportlab.lib.pagesizes import A4, landscape 
+    from reportlab.lib.units import cm
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib import colors
+
+    # --- Cores Personalizadas (Detran RS / GOV-RS Estilo) ---
+    COR_DETRAN_ACCENT = colors.HexColor('#FF6600')      # Laranja para destaque (Título)
+    COR_DETRAN_HEADER_BG = colors.HexColor('#333333')   # Cinza Grafite Escuro (Fundo da Tabela)
+    COR_DETRAN_TEXT = colors.HexColor('#333333')        # Cinza Grafite para texto
+
+    total_debitos = sum(row['saldo_devedor'] for row in debitos)
+    selected_cliente_nome = cliente['nome'] if cliente else "TODOS OS CLIENTES"
+
+    buffer = BytesIO()
+    
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), topMargin=1*cm, bottomMargin=1*cm, leftMargin=1.5*cm, rightMargin=1.5*cm)
+    styles = getSampleStyleSheet()
+    story = []
+    
+    # ⭐ MODIFICAÇÃO DE ESTILOS: 
+    # 1. TitleDetran: Fonte 16 (agora será 18 no Escritório), cor Laranja, centralizado.
+    # 2. NormalCentralizado: Centralizado para informações de contato.
+    styles.add(ParagraphStyle(name='TitleDetran', fontSize=16, leading=20, fontName='Helvetica-Bold', alignment=1, textColor=COR_DETRAN_ACCENT, spaceAfter=18))
+    styles.add(ParagraphStyle(name='NormalCentralizado', fontSize=11, leading=14, fontName='Helvetica', textColor=COR_DETRAN_TEXT, alignment=1)) # NOVO ESTILO
+    styles.add(ParagraphStyle(name='TableText', fontSize=9, leading=10, fontName='Helvetica', textColor=COR_DETRAN_TEXT))
+    styles.add(ParagraphStyle(name='ClientInfo', fontSize=10, leading=14, spaceAfter=6, fontName='Helvetica', textColor=COR_DETRAN_TEXT))
+    styles.add(ParagraphStyle(name='ClientInfoBold', fontSize=10, leading=14, spaceAfter=6, fontName='Helvetica-Bold', textColor=COR_DETRAN_TEXT))
+    styles.add(ParagraphStyle(name='NormalDetran', fontSize=11, leading=14, fontName='Helvetica', textColor=COR_DETRAN_TEXT))
+    
+    # --- Cabeçalho Formal ---
+    
+    # ⭐ MODIFICAÇÃO PRINCIPAL: Título com tag <font size="+2"> e <u>
+    title_text = f"<u><font size=\"+4\">Escritório Despachante Machado</font></u> - Demonstrativo de Débitos Pendentes"
+    story.append(Paragraph(title_text, styles["TitleDetran"]))
+    
+    # ⭐ MODIFICAÇÃO: Informações de Contato Centralizadas
+    story.append(Paragraph(f"Contato: (55) 3411-8153/ (55) 9953-6173 | machadodespachante@hotmail.com", styles["NormalCentralizado"]))
+    story.append(Spacer(1, 12))
+
+    # DADOS DETALHADOS DO CLIENTE (SE FILTRADO)
+    if cliente:
+        story.append(Paragraph(f"<b>DADOS DO CLIENTE:</b>", styles['ClientInfoBold']))
+        story.append(Paragraph(f"<b>Nome/Razão Social:</b> {cliente['nome']}", styles['ClientInfo']))
+        story.append(Paragraph(f"<b>CPF/CNPJ:</b> {cliente['cpf_cnpj']}", styles['ClientInfo']))
+        story.append(Paragraph(f"<b>Endereço:</b> {cliente.get('endereco') or 'Não Informado'}", styles['ClientInfo']))
+        story.append(Paragraph(f"<b>Telefone:</b> {cliente.get('telefone') or 'Não Informado'} | <b>E-mail:</b> {cliente.get('email') or 'Não Informado'}", styles['ClientInfo']))
+        story.append(Spacer(1, 12))
+    
+    # Informações do Filtro Geral
+    story.append(Paragraph(f"<b>RELATÓRIO DE DÉBITOS ATUAL</b>", styles['ClientInfoBold']))
+    if not cliente:
+        story.append(Paragraph(f"<b>CLIENTE:</b> {selected_cliente_nome}", styles['ClientInfo']))
+
+    periodo = f"{data_inicio.strftime('%d/%m/%Y') if data_inicio else 'Início'} a {data_fim.strftime('%d/%m/%Y') if data_fim else 'Hoje'}"
+    story.append(Paragraph(f"<b>Período Filtrado:</b> {periodo} | <b>Emissão:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles["ClientInfo"]))
+    story.append(Spacer(1, 18))
+
+    # --- Tabela de Débitos Itemizados ---
+    
+    if por_cliente:
+        tabela_debitos = [["Data", "ID", "Placa", "Serviço", "Status", "Total (R$)", "Recebido (R$)", "SALDO (R$)"]]
+    else:
+        tabela_debitos = [["Data", "Cliente", "Placa", "Serviço", "Status", "Total (R$)", "Recebido (R$)", "SALDO (R$)"]]
+    
+    
+    def format_currency(value):
+        return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        
+    def p_text(text):
+        if text is None:
+            text = ''
+        return Paragraph(str(text), styles['TableText'])
+        
+    for row in debitos:
+        row_data = [
+            row['data_servico'].strftime("%d/%m/%Y"), 
+            p_text(row['placa_veiculo'] or 'N/A'),
+            p_text(row['tipo_servico']),
+            p_text(row['status_processo']),
+            format_currency(row['valor_total']),
+            format_currency(row['valor_recebido']),
+            format_currency(row['saldo_devedor']),
+        ]
+        
+        if por_cliente:
+            row_data.insert(1, str(row['id'])) 
+        else:
+            row_data.insert(1, p_text(row['cliente_nome'])) 
+            
+        tabela_debitos.append(row_data)
+        
+    # --- Criação da Tabela com Ajuste Automático ---
+    t = Table(tabela_debitos, colWidths='*', repeatRows=1) 
+    
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), COR_DETRAN_HEADER_BG),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (-3, 0), (-1, -1), 'RIGHT'), 
+        ('TEXTCOLOR', (-1, 1), (-1, -1), colors.red),
+        ('FONTNAME', (-1, 1), (-1, -1), 'Helvetica-Bold'), 
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 18))
+    
+    # --- Totalização Final ---
+    total_data = [
+        ["TOTAL PENDENTE GERAL:", format_currency(total_debitos)]
+    ]
+    
+    total_table = Table(total_data, colWidths='*')
+    total_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('TEXTCOLOR', (0, 0), (0, 0), COR_DETRAN_TEXT), 
+        ('TEXTCOLOR', (1, 0), (1, 0), colors.red),
+    ]))
+    story.append(total_table)
+
+    doc.build(story)
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
@@ -0,0 +1,266 @@
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from flask import request, session, g
+
+# ----------------------------------------------------
+# 4.10. PERFIL DE REQUISIÇÕES LENTAS
+# ----------------------------------------------------
+# Duas formas de capturar, gravadas em PERFIL_DIR (anel: só as últimas PERFIL_MAX_CAPTURAS):
+# - Sob demanda: um ADMIN acrescenta ?perfil=1 (ou o header X-Perfil: 1) e a requisição roda
+#   inteira no cProfile (.prof, abre no snakeviz / pstats).
+# - Automática: com PERFIL_LENTO_MS > 0, uma thread amostra a pilha das requisições em andamento a
+#   cada PERFIL_INTERVALO_MS; quem passar do limite vira captura (.txt com pilhas "colapsadas",
+#   o formato do flamegraph.pl / speedscope). As rápidas são descartadas sem gravar nada.
+# Cada captura tem um .json com rota, duração e o tempo separado em SQL, ORM, Jinja, ReportLab e app.
+# Respostas em streaming (histórico do caixa) só são medidas até o primeiro pedaço.
+
+# Primeiro trecho do caminho (depois de site-packages ou da raiz do projeto) -> categoria
+CATEGORIAS = (
+    ('sqlalchemy/orm/', 'ORM'),
+    ('sqlalchemy/', 'SQL'),
+    ('sqlite3/', 'SQL'),
+    ('psycopg2/', 'SQL'),
+    ('jinja2/', 'Jinja'),
+    ('templates/', 'Jinja'),
+    ('reportlab/', 'ReportLab'),
+)
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+def _caminho_curto(caminho):
+    if 'site-packages' + os.sep in caminho:
+        return caminho.split('site-packages' + os.sep, 1)[1]
+    if caminho.startswith(_RAIZ):
+        return caminho[len(_RAIZ):]
+    return os.path.basename(caminho)
+
+def _categoria_curta(caminho_curto):
+    caminho_curto = caminho_curto.replace(os.sep, '/')
+    for prefixo, nome in CATEGORIAS:
+        if caminho_curto.startswith(prefixo):
+            return nome
+    return 'App'
+
+def categoria(caminho):
+    return _categoria_curta(_caminho_curto(caminho))
+
+
+class _Amostrador(threading.Thread):
+    """Thread do worker que anota, a cada intervalo, a pilha das threads com requisição em andamento."""
+
+    def __init__(self, intervalo):
+        super().__init__(name='perfilador', daemon=True)
+        self.intervalo = intervalo
+        self._trava = threading.Lock()
+        self._pilhas = {}  # {thread_id: Counter({pilha: amostras})}
+
+    def acompanha(self, thread_id):
+        with self._trava:
+            self._pilhas[thread_id] = Counter()
+
+    def solta(self, thread_id):
+        with self._trava:
+            return self._pilhas.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            time.sleep(self.intervalo)
+            with self._trava:
+                if not self._pilhas:
+                    continue
+                quadros = sys._current_frames()
+                for thread_id, pilhas in self._pilhas.items():
+                    quadro = quadros.get(thread_id)
+                    if quadro is not None:
+                        pilhas[self._pilha(quadro)] += 1
+
+    @staticmethod
+    def _pilha(quadro):
+        nomes = []
+        while quadro is not None and len(nomes) < 200:
+            codigo = quadro.f_code
+            nomes.append(f'{codigo.co_name} ({_caminho_curto(codigo.co_filename)}:{codigo.co_firstlineno})')
+            quadro = quadro.f_back
+        return ';'.join(reversed(nomes))
+
+
+_amostradores = {}
+_trava_amostrador = threading.Lock()
+
+def _amostrador(intervalo):
+    """Um por processo, criado na primeira requisição (threads não sobrevivem ao fork do gunicorn)."""
+    pid = os.getpid()
+    with _trava_amostrador:
+        if pid not in _amostradores:
+            _amostradores[pid] = _Amostrador(intervalo)
+            _amostradores[pid].start()
+        return _amostradores[pid]
+
+
+# ----------------------------------------------------
+# Capturas em disco (anel)
+# ----------------------------------------------------
+
+def _categorias_pilhas(pilhas, intervalo):
+    """Segundos por categoria: cada amostra conta para o quadro mais interno de SQL/ORM/Jinja/ReportLab."""
+    tempos = defaultdict(float)
+    for pilha, amostras in pilhas.items():
+        nome = 'App'
+        for quadro in reversed(pilha.split(';')):
+            nome = _categoria_curta(quadro.rsplit('(', 1)[-1].rsplit(':', 1)[0]) # Já gravado como caminho curto
+            if nome != 'App':
+                break
+        tempos[nome] += amostras * intervalo
+    return tempos
+
+def _categorias_cprofile(perfil):
+    """Segundos por categoria somando o tempo próprio (tottime) de cada função."""
+    tempos = defaultdict(float)
+    for (arquivo, _, funcao), (_, _, tempo_proprio, _, _) in pstats.Stats(perfil).stats.items():
+        if arquivo == '~':
+            # Funções em C: o execute/fetch do driver é onde o banco realmente gasta
+            nome = 'SQL' if ('sqlite3' in funcao or 'psycopg2' in funcao) else 'App'
+        else:
+            nome = categoria(arquivo)
+        tempos[nome] += tempo_proprio
+    return tempos
+
+def _apara(diretorio, max_capturas, max_bytes):
+    """Apaga as capturas mais antigas até caber nos limites (nome começa pela data, então ordena)."""
+    tamanhos = defaultdict(int)
+    for nome in os.listdir(diretorio):
+        tamanhos[nome.rsplit('.', 1)[0]] += os.path.getsize(os.path.join(diretorio, nome))
+    capturas = sorted(nome[:-5] for nome in os.listdir(diretorio) if nome.endswith('.json'))
+    total = sum(tamanhos.values())
+    while capturas and (len(capturas) > max_capturas or total > max_bytes):
+        antiga = capturas.pop(0)
+        total -= tamanhos[antiga]
+        for extensao in ('.json', '.prof', '.txt'):
+            try:
+                os.remove(os.path.join(diretorio, antiga + extensao))
+            except FileNotFoundError:
+                pass  # Outro worker apagou primeiro
+
+def salva_captura(app, tipo, duracao_ms, status, perfil=None, pilhas=None):
+    """Grava a captura (.prof ou .txt + .json) e apara o anel; retorna o id."""
+    diretorio = app.config['PERFIL_DIR']
+    os.makedirs(diretorio, exist_ok=True)
+    captura = f'{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}' # Ordem do nome = ordem de criação
+    if perfil is not None:
+        arquivo = captura + '.prof'
+        perfil.dump_stats(os.path.join(diretorio, arquivo))
+        tempos = _categorias_cprofile(perfil)
+        amostras = None
+    else:
+        arquivo = captura + '.txt'
+        with open(os.path.join(diretorio, arquivo), 'w', encoding='utf-8') as arq:
+            for pilha, quantidade in pilhas.most_common():
+                arq.write(f'{pilha} {quantidade}\n')
+        tempos = _categorias_pilhas(pilhas, app.config['PERFIL_INTERVALO_MS'] / 1000)
+        amostras = sum(pilhas.values())
+
+    meta = {
+        'id': captura,
+        'arquivo': arquivo,
+        'tipo': tipo,
+        'endpoint': request.endpoint,
+        'metodo': request.method,
+        'url': request.full_path.rstrip('?'),
+        'status': status,
+        'duracao_ms': round(duracao_ms, 1),
+        'usuario': session.get('nome'),
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+        'amostras': amostras,
+        'categorias': {nome: round(segundos, 4) for nome, segundos in sorted(tempos.items(), key=lambda t: -t[1])},
+    }
+    with open(os.path.join(diretorio, captura + '.json'), 'w', encoding='utf-8') as arq:
+        json.dump(meta, arq, ensure_ascii=False)
+    _apara(diretorio, app.config['PERFIL_MAX_CAPTURAS'], app.config['PERFIL_MAX_MB'] * 1024 * 1024)
+    return captura
+
+def lista_capturas(diretorio):
+    """Metadados das capturas, da mais nova para a mais antiga."""
+    if not os.path.isdir(diretorio):
+        return []
+    capturas = []
+    for nome in sorted(os.listdir(diretorio), reverse=True):
+        if not nome.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(diretorio, nome), encoding='utf-8') as arq:
+                capturas.append(json.load(arq))
+        except (OSError, ValueError):
+            continue  # Apagada pelo anel enquanto listava
+    return capturas
+
+def resumo_captura(diretorio, meta, linhas=40):
+    """Texto para a tela: pstats por tempo acumulado (cProfile) ou as pilhas mais frequentes (amostragem)."""
+    caminho = os.path.join(diretorio, meta['arquivo'])
+    if meta['tipo'] == 'cprofile':
+        saida = io.StringIO()
+        pstats.Stats(caminho, stream=saida).sort_stats('cumulative').print_stats(linhas)
+        return saida.getvalue()
+    with open(caminho, encoding='utf-8') as arq:
+        pilhas = [linha.rsplit(' ', 1) for linha in arq.read().splitlines()[:linhas]]
+    # Só os quadros finais de cada pilha cabem na tela; o arquivo completo vai para o flamegraph
+    return '\n'.join(f'{int(n):6d}  ' + ' <- '.join(reversed(p.split(';')[-6:])) for p, n in pilhas)
+
+
+# ----------------------------------------------------
+# Ligação com as requisições
+# ----------------------------------------------------
+
+def registra_perfilador(app):
+    """?perfil=1 / X-Perfil: 1 (ADMIN) liga o cProfile; PERFIL_LENTO_MS > 0 liga a amostragem automática."""
+    limite_ms = app.config['PERFIL_LENTO_MS']
+    intervalo = app.config['PERFIL_INTERVALO_MS'] / 1000
+
+    @app.before_request
+    def inicia_perfil():
+        if request.endpoint == 'static':
+            return
+        pedido = request.args.get('perfil') == '1' or request.headers.get('X-Perfil') == '1'
+        if pedido and session.get('nivel_acesso') == 'ADMIN':
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError:
+                return  # Outro profiler já ativo nesta thread
+            g.perfil = ('cprofile', perfil, time.perf_counter())
+        elif limite_ms > 0:
+            _amostrador(intervalo).acompanha(threading.get_ident())
+            g.perfil = ('amostragem', None, time.perf_counter())
+
+    def encerra(status):
+        tipo, perfil, inicio = g.pop('perfil')
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        if tipo == 'cprofile':
+            perfil.disable()
+            return salva_captura(app, tipo, duracao_ms, status, perfil=perfil)
+        pilhas = _amostrador(intervalo).solta(threading.get_ident())
+        if duracao_ms >= limite_ms and pilhas:
+            return salva_captura(app, tipo, duracao_ms, status, pilhas=pilhas)
+        return None
+
+    @app.after_request
+    def encerra_perfil(resposta):
+        if 'perfil' in g:
+            captura = encerra(resposta.status_code)
+            if captura:
+                resposta.headers['X-Perfil-Captura'] = captura
+        return resposta
+
+    @app.teardown_request
+    def encerra_perfil_com_erro(erro):
+        # after_request não roda quando a view levanta exceção
+        if 'perfil' in g:
+            encerra(500)
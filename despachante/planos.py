@@ -0,0 +1,150 @@
+import re
+import json
+import tempfile
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import event
+
+from .extensoes import db
+
+# ----------------------------------------------------
+# 4.12. PLANOS DE CONSULTA DAS ROTAS (regressão de desempenho)
+# ----------------------------------------------------
+# "flask planos-consultas" sobe um app num SQLite temporário semeado sempre igual (carga.semeia_banco),
+# chama cada rota de ROTAS_PLANOS logado como ADMIN e anota os comandos SQL que ela emitiu e o
+# EXPLAIN QUERY PLAN de cada SELECT. O resultado é comparado com a foto em planos_consultas.json
+# (versionada na raiz): a rota falha se passou a fazer mais consultas ou se apareceu um SCAN
+# (leitura da tabela inteira) numa tabela grande que não estava na foto.
+# Os planos são do SQLite; no PostgreSQL o formato e as escolhas do planejador são outros.
+
+ARQUIVO_PLANOS = 'planos_consultas.json'
+
+# Tabelas que crescem com o uso: SCAN sem índice nelas é o que deixa uma tela lenta com os anos
+TABELAS_GRANDES = ('servico', 'movimentacao_caixa', 'cliente', 'item_servico', 'despesa', 'veiculo', 'saldo_cliente')
+
+# Os serviços semeados ficam nos 2 anos até esta data, não até hoje: as datas fixas das rotas
+# abaixo alcançam sempre as mesmas linhas e a foto não muda sozinha com o calendário
+DATA_SEMENTE = date(2025, 12, 31)
+
+# (nome, método, url, dados do formulário)
+ROTAS_PLANOS = (
+    ('index', 'GET', '/', None),
+    ('servicos_filtros', 'GET', '/servicos/filtros', None),
+    ('servicos_filtros_cliente', 'GET', '/servicos/filtros?cliente=1', None),
+    ('servicos_filtros_placa', 'GET', '/servicos/filtros?placa=ABC', None),
+    ('relatorio_debitos', 'GET', '/relatorios/debitos', None),
+    ('relatorio_debitos_cliente', 'GET', '/relatorios/debitos?cliente_id=1', None),
+    ('relatorio_despesas', 'GET', '/relatorios/despesas', None),
+    ('relatorio_fluxo_caixa', 'GET', '/relatorios/fluxo_caixa', None),
+    ('relatorio_fluxo_caixa_periodo', 'GET', '/relatorios/fluxo_caixa?data_inicio=2025-01-01&data_fim=2025-03-31', None),
+    ('visualizar_caixa', 'GET', '/caixa', None),
+    ('historico_caixa', 'GET', '/caixa/historico', None),
+    ('agenda', 'GET', '/agenda', None),
+    ('clientes_lista', 'GET', '/clientes/lista', None),
+    ('exportar_debitos_pdf', 'GET', '/exportar_debitos_pdf', None),
+    ('exportar_debitos_pdf_cliente', 'GET', '/exportar_debitos_pdf?cliente_id=1', None),
+    ('exportar_relatorio_pdf', 'POST', '/exportar_relatorio_pdf', {'data_inicio': '2025-01-01'}),
+)
+
+_NUMEROS = re.compile(r'\b\d+\b')
+
+
+def _forma_plano(detalhes):
+    """Linhas do EXPLAIN QUERY PLAN sem números (ids de subconsulta mudam à toa)."""
+    return [_NUMEROS.sub('N', d) for d in detalhes]
+
+def _tabelas_varridas(plano):
+    """Tabelas grandes lidas inteiras (SCAN sem índice) num plano."""
+    varridas = []
+    for linha in plano:
+        achou = re.match(r'SCAN (?:TABLE )?(\w+)(.*)', linha)
+        if achou and achou.group(1) in TABELAS_GRANDES and 'INDEX' not in achou.group(2):
+            varridas.append(achou.group(1))
+    return varridas
+
+def _explica(conexao, comando, parametros):
+    linhas = conexao.exec_driver_sql('EXPLAIN QUERY PLAN ' + comando, parametros).all()
+    return _forma_plano([linha[-1] for linha in linhas])
+
+def captura_planos(clientes=300, semente=42):
+    """{rota: {'status', 'comandos', 'consultas': [{'sql', 'plano'}], 'varreduras': {tabela: n}}}."""
+    from .banco import app_descartavel
+    from .carga import semeia_banco
+
+    with tempfile.TemporaryDirectory() as pasta:
+        app = app_descartavel(pasta)
+        with app.app_context():
+            semeia_banco(clientes=clientes, usuarios=1, semente=semente, referencia=DATA_SEMENTE)
+            motor = db.engine
+
+        comandos = []
+
+        def anota(conn, cursor, statement, parameters, context, executemany):
+            if not executemany:
+                comandos.append((statement, parameters))
+
+        cliente = app.test_client()
+        cliente.post('/login', data={'login': 'admin', 'senha': '123456'})
+        # 1ª passada aquece o que só é lido uma vez por processo (catálogo, versões do cache)
+        for _, metodo, url, dados in ROTAS_PLANOS:
+            cliente.open(url, method=metodo, data=dados)
+
+        resultado = {}
+        for nome, metodo, url, dados in ROTAS_PLANOS:
+            comandos.clear()
+            event.listen(motor, 'before_cursor_execute', anota)
+            try:
+                resposta = cliente.open(url, method=metodo, data=dados)
+                resposta.get_data() # Streaming (histórico do caixa) só consulta enquanto o corpo é lido
+            finally:
+                event.remove(motor, 'before_cursor_execute', anota)
+
+            consultas, varreduras = [], Counter()
+            with motor.connect() as conexao:
+                for comando, parametros in comandos:
+                    if not comando.lstrip().upper().startswith(('SELECT', 'WITH')):
+                        consultas.append({'sql': ' '.join(comando.split())[:160], 'plano': []})
+                        continue
+                    plano = _explica(conexao, comando, parametros)
+                    varreduras.update(_tabelas_varridas(plano))
+                    consultas.append({'sql': ' '.join(comando.split())[:160], 'plano': plano})
+            resultado[nome] = {
+                'status': resposta.status_code,
+                'comandos': len(comandos),
+                'varreduras': dict(sorted(varreduras.items())),
+                'consultas': consultas,
+            }
+        with app.app_context():
+            db.engine.dispose()
+        return resultado
+
+def compara_planos(foto, atual):
+    """Lista de problemas (strings) de 'atual' em relação à foto; avisos de melhora vão com '+ '."""
+    problemas = []
+    for nome, dados in atual.items():
+        anterior = foto.get(nome)
+        if anterior is None:
+            problemas.append(f'+ {nome}: rota nova, fora da foto (rode com --atualizar).')
+            continue
+        if dados['status'] >= 500:
+            problemas.append(f'{nome}: respondeu {dados["status"]}.')
+        if dados['comandos'] > anterior['comandos']:
+            problemas.append(f'{nome}: {dados["comandos"]} comandos SQL (a foto tem {anterior["comandos"]}).')
+        elif dados['comandos'] < anterior['comandos']:
+            problemas.append(f'+ {nome}: {dados["comandos"]} comandos SQL, menos que os {anterior["comandos"]} da foto.')
+        for tabela, vezes in dados['varreduras'].items():
+            if vezes > anterior['varreduras'].get(tabela, 0):
+                planos = [c['plano'] for c in dados['consultas'] if tabela in _tabelas_varridas(c['plano'])]
+                problemas.append(f'{nome}: SCAN em {tabela} {vezes}x (a foto tem {anterior["varreduras"].get(tabela, 0)}): '
+                                 f'{planos[-1] if planos else ""}')
+    return problemas
+
+def le_foto(caminho):
+    with open(caminho, encoding='utf-8') as arq:
+        return json.load(arq)
+
+def grava_foto(caminho, planos):
+    with open(caminho, 'w', encoding='utf-8') as arq:
+        json.dump(planos, arq, ensure_ascii=False, indent=1, sort_keys=True)
+        arq.write('\n')
@@ -0,0 +1,46 @@
+# Configuração do gunicorn: lida automaticamente por "gunicorn app:app" rodando na raiz do projeto.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))  # PDFs grandes e relatórios de vários anos
+
+# ⭐ Preload: o master importa o app (e roda INICIALIZAR_BANCO/AQUECER) uma vez só;
+# os workers nascem por fork já com módulos, modelos e templates carregados.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def on_starting(server):
+    # Métricas da execução anterior (pids que não existem mais) não entram na soma do /metrics
+    from despachante.metricas import limpa_metricas
+
+    limpa_metricas(os.environ.get('METRICAS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metricas')))
+
+
+def post_fork(server, worker):
+    # Conexões abertas no master (inicialização do banco) não podem ser usadas por dois processos
+    from app import app
+    from despachante.extensoes import db
+    from despachante.metricas import zera_metricas
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+    zera_metricas() # Os comandos SQL da subida (preload) já são do master
+
+
+def post_worker_init(worker):
+    # Cada worker abre o próprio pool antes de aceitar requisições
+    from app import app
+    from despachante.banco import aquece_conexoes
+
+    if app.config['AQUECER']:
+        worker.log.info('Pool aquecido com %s conexão(ões)', aquece_conexoes(app))
+
+
+def worker_exit(server, worker):
+    # Últimas contagens do worker (reciclado ou encerrado) ficam no arquivo dele
+    from app import app
+    from despachante.metricas import grava_metricas
+
+    if app.config['METRICAS_ATIVAS']:
+        grava_metricas(app)
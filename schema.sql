@@ -17,7 +17,8 @@ CREATE TABLE IF NOT EXISTS usuario (
 CREATE TABLE IF NOT EXISTS cliente (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     nome TEXT NOT NULL,
-    cpf_cnpj TEXT NOT NULL UNIQUE, -- CPF ou CNPJ (somente números)
+    cpf_cnpj TEXT NOT NULL UNIQUE, -- CPF ou CNPJ como exibido (com pontuação)
+    documento TEXT,             -- Somente os dígitos do CPF/CNPJ (índice único ix_cliente_documento)
     telefone TEXT,
     email TEXT,
     endereco TEXT,              -- Adicionado
@@ -31,19 +32,25 @@ CREATE TABLE IF NOT EXISTS servico (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     cliente_id INTEGER NOT NULL,
     tipo_servico TEXT NOT NULL,
+    tipo_servico_id INTEGER,    -- Tipo do catálogo (ver 11. Tabela TipoServico)
     detalhes TEXT,              -- Adicionado
     placa_veiculo TEXT,         
+    veiculo_id INTEGER,         -- Veículo da placa (ver 10. Tabela Veiculo)
     data_servico DATE NOT NULL,
     data_vencimento DATE,
     
     valor_total REAL NOT NULL DEFAULT 0.00,
     valor_recebido REAL NOT NULL DEFAULT 0.00,
+    valor_nao_cobrado REAL,     -- Valor original de serviço marcado como não cobrado (NULL = cobrado)
     -- NOTA: 'saldo_pendente' FOI REMOVIDO, POIS É CALCULADO.
     
     status_processo TEXT NOT NULL CHECK(status_processo IN ('Pendente', 'Em Andamento', 'Aguardando Retirada', 'Concluído', 'Cancelado')),
     status_pagamento TEXT NOT NULL CHECK(status_pagamento IN ('A Cobrar', 'Parcial', 'Pago', 'Não Cobrado')),
+    deleted_at DATETIME,        -- Exclusão lógica (NULL = serviço ativo)
 
-    FOREIGN KEY (cliente_id) REFERENCES cliente (id)
+    FOREIGN KEY (cliente_id) REFERENCES cliente (id),
+    FOREIGN KEY (veiculo_id) REFERENCES veiculo (id),
+    FOREIGN KEY (tipo_servico_id) REFERENCES tipo_servico (id)
 );
 
 ---
@@ -69,6 +76,8 @@ CREATE TABLE IF NOT EXISTS movimentacao_caixa (
     descricao TEXT NOT NULL,
     referencia_id INTEGER, 
     referencia_tipo TEXT, -- Adicionado (era 'categoria' no schema antigo, mas o modelo usa 'referencia_tipo')
+    chave_idempotencia TEXT UNIQUE, -- Chave do formulário de pagamento (evita lançamento duplicado)
+    deleted_at DATETIME,            -- Exclusão lógica (junto com o serviço de origem)
     
     FOREIGN KEY (referencia_id) REFERENCES servico (id) -- Opcional, mantido como referência para serviço
 );
@@ -85,12 +94,122 @@ CREATE TABLE IF NOT EXISTS despesa (
     paga INTEGER NOT NULL DEFAULT 0 CHECK(paga IN (0, 1))
 );
 
+---
+
+-- 7. Tabela SaldoCliente (Livro de saldos por cliente, atualizado na mesma transação que Servico)
+CREATE TABLE IF NOT EXISTS saldo_cliente (
+    cliente_id INTEGER PRIMARY KEY,
+    saldo_aberto REAL NOT NULL DEFAULT 0.0,
+    servicos_abertos INTEGER NOT NULL DEFAULT 0,
+    data_mais_antiga DATE,          -- Serviço em aberto mais antigo
+    atualizado_em DATETIME,
+
+    FOREIGN KEY (cliente_id) REFERENCES cliente (id)
+);
+
+---
+
+-- 8. Tabelas de arquivo (servico_arquivo, item_servico_arquivo, movimentacao_caixa_arquivo)
+-- Mesmas colunas das tabelas originais + 'arquivado_em DATETIME NOT NULL'.
+-- Criadas pelo app (inicializa_banco) a partir dos modelos e preenchidas por "flask arquivar-servicos".
+
+-- Arquivo frio ("flask arquivo-frio-exportar ANO"): anos encerrados saem do banco para
+-- instance/arquivo_frio/<ano>/<tabela>.csv.gz + manifesto.json (linhas e sha256 por arquivo).
+
+-- 9. Particionamento por data (somente PostgreSQL, "flask particionar")
+-- movimentacao_caixa (data), servico (data_servico) e, opcionalmente, despesa (data) viram
+-- PARTITION BY RANGE com partições anuais/mensais <tabela>_pAAAA[MM] + <tabela>_padrao (DEFAULT).
+-- A PK vira o índice único (id, <coluna de data>) e a FK item_servico -> servico é removida.
+-- Partições futuras: "flask particoes-manter"; antigas: "flask particoes-desanexar AAAA-MM-DD".
+
+-- 10. Tabela Veiculo (placa normalizada: só letras/números em maiúsculas, ex. ABC1D23)
+-- Serviços antigos são ligados pela placa digitada em "flask veiculos-vincular" (e no inicializar-banco).
+CREATE TABLE IF NOT EXISTS veiculo (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    placa TEXT NOT NULL UNIQUE,
+    cliente_id INTEGER,         -- Proprietário atual (cliente do serviço mais recente)
+    renavam TEXT,
+    modelo TEXT,
+    criado_em DATETIME,
+    FOREIGN KEY (cliente_id) REFERENCES cliente (id)
+);
+
+-- 11. Tabela TipoServico (catálogo) e ItemTipoServico (itens padrão de cada tipo)
+-- 'chave' = nome sem acentos/maiúsculas/espaços extras; o texto livre antigo entra com "flask tipos-servico-migrar".
+CREATE TABLE IF NOT EXISTS tipo_servico (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL UNIQUE,
+    chave TEXT NOT NULL UNIQUE,
+    valor_padrao REAL DEFAULT 0.00,
+    ativo BOOLEAN DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS item_tipo_servico (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo_servico_id INTEGER NOT NULL,
+    descricao TEXT NOT NULL,
+    valor REAL DEFAULT 0.00,
+    ordem INTEGER DEFAULT 0,
+    FOREIGN KEY (tipo_servico_id) REFERENCES tipo_servico (id)
+);
+
+-- 12. Tabela FechamentoCaixa (foto imutável de um dia/mês fechado; "flask caixa-fechar")
+CREATE TABLE IF NOT EXISTS fechamento_caixa (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    periodo TEXT NOT NULL, -- 'dia' ou 'mes'
+    data_inicio DATE NOT NULL UNIQUE,
+    data_fim DATE NOT NULL,
+    saldo_inicial REAL NOT NULL DEFAULT 0.00,
+    total_entradas REAL NOT NULL DEFAULT 0.00,
+    total_saidas REAL NOT NULL DEFAULT 0.00,
+    saldo_final REAL NOT NULL DEFAULT 0.00,
+    movimentos INTEGER NOT NULL DEFAULT 0,
+    fechado_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+    fechado_por TEXT
+);
+
+-- 13. Tabela ListaCobranca (foto dos serviços vencidos a cobrar; "flask cobranca-gerar" toda noite)
+CREATE TABLE IF NOT EXISTS lista_cobranca (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    servico_id INTEGER NOT NULL UNIQUE,
+    cliente_id INTEGER NOT NULL,
+    cliente_nome TEXT NOT NULL,
+    telefone TEXT,
+    email TEXT,
+    tipo_servico TEXT,
+    placa_veiculo TEXT,
+    data_vencimento DATE NOT NULL,
+    valor_aberto REAL NOT NULL DEFAULT 0.00,
+    dias_atraso INTEGER NOT NULL DEFAULT 0,
+    gerado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 14. Tabela VersaoDados (versão por tabela, sobe a cada commit que grava nela; chave do cache de relatórios)
+CREATE TABLE IF NOT EXISTS versao_dados (
+    tabela TEXT PRIMARY KEY,
+    versao INTEGER NOT NULL DEFAULT 0
+);
+
 ---
 -- -----------------------------------------------------------
 -- ÍNDICES (Opcional, mas melhora a performance de busca)
 -- -----------------------------------------------------------
 CREATE INDEX IF NOT EXISTS idx_cliente_cpf_cnpj ON cliente (cpf_cnpj);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_cliente_documento ON cliente (documento);
 CREATE INDEX IF NOT EXISTS idx_servico_cliente_id ON servico (cliente_id);
 CREATE INDEX IF NOT EXISTS idx_servico_placa ON servico (placa_veiculo); 
 CREATE INDEX IF NOT EXISTS idx_movimentacao_caixa_data ON movimentacao_caixa (data);
-CREATE INDEX IF NOT EXISTS idx_item_servico_servico_id ON item_servico (servico_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_item_servico_servico_id ON item_servico (servico_id);
+CREATE INDEX IF NOT EXISTS idx_movimentacao_caixa_referencia ON movimentacao_caixa (referencia_tipo, referencia_id);
+-- Índices parciais: cobrem apenas as linhas ativas consultadas pelas telas
+CREATE INDEX IF NOT EXISTS ix_servico_ativo_data ON servico (data_servico) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_servico_ativo_cliente ON servico (cliente_id, data_servico) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_servico_ativo_veiculo ON servico (veiculo_id, data_servico) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_servico_ativo_vencimento ON servico (data_vencimento, status_pagamento) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_veiculo_cliente_id ON veiculo (cliente_id);
+CREATE INDEX IF NOT EXISTS ix_servico_tipo_servico_id ON servico (tipo_servico_id);
+CREATE INDEX IF NOT EXISTS ix_item_tipo_servico_tipo_servico_id ON item_tipo_servico (tipo_servico_id);
+CREATE INDEX IF NOT EXISTS ix_movimentacao_caixa_ativa_data ON movimentacao_caixa (data) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_fechamento_caixa_data_fim ON fechamento_caixa (data_fim);
+CREATE INDEX IF NOT EXISTS ix_lista_cobranca_cliente_id ON lista_cobranca (cliente_id);
+CREATE INDEX IF NOT EXISTS ix_lista_cobranca_dias_atraso ON lista_cobranca (dias_atraso);
@@ -0,0 +1,75 @@
+// ----------------------------------------------------
+// FILTROS COM TROCA PARCIAL (modo fragmento)
+// A rota devolve só o trecho de resultados quando recebe ?fragmento=1 / header X-Fragmento,
+// sem base.html e sem os dropdowns. Sem JavaScript o formulário continua com o GET normal.
+// ----------------------------------------------------
+
+function ligarFiltrosParciais(opcoes) {
+    const form = opcoes.form || null;
+    const alvo = opcoes.alvo;
+    const atraso = opcoes.atraso || 350; // ms sem digitar antes de buscar
+    const url = opcoes.url || (form && form.getAttribute('action')) || window.location.pathname;
+    const campos = opcoes.campos || (form ? Array.from(form.elements) : []);
+    let temporizador = null;
+    let controle = null;
+
+    function parametrosDoForm() {
+        const params = new URLSearchParams();
+        new FormData(form).forEach(function (valor, nome) {
+            if (valor) params.append(nome, valor);
+        });
+        return params;
+    }
+
+    async function atualizar() {
+        clearTimeout(temporizador);
+        const params = opcoes.parametros ? opcoes.parametros() : parametrosDoForm();
+        const endereco = url + (params.toString() ? '?' + params.toString() : '');
+
+        // Só a última busca vale: a anterior (mais lenta) é cancelada
+        if (controle) controle.abort();
+        controle = new AbortController();
+        params.set('fragmento', '1');
+        alvo.style.opacity = '0.5';
+
+        try {
+            const resposta = await fetch(url + '?' + params.toString(), {
+                headers: { 'X-Fragmento': '1' },
+                credentials: 'same-origin',
+                signal: controle.signal
+            });
+            // Sessão expirada (redirect para o login) ou erro: cai para a navegação normal
+            if (resposta.redirected || !resposta.ok) {
+                window.location.href = endereco;
+                return;
+            }
+            alvo.innerHTML = await resposta.text();
+            history.replaceState(null, '', endereco); // URL continua compartilhável / F5 funciona
+        } catch (erro) {
+            if (erro.name !== 'AbortError') window.location.href = endereco;
+        } finally {
+            alvo.style.opacity = '';
+        }
+    }
+
+    function agendar() {
+        clearTimeout(temporizador);
+        temporizador = setTimeout(atualizar, atraso);
+    }
+
+    campos.forEach(function (campo) {
+        const tipo = (campo.type || '').toLowerCase();
+        if (tipo === 'submit' || tipo === 'button') return;
+        // Texto: espera a pessoa parar de digitar; select/data: busca logo após a troca
+        campo.addEventListener(tipo === 'text' || tipo === 'search' ? 'input' : 'change', agendar);
+    });
+
+    if (form) {
+        form.addEventListener('submit', function (evento) {
+            evento.preventDefault();
+            atualizar();
+        });
+    }
+
+    return { atualizar: atualizar, agendar: agendar };
+}